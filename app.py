@@ -1,460 +1,586 @@
-# simulateur_sci_is_v19_streamlit_cca_switch.py
-#
-# Pour l'exécuter :
-# 1. Assurez-vous d'avoir les bibliothèques :
-#    pip install streamlit pandas numpy numpy-financial
-# 2. Lancez depuis votre terminal :
-#    streamlit run streamlit_app_v19.py
-
-import streamlit as st
-import pandas as pd
-import numpy as np
-import numpy_financial as npf
-from collections import defaultdict
-
-# --- MOTEUR DE CALCUL IMPÔT PLUS-VALUE (Particuliers, pour Scénario 2) ---
-# (Inchangé)
-def calculer_impot_plus_value(plus_value_brute, duree_detention):
-    if plus_value_brute <= 0: return 0, 0
-    abattement_ir = 0
-    if duree_detention > 5:
-        abattement_ir += sum(0.06 for _ in range(6, min(duree_detention, 21) + 1))
-        if duree_detention >= 22: abattement_ir += 0.04
-    base_imposable_ir = plus_value_brute * (1 - abattement_ir)
-    impot_sur_revenu_pv = base_imposable_ir * 0.19
-    abattement_ps = 0
-    if duree_detention > 5:
-        abattement_ps += sum(0.0165 for _ in range(6, min(duree_detention, 21) + 1))
-        if duree_detention == 22: abattement_ps += 0.0160
-        if duree_detention > 22: abattement_ps += sum(0.09 for _ in range(23, min(duree_detention, 30) + 1))
-    base_imposable_ps = plus_value_brute * (1 - abattement_ps)
-    prelevements_sociaux_pv = base_imposable_ps * 0.172
-    impot_total_pv = max(0, impot_sur_revenu_pv) + max(0, prelevements_sociaux_pv)
-    return impot_total_pv, plus_value_brute
-
-# --- MOTEUR DE CALCUL DU PRÊT (Inchangé) ---
-def generer_tableau_amortissement(montant_pret, taux_annuel_pc, duree_annees):
-    if not (montant_pret > 0 and taux_annuel_pc > 0 and duree_annees > 0): return {}
-    taux_mensuel = (taux_annuel_pc / 100) / 12
-    nb_mois = int(duree_annees * 12)
-    try:
-        mensualite = npf.pmt(taux_mensuel, nb_mois, -montant_pret)
-    except (ZeroDivisionError, ValueError):
-        return {}
-    tableau_annuel = defaultdict(lambda: {'interet': 0, 'principal': 0, 'crd_fin_annee': 0})
-    capital_restant_du = montant_pret
-    for mois in range(1, nb_mois + 1):
-        annee = (mois - 1) // 12 + 1
-        interet_mois = capital_restant_du * taux_mensuel
-        principal_mois = mensualite - interet_mois
-        capital_restant_du -= principal_mois
-        tableau_annuel[annee]['interet'] += interet_mois
-        tableau_annuel[annee]['principal'] += principal_mois
-        tableau_annuel[annee]['crd_fin_annee'] = capital_restant_du if capital_restant_du > 0.01 else 0
-    return dict(tableau_annuel)
-
-# --- MOTEUR DE SIMULATION SCI À L'IS (ADAPTÉ POUR STREAMLIT) ---
-def generer_projection_sci_is(params):
-    """
-    Génère la projection financière.
-    MODIFIÉ : Accepte des nombres (float/int) en entrée et retourne
-    un dictionnaire de nombres bruts (non formatés) pour affichage
-    dans un DataFrame Pandas.
-    """
-    try:
-        # Streamlit envoie des nombres, pas des strings.
-        valeurs_num = params.copy()
-        is_gerant_majoritaire = valeurs_num.pop("is_gerant_majoritaire", False)
-        # NOUVEAU LEVIER STRATÉGIQUE
-        autoriser_remboursement_cca = valeurs_num.pop("autoriser_remboursement_cca", True) 
-    except (ValueError, TypeError):
-        return [{"erreur": "Veuillez entrer des nombres valides."}]
-
-    # --- Initialisation des valeurs de base ---
-    prix_achat = valeurs_num.get("prix_achat", 0)
-    cout_travaux = valeurs_num.get("cout_travaux", 0)
-    frais_notaire = valeurs_num.get("frais_notaire", 0)
-    valeur_meubles = valeurs_num.get("valeur_meubles", 0)
-    
-    # --- NOUVEAU: Distinction Capital Social / Apport en CCA (M1) ---
-    capital_social = valeurs_num.get("capital_social", 0)
-    apport_cca = valeurs_num.get("apport_personnel", 0) # Traité comme apport initial en CCA
-    frais_dossier = valeurs_num.get("frais_dossier", 0)
-    
-    cout_acquisition = prix_achat + cout_travaux
-    
-    # --- CORRIGÉ: Base d'amortissement (C1) ---
-    part_terrain_pc = valeurs_num.get("part_terrain_pc", 0) / 100
-    base_amort_immo_frais = (prix_achat * (1 - part_terrain_pc)) + frais_notaire
-    base_vnc_globale = prix_achat + cout_travaux + frais_notaire + valeur_meubles # Base pour calcul VNC
-
-    # --- MIS À JOUR: Investissement et Prêt (M1) ---
-    investissement_initial_personnel = apport_cca + capital_social + frais_dossier # Total cash out investisseur
-    montant_pret = cout_acquisition + frais_notaire - apport_cca - capital_social
-    
-    duree_pret = int(valeurs_num.get("duree_pret", 0))
-    if duree_pret <= 0: duree_pret = 1 # Evite division par zéro
-        
-    tableau_amortissement_pret = generer_tableau_amortissement(montant_pret, valeurs_num.get("taux_interet_pret", 0), duree_pret)
-    mensualite_assurance = (montant_pret * (valeurs_num.get("taux_assurance_pret", 0) / 100)) / 12
-    
-    loyer_mensuel_base = valeurs_num.get("loyer_mensuel", 0)
-    charges_copro_base = valeurs_num.get("charges_copro", 0)
-    taxe_fonciere_base = valeurs_num.get("taxe_fonciere", 0)
-    
-    inflation_pc = valeurs_num.get("inflation_pc", 0) / 100
-    revalo_bien_pc = valeurs_num.get("revalo_bien_pc", 0) / 100
-    
-    # --- NOUVEAU: Variables d'état (M1) ---
-    solde_cca = apport_cca
-    
-    cashflow_investisseur_accumule = 0
-    amortissement_cumule = 0
-    tresorerie_sci_cumulee = 0
-    abondement_cumule = 0 # Ne traque que les NOUVEAUX abondements post-initiaux
-    flux_tresorerie_tri_annuels = []
-    projection = []
-    
-    # Simule pour 25 ans après le crédit pour voir le long terme
-    duree_simulation_totale = duree_pret + 25 
-    
-    # Définition des colonnes pour la séparation (NA)
-    colonnes_projection = [
-        "Année", "Loyers Annuels", "Résultat Exploitation", "IS Exploitation", 
-        "Cash-flow Investisseur", "Tréso. SCI", "Solde CCA", "PV Imposable", 
-        "IS sur PV", "Bénéfice Net (Immeuble)", "TRI (Immeuble) (%)",
-        "Bénéfice Net (Parts)", "TRI (Parts) (%)"
-    ]
-
-    # --- Boucle principale de simulation ---
-    for annee in range(1, duree_simulation_totale + 1):
-        
-        is_pendant_credit = (annee <= duree_pret)
-        facteur_inflation = (1 + inflation_pc)**(annee - 1)
-        
-        # --- NOUVEAU: Vacance locative (R1) ---
-        taux_occupation = valeurs_num.get("taux_occupation_pc", 100) / 100
-        loyer_annuel = (loyer_mensuel_base * 12) * facteur_inflation * taux_occupation
-        
-        charges_copro_annuelles = (charges_copro_base * 12) * facteur_inflation
-        taxe_fonciere_actuelle = taxe_fonciere_base * facteur_inflation
-        
-        frais_gestion_annuels = loyer_annuel * (valeurs_num.get("frais_gestion_pc", 0) / 100)
-        gli_annuelle = (loyer_annuel + charges_copro_annuelles) * (valeurs_num.get("taux_gli_pc", 0) / 100)
-        
-        # --- NOUVEAU: Provision Gros Travaux (R2) ---
-        prix_revente = cout_acquisition * (1 + revalo_bien_pc)**annee
-        provision_gros_travaux_pc = valeurs_num.get("provision_gros_travaux_pc", 0) / 100
-        provision_gros_travaux_annuelle = prix_revente * provision_gros_travaux_pc
-        
-        charges_annuelles_cash = (charges_copro_annuelles + taxe_fonciere_actuelle + 
-                                  valeurs_num.get("assurance_pno", 0) + frais_gestion_annuels + gli_annuelle + 
-                                  (valeurs_num.get("cfe", 0) * facteur_inflation) +
-                                  provision_gros_travaux_annuelle) # Ajout de la provision au cash out
-        
-        if annee == 1: 
-            charges_annuelles_cash += frais_dossier
-        
-        interets_annuels = tableau_amortissement_pret.get(annee, {}).get('interet', 0) if is_pendant_credit else 0
-        principal_annuel = tableau_amortissement_pret.get(annee, {}).get('principal', 0) if is_pendant_credit else 0
-        assurance_annuelle = mensualite_assurance * 12 if is_pendant_credit else 0
-        mensualite_credit_annuelle = interets_annuels + principal_annuel + assurance_annuelle
-        
-        # --- CORRIGÉ: Calcul amortissement (C1) ---
-        duree_amort_immo = max(1, valeurs_num.get("duree_amort_immo", 1))
-        duree_amort_travaux = max(1, valeurs_num.get("duree_amort_travaux", 1))
-        duree_amort_meubles = max(1, valeurs_num.get("duree_amort_meubles", 1))
-
-        amort_immo_et_frais = base_amort_immo_frais / duree_amort_immo if annee <= duree_amort_immo else 0
-        amort_travaux = cout_travaux / duree_amort_travaux if annee <= duree_amort_travaux else 0
-        amort_meubles = valeur_meubles / duree_amort_meubles if annee <= duree_amort_meubles else 0
-        
-        amortissement_annuel = amort_immo_et_frais + amort_travaux + amort_meubles
-        amortissement_cumule += amortissement_annuel
-        
-        # --- CORRIGÉ: Provision non-déductible (R2) ---
-        charges_deductibles_totales = (charges_annuelles_cash - provision_gros_travaux_annuelle) + interets_annuels + assurance_annuelle
-        
-        # --- CORRIGÉ: IS sur Exploitation (C2) ---
-        resultat_fiscal_exploitation = loyer_annuel - charges_deductibles_totales - amortissement_annuel
-
-        is_exploitation = 0
-        if resultat_fiscal_exploitation > 0:
-            benefice_taux_reduit = min(resultat_fiscal_exploitation, 42500)
-            is_exploitation = (benefice_taux_reduit * 0.15) + (max(0, resultat_fiscal_exploitation - benefice_taux_reduit) * 0.25)
-
-        resultat_net_comptable = resultat_fiscal_exploitation - is_exploitation # Base pour dividendes
-
-        # --- MIS À JOUR: Logique de Trésorerie et CCA (M1) ---
-        cashflow_sci_avant_is = loyer_annuel - charges_annuelles_cash - mensualite_credit_annuelle
-        tresorerie_sci_avant_operations = tresorerie_sci_cumulee + cashflow_sci_avant_is - is_exploitation
-        
-        abondement = 0
-        if tresorerie_sci_avant_operations < 0:
-            abondement = abs(tresorerie_sci_avant_operations)
-            abondement_cumule += abondement
-            solde_cca += abondement # L'abondement augmente le CCA
-            tresorerie_sci_cumulee = 0 
-        else:
-            tresorerie_sci_cumulee = tresorerie_sci_avant_operations
-            
-        # --- MIS À JOUR: Logique de Distribution (Priorité CCA) (M1 & M2) ---
-        tresorerie_disponible = tresorerie_sci_cumulee
-        
-        # 1. Remboursement CCA (Prioritaire, non fiscalisé)
-        remboursement_cca = 0 # Initialisation
-        
-        # NOUVELLE CONDITION : On ne rembourse que si l'utilisateur l'autorise
-        if autoriser_remboursement_cca:
-            remboursement_cca = min(tresorerie_disponible, solde_cca)
-            
-        tresorerie_disponible -= remboursement_cca
-        solde_cca -= remboursement_cca
-        
-        # 2. Distribution de Dividendes (Secondaire, fiscalisé)
-        dividendes_distribuables = max(0, resultat_net_comptable)
-        taux_distrib = valeurs_num.get("taux_distrib_pc", 100) / 100
-        dividendes_potentiels = min(dividendes_distribuables, tresorerie_disponible)
-        dividendes_verses = dividendes_potentiels * taux_distrib
-        
-        tresorerie_sci_cumulee = tresorerie_disponible - dividendes_verses
-        
-        # 3. Calcul Impôt sur Dividendes (Logique Gérant Majoritaire) (M2)
-        impot_dividendes = 0
-        if dividendes_verses > 0:
-            solde_cca_pour_seuil = solde_cca + remboursement_cca
-            if is_gerant_majoritaire:
-                seuil_10_pc = (capital_social + solde_cca_pour_seuil) * 0.10 
-                dividendes_charges_sociales = max(0, dividendes_verses - seuil_10_pc)
-                dividendes_pfu = dividendes_verses - dividendes_charges_sociales
-                impot_part_pfu = dividendes_pfu * 0.30
-                taux_charges_sociales_tns = 0.45 # Simplification
-                charges_sociales_part_cs = dividendes_charges_sociales * taux_charges_sociales_tns
-                ir_part_cs = dividendes_charges_sociales * 0.128
-                impot_dividendes = impot_part_pfu + charges_sociales_part_cs + ir_part_cs
-            else:
-                impot_dividendes = dividendes_verses * 0.30
-        
-        cash_net_investisseur_annuel = (dividendes_verses - impot_dividendes) + remboursement_cca - abondement
-        cashflow_investisseur_accumule += cash_net_investisseur_annuel
-        flux_tresorerie_tri_annuels.append(cash_net_investisseur_annuel)
-
-        # --- SCÉNARIO 1: REVENTE IMMEUBLE (ASSET DEAL) (Corrigé C2, M1) ---
-        valeur_nette_comptable = base_vnc_globale - amortissement_cumule
-        plus_value_pro = max(0, prix_revente - valeur_nette_comptable)
-        resultat_fiscal_total_revente = resultat_fiscal_exploitation + plus_value_pro
-        
-        is_total_revente = 0
-        if resultat_fiscal_total_revente > 0:
-             benefice_taux_reduit = min(resultat_fiscal_total_revente, 42500)
-             is_total_revente = (benefice_taux_reduit * 0.15) + (max(0, resultat_fiscal_total_revente - benefice_taux_reduit) * 0.25)
-        
-        is_sur_pv = max(0, is_total_revente - is_exploitation)
-        crd = tableau_amortissement_pret.get(annee, {}).get('crd_fin_annee', 0) if is_pendant_credit else 0
-        
-        cash_revente_in_sci = prix_revente - crd - is_sur_pv
-        tresorerie_sci_avant_distrib_annee_N = tresorerie_sci_avant_operations if tresorerie_sci_avant_operations > 0 else 0
-        tresorerie_totale_finale = tresorerie_sci_avant_distrib_annee_N + cash_revente_in_sci
-        
-        solde_cca_debut_annee_N = solde_cca + remboursement_cca
-        remboursement_cca_final = min(tresorerie_totale_finale, solde_cca_debut_annee_N)
-        tresorerie_totale_finale -= remboursement_cca_final
-        remboursement_capital_social = min(tresorerie_totale_finale, capital_social)
-        tresorerie_totale_finale -= remboursement_capital_social
-        
-        boni_de_liquidation = max(0, tresorerie_totale_finale)
-        impot_boni = boni_de_liquidation * 0.30
-        
-        cash_net_final_investisseur_immo = remboursement_cca_final + remboursement_capital_social + (boni_de_liquidation - impot_boni)
-        
-        total_cash_investi = investissement_initial_personnel + abondement_cumule
-        cash_accumule_annee_N_moins_1 = cashflow_investisseur_accumule - cash_net_investisseur_annuel
-        total_cash_recu_immo = cash_accumule_annee_N_moins_1 + cash_net_final_investisseur_immo
-        benefice_net_total_immo = total_cash_recu_immo - total_cash_investi
-
-        cash_flows_tri_immo = [-investissement_initial_personnel] + flux_tresorerie_tri_annuels[:-1]
-        flux_annee_N_immo = cash_net_final_investisseur_immo - (abondement if abondement > 0 else 0)
-        cash_flows_tri_immo.append(flux_annee_N_immo)
-        try:
-            tri_immo = npf.irr(cash_flows_tri_immo)
-            tri_pc_immo = tri_immo * 100 if not np.isnan(tri_immo) else 0
-        except:
-            tri_pc_immo = 0
-
-        # --- SCÉNARIO 2: REVENTE DES PARTS (SHARE DEAL) (Nouveau M3) ---
-        prix_cession_parts = prix_revente + tresorerie_sci_avant_distrib_annee_N - crd
-        cout_acquisition_parts = capital_social + apport_cca + abondement_cumule
-        plus_value_sur_parts = max(0, prix_cession_parts - cout_acquisition_parts)
-        impot_pv_parts, _ = calculer_impot_plus_value(plus_value_sur_parts, annee) 
-        
-        cash_net_final_investisseur_parts = prix_cession_parts - impot_pv_parts
-        total_cash_recu_parts = cash_accumule_annee_N_moins_1 + cash_net_final_investisseur_parts
-        benefice_net_total_parts = total_cash_recu_parts - total_cash_investi
-        
-        cash_flows_tri_parts = [-investissement_initial_personnel] + flux_tresorerie_tri_annuels[:-1]
-        flux_annee_N_parts = cash_net_final_investisseur_parts - (abondement if abondement > 0 else 0)
-        cash_flows_tri_parts.append(flux_annee_N_parts)
-        try:
-            tri_parts = npf.irr(cash_flows_tri_parts)
-            tri_pc_parts = tri_parts * 100 if not np.isnan(tri_parts) else 0
-        except:
-            tri_pc_parts = 0
-
-        # --- MODIFIÉ: Ajout des données BRUTES (nombres) ---
-        
-        # Ligne de séparation (NA)
-        if annee == duree_pret + 1 and duree_pret > 0:
-             projection.append({key: pd.NA for key in colonnes_projection})
-
-        projection.append({
-            "Année": f"An {annee}" if annee == duree_pret + 1 else annee,
-            "Loyers Annuels": loyer_annuel,
-            "Résultat Exploitation": resultat_fiscal_exploitation,
-            "IS Exploitation": is_exploitation,
-            "Cash-flow Investisseur": cash_net_investisseur_annuel,
-            "Tréso. SCI": tresorerie_sci_cumulee,
-            "Solde CCA": solde_cca,
-            "PV Imposable": plus_value_pro,
-            "IS sur PV": is_sur_pv,
-            "Bénéfice Net (Immeuble)": benefice_net_total_immo,
-            "TRI (Immeuble) (%)": tri_pc_immo,
-            "Bénéfice Net (Parts)": benefice_net_total_parts,
-            "TRI (Parts) (%)": tri_pc_parts
-        })
-
-    return projection
-
-# --- Dictionnaire des descriptions (Inchangé) ---
-descriptions_calcul = {
-    "Année": "L'année de la simulation. 'An X' marque la première année post-crédit.",
-    "Loyers Annuels": "Total des loyers bruts perçus, après déduction de la vacance locative.",
-    "Résultat Exploitation": "Base de calcul de l'IS : Loyers - Toutes les charges déductibles (y compris intérêts, assurances, hors provision gros travaux) - Amortissements.",
-    "IS Exploitation": "Impôt sur les Sociétés payé par la SCI sur son Résultat d'Exploitation (15%/25%).",
-    "Cash-flow Investisseur": "Argent net reçu par l'investisseur : (Remboursement de CCA) + (Dividendes versés - Impôts sur dividendes) - (Abondement en CCA).",
-    "Tréso. SCI": "Trésorerie restante dans la SCI en fin d'année après toutes opérations (charges, IS, distrib...).",
-    "Solde CCA": "Solde du Compte Courant d'Associé. Ce que la SCI vous 'doit'. Augmente avec les apports/abondements, diminue avec les remboursements.",
-    "PV Imposable": "Plus-value professionnelle (Vente Immeuble) : Prix de Vente - Valeur Nette Comptable (VNC).",
-    "IS sur PV": "Part de l'Impôt sur les Sociétés (IS) attribuable à la Plus-Value (Vente Immeuble).",
-    "Bénéfice Net (Immeuble)": "Enrichissement net final (Vente Immeuble) : (Total Cash Reçu) - (Total Cash Investi). Inclut le boni de liquidation taxé.",
-    "TRI (Immeuble) (%)": "Taux de Rentabilité Interne de la stratégie 'Vente Immeuble' (Asset Deal).",
-    "Bénéfice Net (Parts)": "Enrichissement net final (Vente des Parts) : (Total Cash Reçu) - (Total Cash Investi).",
-    "TRI (Parts) (%)": "Taux de Rentabilité Interne de la stratégie 'Vente des Parts' (Share Deal). Fiscalité des particuliers."
-}
-
-# --- INTERFACE GRAPHIQUE STREAMLIT ---
-def main():
-    st.set_page_config(layout="wide", page_title="Simulateur SCI à l'IS")
-    st.title("Simulateur d'Investissement - SCI à l'IS (v19) 📈")
-    
-    # --- Panneau Latéral (Sidebar) pour les entrées ---
-    st.sidebar.title("Paramètres d'Entrée")
-    
-    with st.sidebar:
-        st.subheader("Projet & Financement 🏦")
-        prix_achat = st.number_input("Prix d'achat", min_value=0.0, value=200000.0, step=5000.0, format="%.0f")
-        cout_travaux = st.number_input("Coût travaux", min_value=0.0, value=30000.0, step=1000.0, format="%.0f")
-        valeur_meubles = st.number_input("Valeur meubles", min_value=0.0, value=15000.0, step=500.0, format="%.0f")
-        frais_notaire = st.number_input("Frais notaire", min_value=0.0, value=16000.0, step=500.0, format="%.0f")
-        frais_dossier = st.number_input("Frais dossier", min_value=0.0, value=1500.0, step=100.0, format="%.0f")
-        capital_social = st.number_input("Capital social", min_value=0.0, value=1000.0, step=100.0, format="%.0f")
-        apport_personnel = st.number_input("Apport en CCA initial", min_value=0.0, value=20000.0, step=1000.0, format="%.0f")
-        duree_pret = st.number_input("Durée prêt (années)", min_value=1, max_value=30, value=20, step=1, format="%d")
-        taux_interet_pret = st.number_input("Taux intérêt prêt (%)", min_value=0.0, value=3.5, step=0.1, format="%.2f")
-        taux_assurance_pret = st.number_input("Taux assurance prêt (%)", min_value=0.0, value=0.34, step=0.01, format="%.2f")
-
-        # Affichage dynamique du montant du prêt
-        montant_pret_calcule = prix_achat + cout_travaux + frais_notaire - apport_personnel - capital_social
-        st.metric(label="Montant du Prêt Calculé", value=f"{montant_pret_calcule:,.2f} €")
-
-        st.subheader("Exploitation & Charges 🧾")
-        loyer_mensuel = st.number_input("Loyer mensuel", min_value=0.0, value=1200.0, step=50.0, format="%.0f")
-        taux_occupation_pc = st.number_input("Taux d'occupation (%)", min_value=0.0, max_value=100.0, value=95.0, step=1.0, format="%.0f")
-        charges_copro = st.number_input("Charges copro (mensuelles)", min_value=0.0, value=100.0, step=10.0, format="%.0f")
-        taxe_fonciere = st.number_input("Taxe foncière (annuelle)", min_value=0.0, value=1000.0, step=50.0, format="%.0f")
-        frais_gestion_pc = st.number_input("Frais gestion (%)", min_value=0.0, max_value=100.0, value=7.0, step=0.5, format="%.1f")
-        taux_gli_pc = st.number_input("Taux GLI (%)", min_value=0.0, max_value=100.0, value=3.5, step=0.1, format="%.1f")
-        assurance_pno = st.number_input("Assurance PNO (annuelle)", min_value=0.0, value=200.0, step=10.0, format="%.0f")
-        cfe = st.number_input("CFE (annuelle)", min_value=0.0, value=200.0, step=10.0, format="%.0f")
-        provision_gros_travaux_pc = st.number_input("Prov. gros travaux (% val. bien)", min_value=0.0, value=0.5, step=0.1, format="%.2f")
-
-        st.subheader("Fiscalité & Hypothèses 🧠")
-        duree_amort_immo = st.number_input("Durée amort. immo (ans)", min_value=1, value=30, step=1, format="%d")
-        duree_amort_travaux = st.number_input("Durée amort. travaux (ans)", min_value=1, value=15, step=1, format="%d")
-        duree_amort_meubles = st.number_input("Durée amort. meubles (ans)", min_value=1, value=7, step=1, format="%d")
-        part_terrain_pc = st.number_input("Part terrain (%)", min_value=0.0, max_value=100.0, value=15.0, step=1.0, format="%.0f")
-        taux_distrib_pc = st.number_input("Taux distrib. dividendes (%)", min_value=0.0, max_value=100.0, value=100.0, step=5.0, format="%.0f")
-        inflation_pc = st.number_input("Inflation (%)", min_value=0.0, value=2.0, step=0.1, format="%.1f")
-        revalo_bien_pc = st.number_input("Revalo. bien (%)", min_value=0.0, value=3.0, step=0.1, format="%.1f")
-        
-        # --- NOUVEAUX LEVIERS STRATÉGIQUES ---
-        is_gerant_majoritaire = st.checkbox("Gérant Majoritaire (impact CS)", value=False)
-        autoriser_remboursement_cca = st.checkbox(
-            "Autoriser remboursement CCA", 
-            value=True, 
-            help="Si décoché, la SCI garde sa trésorerie pour capitaliser au lieu de rembourser l'apport de l'associé."
-        )
-        
-    # --- Collecte des paramètres pour le moteur ---
-    params = {
-        "prix_achat": prix_achat, "cout_travaux": cout_travaux, "valeur_meubles": valeur_meubles,
-        "frais_notaire": frais_notaire, "frais_dossier": frais_dossier, "capital_social": capital_social,
-        "apport_personnel": apport_personnel, "duree_pret": duree_pret, "taux_interet_pret": taux_interet_pret,
-        "taux_assurance_pret": taux_assurance_pret, "loyer_mensuel": loyer_mensuel,
-        "taux_occupation_pc": taux_occupation_pc, "charges_copro": charges_copro,
-        "taxe_fonciere": taxe_fonciere, "frais_gestion_pc": frais_gestion_pc, "taux_gli_pc": taux_gli_pc,
-        "assurance_pno": assurance_pno, "cfe": cfe, "provision_gros_travaux_pc": provision_gros_travaux_pc,
-        "duree_amort_immo": duree_amort_immo, "duree_amort_travaux": duree_amort_travaux,
-        "duree_amort_meubles": duree_amort_meubles, "part_terrain_pc": part_terrain_pc,
-        "taux_distrib_pc": taux_distrib_pc, "inflation_pc": inflation_pc, "revalo_bien_pc": revalo_bien_pc,
-        "is_gerant_majoritaire": is_gerant_majoritaire,
-        "autoriser_remboursement_cca": autoriser_remboursement_cca # Ajout du nouveau paramètre
-    }
-
-    # --- Lancement de la simulation ---
-    projection_data = generer_projection_sci_is(params)
-
-    # --- Affichage des résultats ---
-    if not projection_data:
-        st.warning("Aucune donnée générée. Vérifiez les paramètres.")
-    elif "erreur" in projection_data[0]:
-        st.error(f"Erreur dans le calcul : {projection_data[0]['erreur']}")
-    else:
-        df = pd.DataFrame(projection_data)
-        
-        # --- Formatage et Style du DataFrame ---
-        colonnes_euro = [
-            "Loyers Annuels", "Résultat Exploitation", "IS Exploitation", 
-            "Cash-flow Investisseur", "Tréso. SCI", "Solde CCA", "PV Imposable", 
-            "IS sur PV", "Bénéfice Net (Immeuble)", "Bénéfice Net (Parts)"
-        ]
-        colonnes_pc = ["TRI (Immeuble) (%)", "TRI (Parts) (%)"]
-        
-        format_dict = {col: "€ {:,.0f}" for col in colonnes_euro}
-        format_dict.update({col: "{:.1f} %" for col in colonnes_pc})
-        
-        def style_special_rows(row):
-            """Met en surbrillance les lignes 'An X' et 'Séparateur'."""
-            style = [''] * len(row)
-            if str(row['Année']).startswith('An'):
-                style = ['background-color: #E8F5E9; font-weight: bold;'] * len(row)
-            elif pd.isna(row['Année']):
-                # Crée une ligne de séparation visuelle
-                style = ['background-color: #f0f2f6; color: #f0f2f6; border-top: 1px solid #ddd; border-bottom: 1px solid #ddd;'] * len(row)
-            return style
-
-        st.subheader("Projection Financière Annuelle & Scénarios de Sortie")
-        st.dataframe(
-            df.style.apply(style_special_rows, axis=1)
-                    .format(format_dict, na_rep="---"), # Applique format € et %
-            use_container_width=True, # Occupe toute la largeur
-            height=(35 * (len(df) + 1)) + 2 # Hauteur dynamique
-        )
-
-        # --- Glossaire des colonnes ---
-        st.subheader("Glossaire des Colonnes")
-        with st.expander("Cliquez pour afficher les définitions des colonnes"):
-            for col_name, description in descriptions_calcul.items():
-                st.markdown(f"**{col_name}** : {description}")
-
-if __name__ == "__main__":
-    main()
+# simulateur_sci_is_v19_streamlit_cca_switch.py
+#
+# Pour l'exécuter :
+# 1. Assurez-vous d'avoir les bibliothèques :
+#    pip install streamlit pandas numpy numpy-financial
+# 2. Lancez depuis votre terminal :
+#    streamlit run streamlit_app_v19.py
+#
+# Le moteur de calcul est dans le paquet moteur_sci (importable sans Streamlit,
+# runner batch : python -m moteur_sci --help). Ce fichier ne contient que l'interface.
+
+import io
+import uuid
+
+import streamlit as st
+import pandas as pd
+import numpy as np
+
+from moteur_sci import (
+    BAREMES_FISCAUX, COLONNE_POST_CREDIT, COLONNES_MONTE_CARLO, COLONNES_SENSIBILITE, COLONNES_STATUT_TRI,
+    CONTRAINTES_CIBLE, ETAT_TACHE_ANNULEE, ETAT_TACHE_ERREUR, HYPOTHESES_MONTE_CARLO, LIBELLES_PARAMETRES,
+    LIBELLES_STATUT_CIBLE, OBJECTIFS_OPTIMISATION, PARAMETRES_CIBLE, PERCENTILES_MONTE_CARLO, STATUT_CIBLE_JAMAIS_ATTEINTE,
+    RETENTION_PROJECTIONS_S, STATUT_CIBLE_OK, STATUT_TRI_OK, TYPES_SORTIE, VERSION_FISCALE_DEFAUT,
+    VOLATILITES_MONTE_CARLO_DEFAUT, calculer_avec_cache, comparer_versions_fiscales, compter, decouper_grille_sensibilite,
+    decouper_monte_carlo, decouper_valeur_cible, exporter_mesures, gestionnaire_taches, instrumenter, mesurer,
+    optimiser_sortie, rechercher_valeur_cible, releve_mesures, sans_decoupage, statistiques_caches, stock_scenarios,
+    vider_caches,
+)
+from moteur_sci.cli import lire_scenarios
+
+# --- Dictionnaire des descriptions (Inchangé) ---
+descriptions_calcul = {
+    "Année": "L'année de la simulation. La première année post-crédit est mise en surbrillance (rendu détaillé).",
+    "Post-crédit": "Coché pour les années postérieures à la fin du prêt (rendu rapide).",
+    "Loyers Annuels": "Total des loyers bruts perçus, après déduction de la vacance locative.",
+    "Résultat Exploitation": "Base de calcul de l'IS : Loyers - Toutes les charges déductibles (y compris intérêts, assurances, hors provision gros travaux) - Amortissements.",
+    "IS Exploitation": "Impôt sur les Sociétés payé par la SCI sur son Résultat d'Exploitation (15%/25%).",
+    "Cash-flow Investisseur": "Argent net reçu par l'investisseur : (Remboursement de CCA) + (Dividendes versés - Impôts sur dividendes) - (Abondement en CCA).",
+    "Tréso. SCI": "Trésorerie restante dans la SCI en fin d'année après toutes opérations (charges, IS, distrib...).",
+    "Solde CCA": "Solde du Compte Courant d'Associé. Ce que la SCI vous 'doit'. Augmente avec les apports/abondements, diminue avec les remboursements.",
+    "PV Imposable": "Plus-value professionnelle (Vente Immeuble) : Prix de Vente - Valeur Nette Comptable (VNC).",
+    "IS sur PV": "Part de l'Impôt sur les Sociétés (IS) attribuable à la Plus-Value (Vente Immeuble).",
+    "Bénéfice Net (Immeuble)": "Enrichissement net final (Vente Immeuble) : (Total Cash Reçu) - (Total Cash Investi). Inclut le boni de liquidation taxé.",
+    "TRI (Immeuble) (%)": "Taux de Rentabilité Interne de la stratégie 'Vente Immeuble' (Asset Deal). '---' si le TRI n'a pas de solution.",
+    "Bénéfice Net (Parts)": "Enrichissement net final (Vente des Parts) : (Total Cash Reçu) - (Total Cash Investi).",
+    "TRI (Parts) (%)": "Taux de Rentabilité Interne de la stratégie 'Vente des Parts' (Share Deal). Fiscalité des particuliers. '---' si le TRI n'a pas de solution."
+}
+
+# --- RENDU DES TABLEAUX ---
+# Formats par type de colonne : (pandas Styler, format natif printf de st.column_config)
+FORMATS_COLONNES = {
+    "euro": ("€ {:,.0f}", "€ %,.0f"),
+    "pourcentage": ("{:.1f} %", "%.1f %%"),
+}
+TAILLE_PAGE_TABLEAU = 50 # Lignes envoyées au navigateur par page (rendu rapide)
+HAUTEUR_LIGNE_TABLEAU = 35
+STYLE_SURBRILLANCE = 'background-color: #E8F5E9; font-weight: bold; border-top: 2px solid #ddd;'
+
+@instrumenter("app.rendu_tableau")
+def afficher_tableau(df, formats, cle, colonne_surbrillance=None):
+    """
+    Affiche `df` avec `formats` ({colonne: "euro" | "pourcentage"}).
+    - Rendu rapide (défaut) : formatage natif par colonne, sans Styler ; les tableaux longs
+      sont paginés et seule la page affichée est envoyée. `colonne_surbrillance` (booléenne)
+      reste affichée en case à cocher.
+    - Rendu détaillé : Styler pandas sur toutes les lignes, "---" pour les valeurs manquantes,
+      1ère ligne vraie de `colonne_surbrillance` mise en surbrillance.
+    """
+    formats = {col: type_format for col, type_format in formats.items() if col in df.columns}
+    compter("app.lignes_tableaux", len(df))
+    if not st.session_state.get("rendu_rapide", True):
+        if colonne_surbrillance is not None:
+            marque = df[colonne_surbrillance].to_numpy()
+            style_lignes = np.where(marque & ~np.r_[False, marque[:-1]], STYLE_SURBRILLANCE, '')
+            df = df.drop(columns=[colonne_surbrillance])
+        styler = df.style.format({col: FORMATS_COLONNES[f][0] for col, f in formats.items()}, na_rep="---")
+        if colonne_surbrillance is not None:
+            styler = styler.apply(lambda colonne: style_lignes, axis=0)
+        st.dataframe(styler, use_container_width=True, height=HAUTEUR_LIGNE_TABLEAU * (len(df) + 1) + 2)
+        return
+
+    nb_pages = max(1, -(-len(df) // TAILLE_PAGE_TABLEAU))
+    page = 1
+    if nb_pages > 1:
+        page = st.number_input(f"Page (sur {nb_pages})", min_value=1, max_value=nb_pages, value=1, step=1, key=f"page_{cle}")
+    page_df = df.iloc[(page - 1) * TAILLE_PAGE_TABLEAU:page * TAILLE_PAGE_TABLEAU]
+    config = {col: st.column_config.NumberColumn(format=FORMATS_COLONNES[f][1]) for col, f in formats.items()}
+    if colonne_surbrillance is not None:
+        config[colonne_surbrillance] = st.column_config.CheckboxColumn()
+    st.dataframe(page_df, column_config=config, use_container_width=True,
+                 height=HAUTEUR_LIGNE_TABLEAU * (len(page_df) + 1) + 3)
+
+# --- CALCULS EN ARRIÈRE-PLAN ---
+DELAI_RAFRAICHISSEMENT_S = 0.5 # Rafraîchissement de la progression et des résultats partiels
+
+def groupe_taches(section):
+    """Identifiant du demandeur d'une tâche : session Streamlit + section de la page."""
+    if "id_session" not in st.session_state:
+        st.session_state["id_session"] = uuid.uuid4().hex
+    return f"{st.session_state['id_session']}:{section}"
+
+def afficher_tache(section, nom, decouper, *args, rendu, **kwargs):
+    """
+    Soumet le calcul au gestionnaire de tâches (pool de processus) sans bloquer la page :
+    tant qu'il tourne, un fragment rafraîchit la progression et rend le résultat partiel
+    (`rendu(resultat, partiel=True)`), puis relance la page une fois le calcul terminé.
+    La tâche précédente de la section est annulée si ses paramètres ont changé. Une tâche
+    en erreur n'est pas relancée tant que ses paramètres ne changent pas.
+    """
+    tache = gestionnaire_taches().soumettre(nom, decouper, *args, groupe=groupe_taches(section), **kwargs)
+    en_arriere_plan = not tache.terminee
+
+    def afficher():
+        if tache.terminee and en_arriere_plan:
+            st.rerun() # Fin du rafraîchissement périodique (terminée, en erreur ou annulée)
+        if tache.etat == ETAT_TACHE_ERREUR:
+            st.error(f"Erreur dans le calcul : {tache.erreur}")
+            return
+        if tache.etat == ETAT_TACHE_ANNULEE:
+            return
+        if not tache.terminee:
+            st.progress(tache.progression, text=f"Calcul en cours... {tache.progression:.0%}")
+        resultat = tache.resultat_partiel()
+        if resultat is not None:
+            rendu(resultat, partiel=not tache.terminee)
+
+    st.fragment(afficher, run_every=DELAI_RAFRAICHISSEMENT_S if en_arriere_plan else None)()
+
+# --- INTERFACE GRAPHIQUE STREAMLIT ---
+def afficher_comparaison_fiscale(params, versions):
+    """Section 'Comparaison des barèmes' : indicateurs clés du dossier sous deux versions fiscales."""
+    st.subheader("Comparaison des Barèmes Fiscaux")
+    colonnes = ["IS Exploitation", "Bénéfice Net (Immeuble)", "Bénéfice Net (Parts)", "TRI (Parts) (%)"]
+    comparaison = calculer_avec_cache("comparaison_fiscale", comparer_versions_fiscales, params, versions, colonnes)
+    formats = {col: ("pourcentage" if "%" in col else "euro") for col in comparaison.columns}
+    afficher_tableau(comparaison, formats, "comparaison_fiscale")
+
+def afficher_sensibilite(params):
+    """Section 'Sensibilité 2D' : choix des deux axes, grille et carte de chaleur."""
+    st.subheader("Sensibilité 2D")
+    parametres = list(LIBELLES_PARAMETRES)
+    col_x, col_y = st.columns(2)
+    axes = []
+    for colonne_ui, nom_axe, defaut in ((col_x, "X", "taux_interet_pret"), (col_y, "Y", "prix_achat")):
+        with colonne_ui:
+            param = st.selectbox(f"Paramètre {nom_axe}", parametres, index=parametres.index(defaut),
+                                 format_func=LIBELLES_PARAMETRES.get, key=f"sensibilite_param_{nom_axe}")
+            valeur = float(params.get(param, 0))
+            bas = st.number_input(f"Min {nom_axe}", value=valeur * 0.8 if valeur else 0.0, key=f"sensibilite_min_{nom_axe}_{param}")
+            haut = st.number_input(f"Max {nom_axe}", value=valeur * 1.2 if valeur else 1.0, key=f"sensibilite_max_{nom_axe}_{param}")
+            nb_points = st.slider(f"Points {nom_axe}", min_value=5, max_value=60, value=50, key=f"sensibilite_points_{nom_axe}")
+            axes.append((param, np.linspace(bas, haut, nb_points)))
+    (param_x, valeurs_x), (param_y, valeurs_y) = axes
+    if param_x == param_y:
+        st.warning("Choisissez deux paramètres différents.")
+        return
+
+    col_indicateur, col_annee = st.columns(2)
+    colonne = col_indicateur.selectbox("Indicateur", COLONNES_SENSIBILITE, index=COLONNES_SENSIBILITE.index("TRI (Parts) (%)"))
+    annee_max = max(1, int(params.get("duree_pret", 1))) + 25
+    annee = col_annee.slider("Année de sortie", min_value=1, max_value=annee_max, value=min(annee_max, max(1, int(params.get("duree_pret", 1)))))
+
+    def rendu(grille, partiel):
+        afficher_carte_sensibilite(grille, param_x, param_y, colonne)
+
+    afficher_tache("sensibilite", "sensibilite", decouper_grille_sensibilite,
+                   params, param_x, valeurs_x, param_y, valeurs_y, colonne, annee, rendu=rendu)
+
+def afficher_carte_sensibilite(grille, param_x, param_y, colonne):
+    """Carte de chaleur de la grille (lignes encore en calcul : cellules vides)."""
+    import altair as alt # Dépendance de Streamlit, importée à la demande
+
+    grille_x, grille_y = np.meshgrid(grille.columns.to_numpy(), grille.index.to_numpy())
+    donnees = pd.DataFrame({param_x: grille_x.ravel(), param_y: grille_y.ravel(), "valeur": grille.to_numpy().ravel()})
+    carte = alt.Chart(donnees).mark_rect().encode(
+        x=alt.X(f"{param_x}:O", title=LIBELLES_PARAMETRES[param_x], axis=alt.Axis(format=",.2f", labelOverlap=True)),
+        y=alt.Y(f"{param_y}:O", title=LIBELLES_PARAMETRES[param_y], sort="descending", axis=alt.Axis(format=",.2f", labelOverlap=True)),
+        color=alt.Color("valeur:Q", title=colonne, scale=alt.Scale(scheme="redyellowgreen", reverse=colonne == "Abondement Cumulé")),
+        tooltip=[alt.Tooltip(f"{param_x}:Q", format=",.2f"), alt.Tooltip(f"{param_y}:Q", format=",.2f"),
+                 alt.Tooltip("valeur:Q", title=colonne, format=",.2f")],
+    )
+    st.altair_chart(carte, use_container_width=True)
+
+def afficher_monte_carlo(params, options):
+    """Section 'Analyse de risque' : bandes de percentiles et probabilité d'abondement."""
+    st.subheader("Analyse de Risque - Monte Carlo")
+
+    def rendu(resultats_mc, partiel):
+        col_proba, col_sims = st.columns(2)
+        col_proba.metric("Probabilité d'au moins un abondement en CCA", f"{resultats_mc['proba_abondement_totale']:.1%}")
+        col_sims.metric("Simulations", f"{resultats_mc['nb_simulations']:,}" +
+                        (f" / {options['nb_simulations']:,}" if partiel else ""))
+        afficher_resultats_monte_carlo(resultats_mc)
+
+    afficher_tache("monte_carlo", "monte_carlo", decouper_monte_carlo, params, rendu=rendu, **options)
+
+def afficher_resultats_monte_carlo(resultats_mc):
+    """Bandes de percentiles de l'indicateur choisi et probabilité d'abondement par année."""
+    colonne = st.selectbox("Indicateur", COLONNES_MONTE_CARLO)
+    bandes = resultats_mc["percentiles"][[f"{colonne} P{p}" for p in PERCENTILES_MONTE_CARLO]]
+    bandes.columns = [f"P{p}" for p in PERCENTILES_MONTE_CARLO]
+    st.line_chart(bandes)
+    st.caption("Probabilité d'un abondement en CCA par année")
+    st.bar_chart(resultats_mc["proba_abondement"])
+
+def afficher_optimisation(params, options):
+    """Section 'Optimisation de la sortie' : meilleure combinaison et classement des candidats."""
+    st.subheader("Optimisation de la Sortie")
+    afficher_tache("optimisation", "optimisation", sans_decoupage(optimiser_sortie), params,
+                   rendu=afficher_resultats_optimisation, **options)
+
+def afficher_resultats_optimisation(resultats_opt, partiel):
+    """Meilleure combinaison et classement des candidats."""
+    meilleur = resultats_opt["meilleur"]
+    if meilleur is None:
+        st.warning("Aucune combinaison ne respecte les contraintes d'abondement.")
+        return
+
+    col_annee, col_tri, col_benefice = st.columns(3)
+    col_annee.metric("Sortie optimale", f"An {meilleur['Année de sortie']} - {meilleur['Type de sortie']}")
+    col_tri.metric("TRI", f"{meilleur['TRI (%)']:.1f} %")
+    col_benefice.metric("Bénéfice net", f"€ {meilleur['Bénéfice net']:,.0f}")
+    st.caption(f"Taux distrib. {meilleur['Taux distrib. (%)']:.0f} % - "
+               f"remboursement CCA {'autorisé' if meilleur['Remboursement CCA'] else 'bloqué'} - "
+               f"capital social € {meilleur['Capital social']:,.0f} / apport en CCA € {meilleur['Apport en CCA']:,.0f} "
+               f"({resultats_opt['nb_evaluations']:,} combinaisons évaluées)")
+
+    formats = {col: "euro" for col in ["Capital social", "Apport en CCA", "Bénéfice net",
+                                       "Abondement max annuel", "Abondement cumulé"]}
+    formats.update({"Taux distrib. (%)": "pourcentage", "TRI (%)": "pourcentage"})
+    afficher_tableau(resultats_opt["classement"], formats, "optimisation")
+
+def afficher_valeur_cible(params, options):
+    """Section 'Valeur cible' : valeur limite du paramètre pour le dossier, puis pour une liste d'annonces (CSV)."""
+    st.subheader("Recherche de Valeur Cible")
+    parametre = options["parametre"]
+    resultat = calculer_avec_cache("valeur_cible", rechercher_valeur_cible, [params], **options)
+    statut, valeur = int(resultat["statut"][0]), float(resultat["valeur"][0])
+    if statut == STATUT_CIBLE_OK:
+        sens = "minimum" if resultat["minimum"][0] else "maximum"
+        st.metric(f"{PARAMETRES_CIBLE.get(parametre, parametre)} {sens}", f"€ {valeur:,.0f}",
+                  delta=f"€ {valeur - params[parametre]:,.0f} par rapport à la saisie", delta_color="off")
+    elif statut == STATUT_CIBLE_JAMAIS_ATTEINTE:
+        st.warning("Contrainte jamais respectée sur l'intervalle de recherche (de 0 à un plafond dépendant du dossier).")
+    else:
+        st.success("Contrainte respectée sur tout l'intervalle de recherche (de 0 à un plafond dépendant du dossier).")
+
+    fichier = st.file_uploader(
+        "Liste d'annonces (CSV)", type="csv", key="annonces_cible",
+        help="Une ligne par annonce, colonnes = noms des paramètres du moteur (ex. prix_achat, loyer_mensuel) "
+             "et 'id' optionnel. Les colonnes absentes reprennent les valeurs saisies.")
+    if fichier is None:
+        gestionnaire_taches().abandonner(groupe_taches("valeur_cible"))
+        return
+    try:
+        annonces = list(lire_scenarios(io.StringIO(fichier.getvalue().decode("utf-8-sig")), "csv"))
+    except ValueError as erreur_lecture:
+        st.error(f"Fichier d'annonces invalide : {erreur_lecture}")
+        return
+    identifiants = [annonce.pop("id") for annonce in annonces]
+    dossiers = [{**params, **annonce} for annonce in annonces]
+
+    def rendu(resultats, partiel):
+        libelle = PARAMETRES_CIBLE.get(parametre, parametre)
+        tableau = pd.DataFrame({
+            "Annonce": identifiants,
+            f"{libelle} (saisi)": [dossier[parametre] for dossier in dossiers],
+            f"{libelle} (limite)": resultats["valeur"],
+            "Sens": np.where(resultats["minimum"], "minimum", "maximum"),
+            "Statut": [LIBELLES_STATUT_CIBLE[code] for code in resultats["statut"]],
+        }).set_index("Annonce")
+        st.caption(f"{len(dossiers):,} annonces - {resultats['nb_evaluations']:,} projections évaluées")
+        afficher_tableau(tableau, {f"{libelle} (saisi)": "euro", f"{libelle} (limite)": "euro"}, "valeur_cible")
+        if not partiel:
+            st.download_button("Télécharger (CSV)", tableau.to_csv().encode("utf-8"),
+                               file_name="valeurs_cibles.csv", mime="text/csv")
+
+    afficher_tache("valeur_cible", "valeur_cible_annonces", decouper_valeur_cible, dossiers, rendu=rendu, **options)
+
+def libelle_version_fiscale(version):
+    """Libellé d'un barème : années d'imposition couvertes et seuil du taux réduit d'IS."""
+    suivante = min((annee for annee in BAREMES_FISCAUX if annee > version), default=None)
+    if suivante is None:
+        periode = f"{version} et après"
+    elif suivante - 1 == version:
+        periode = str(version)
+    else:
+        periode = f"{version} à {suivante - 1}"
+    return f"{periode} (seuil IS réduit € {BAREMES_FISCAUX[version].seuil_is_taux_reduit:,.0f})"
+
+def charger_scenario(nom):
+    """Recopie les paramètres du scénario `nom` dans les champs de saisie (callback, avant le rendu)."""
+    params = stock_scenarios().charger_scenario(nom)
+    if params is not None:
+        version = params.get("version_fiscale")
+        if version is not None and version not in BAREMES_FISCAUX:
+            # Année sans barème propre (ex. ancienne clé 2023) : barème en vigueur cette année-là
+            applicables = [annee for annee in BAREMES_FISCAUX if annee <= version]
+            params = {**params, "version_fiscale": max(applicables) if applicables else VERSION_FISCALE_DEFAUT}
+        st.session_state.update(params)
+
+def afficher_scenarios_enregistres(params):
+    """Enregistrement / rechargement de scénarios nommés (stock SQLite local, sidebar)."""
+    stock = stock_scenarios()
+    with st.sidebar.expander("Scénarios enregistrés 💾"):
+        nom = st.text_input("Nom du scénario", key="nom_scenario")
+        st.button("Enregistrer", disabled=not nom.strip(),
+                  on_click=lambda: stock.enregistrer_scenario(nom.strip(), params))
+        noms = [nom_enregistre for nom_enregistre, _ in stock.lister_scenarios()]
+        if not noms:
+            st.caption("Aucun scénario enregistré.")
+            return False
+        choix = st.selectbox("Scénario", noms, key="scenario_choisi")
+        colonne_charger, colonne_supprimer = st.columns(2)
+        colonne_charger.button("Charger", on_click=charger_scenario, args=(choix,))
+        colonne_supprimer.button("Supprimer", on_click=stock.supprimer_scenario, args=(choix,))
+        return st.checkbox("Synthèse des scénarios", value=False,
+                           help="Indicateurs de fin de projection de tous les scénarios enregistrés.")
+
+def afficher_synthese_scenarios():
+    """Indicateurs de la dernière année de chaque scénario enregistré (lecture groupée du stock)."""
+    lignes = []
+    for nom, projection in stock_scenarios().projeter_scenarios().items():
+        derniere = {col: projection[col][-1] for col in
+                    ["TRI (Immeuble) (%)", "TRI (Parts) (%)", "Bénéfice Net (Immeuble)", "Bénéfice Net (Parts)"]}
+        lignes.append({"Scénario": nom, "Années": len(projection), **derniere})
+    st.subheader("Synthèse des Scénarios Enregistrés")
+    formats = {col: "euro" for col in ["Bénéfice Net (Immeuble)", "Bénéfice Net (Parts)"]}
+    formats.update({col: "pourcentage" for col in ["TRI (Immeuble) (%)", "TRI (Parts) (%)"]})
+    afficher_tableau(pd.DataFrame(lignes).set_index("Scénario"), formats, "synthese_scenarios")
+
+def afficher_statistiques_cache():
+    """Compteurs du cache de résultats et du stock disque, éviction manuelle (sidebar)."""
+    with st.sidebar.expander("Cache de calcul"):
+        for nom, stats in statistiques_caches().items():
+            st.caption(f"**{nom}** : {stats['taille']}/{stats['taille_max']} entrées - "
+                       f"{stats['hits']} hits / {stats['misses']} misses ({stats['taux_hit']:.0%}) - "
+                       f"{stats['evictions']} évictions")
+        stats = stock_scenarios().statistiques()
+        st.caption(f"**Stock disque** : {stats['projections']} projections, {stats['scenarios']} scénarios - "
+                   f"{stats['hits']} hits / {stats['misses']} misses ({stats['taux_hit']:.0%}) - "
+                   f"moteur {stats['version_moteur']}")
+        stats = gestionnaire_taches().statistiques()
+        st.caption(f"**Tâches** : {stats['en_cours']} en cours, {stats['en_erreur']} en erreur, {stats['soumises']} soumises, "
+                   f"{stats['annulees']} annulées - {stats['nb_processus']} processus")
+        if st.button("Vider le cache"):
+            vider_caches()
+        if st.button("Purger les projections obsolètes", help="Projections d'autres versions du moteur, "
+                     f"calculées il y a plus de {RETENTION_PROJECTIONS_S / 86400:.0f} jours."):
+            st.caption(f"{stock_scenarios().purger_projections_obsoletes()} projections supprimées.")
+
+def main():
+    st.set_page_config(layout="wide", page_title="Simulateur SCI à l'IS")
+    st.title("Simulateur d'Investissement - SCI à l'IS (v19) 📈")
+    
+    # --- Panneau Latéral (Sidebar) pour les entrées ---
+    st.sidebar.title("Paramètres d'Entrée")
+    
+    with st.sidebar:
+        st.subheader("Projet & Financement 🏦")
+        prix_achat = st.number_input("Prix d'achat", min_value=0.0, value=200000.0, step=5000.0, format="%.0f", key="prix_achat")
+        cout_travaux = st.number_input("Coût travaux", min_value=0.0, value=30000.0, step=1000.0, format="%.0f", key="cout_travaux")
+        valeur_meubles = st.number_input("Valeur meubles", min_value=0.0, value=15000.0, step=500.0, format="%.0f", key="valeur_meubles")
+        frais_notaire = st.number_input("Frais notaire", min_value=0.0, value=16000.0, step=500.0, format="%.0f", key="frais_notaire")
+        frais_dossier = st.number_input("Frais dossier", min_value=0.0, value=1500.0, step=100.0, format="%.0f", key="frais_dossier")
+        capital_social = st.number_input("Capital social", min_value=0.0, value=1000.0, step=100.0, format="%.0f", key="capital_social")
+        apport_personnel = st.number_input("Apport en CCA initial", min_value=0.0, value=20000.0, step=1000.0, format="%.0f", key="apport_personnel")
+        duree_pret = st.number_input("Durée prêt (années)", min_value=1, max_value=30, value=20, step=1, format="%d", key="duree_pret")
+        taux_interet_pret = st.number_input("Taux intérêt prêt (%)", min_value=0.0, value=3.5, step=0.1, format="%.2f", key="taux_interet_pret")
+        taux_assurance_pret = st.number_input("Taux assurance prêt (%)", min_value=0.0, value=0.34, step=0.01, format="%.2f", key="taux_assurance_pret")
+
+        # Affichage dynamique du montant du prêt
+        montant_pret_calcule = prix_achat + cout_travaux + frais_notaire - apport_personnel - capital_social
+        st.metric(label="Montant du Prêt Calculé", value=f"{montant_pret_calcule:,.2f} €")
+
+        st.subheader("Exploitation & Charges 🧾")
+        loyer_mensuel = st.number_input("Loyer mensuel", min_value=0.0, value=1200.0, step=50.0, format="%.0f", key="loyer_mensuel")
+        taux_occupation_pc = st.number_input("Taux d'occupation (%)", min_value=0.0, max_value=100.0, value=95.0, step=1.0, format="%.0f", key="taux_occupation_pc")
+        charges_copro = st.number_input("Charges copro (mensuelles)", min_value=0.0, value=100.0, step=10.0, format="%.0f", key="charges_copro")
+        taxe_fonciere = st.number_input("Taxe foncière (annuelle)", min_value=0.0, value=1000.0, step=50.0, format="%.0f", key="taxe_fonciere")
+        frais_gestion_pc = st.number_input("Frais gestion (%)", min_value=0.0, max_value=100.0, value=7.0, step=0.5, format="%.1f", key="frais_gestion_pc")
+        taux_gli_pc = st.number_input("Taux GLI (%)", min_value=0.0, max_value=100.0, value=3.5, step=0.1, format="%.1f", key="taux_gli_pc")
+        assurance_pno = st.number_input("Assurance PNO (annuelle)", min_value=0.0, value=200.0, step=10.0, format="%.0f", key="assurance_pno")
+        cfe = st.number_input("CFE (annuelle)", min_value=0.0, value=200.0, step=10.0, format="%.0f", key="cfe")
+        provision_gros_travaux_pc = st.number_input("Prov. gros travaux (% val. bien)", min_value=0.0, value=0.5, step=0.1, format="%.2f", key="provision_gros_travaux_pc")
+
+        st.subheader("Fiscalité & Hypothèses 🧠")
+        versions_fiscales = sorted(BAREMES_FISCAUX, reverse=True)
+        version_fiscale = st.selectbox("Barème fiscal (année)", versions_fiscales, index=versions_fiscales.index(VERSION_FISCALE_DEFAUT),
+                                       format_func=libelle_version_fiscale, key="version_fiscale")
+        version_comparee = st.selectbox("Comparer avec le barème", ["Aucun"] + [v for v in versions_fiscales if v != version_fiscale],
+                                        format_func=lambda v: v if v == "Aucun" else libelle_version_fiscale(v))
+        duree_amort_immo = st.number_input("Durée amort. immo (ans)", min_value=1, value=30, step=1, format="%d", key="duree_amort_immo")
+        duree_amort_travaux = st.number_input("Durée amort. travaux (ans)", min_value=1, value=15, step=1, format="%d", key="duree_amort_travaux")
+        duree_amort_meubles = st.number_input("Durée amort. meubles (ans)", min_value=1, value=7, step=1, format="%d", key="duree_amort_meubles")
+        part_terrain_pc = st.number_input("Part terrain (%)", min_value=0.0, max_value=100.0, value=15.0, step=1.0, format="%.0f", key="part_terrain_pc")
+        taux_distrib_pc = st.number_input("Taux distrib. dividendes (%)", min_value=0.0, max_value=100.0, value=100.0, step=5.0, format="%.0f", key="taux_distrib_pc")
+        inflation_pc = st.number_input("Inflation (%)", min_value=0.0, value=2.0, step=0.1, format="%.1f", key="inflation_pc")
+        revalo_bien_pc = st.number_input("Revalo. bien (%)", min_value=0.0, value=3.0, step=0.1, format="%.1f", key="revalo_bien_pc")
+        
+        # --- NOUVEAUX LEVIERS STRATÉGIQUES ---
+        is_gerant_majoritaire = st.checkbox("Gérant Majoritaire (impact CS)", value=False, key="is_gerant_majoritaire")
+        autoriser_remboursement_cca = st.checkbox(
+            "Autoriser remboursement CCA", 
+            value=True, 
+            help="Si décoché, la SCI garde sa trésorerie pour capitaliser au lieu de rembourser l'apport de l'associé.",
+            key="autoriser_remboursement_cca"
+        )
+
+        # --- Analyses avancées ---
+        st.subheader("Analyses Avancées 🔬")
+        mode_sensibilite = st.checkbox("Sensibilité 2D (carte de chaleur)", value=False,
+                                       help="Fait varier deux paramètres sur une grille et affiche l'indicateur choisi à une année de sortie.")
+        mode_optimisation = st.checkbox("Optimiseur de sortie", value=False,
+                                        help="Cherche l'année et le type de sortie, le taux de distribution, le remboursement du CCA et la répartition capital / CCA qui maximisent l'objectif.")
+        options_optimisation = None
+        if mode_optimisation:
+            objectif = st.selectbox("Objectif", list(OBJECTIFS_OPTIMISATION))
+            plafonner_abondement = st.checkbox("Plafonner l'abondement annuel", value=False)
+            abondement_max = None
+            if plafonner_abondement:
+                abondement_max = st.number_input("Abondement annuel max", min_value=0.0, value=5000.0, step=500.0, format="%.0f")
+            options_optimisation = {"objectif": objectif, "abondement_max": abondement_max}
+
+        mode_cible = st.checkbox("Recherche de valeur cible", value=False,
+                                 help="Cherche la valeur limite d'un paramètre (loyer d'équilibre, prix maximum, apport minimum) qui respecte une contrainte, pour ce dossier ou une liste d'annonces.")
+        options_cible = None
+        if mode_cible:
+            parametre_cible = st.selectbox("Paramètre cherché", list(PARAMETRES_CIBLE), format_func=PARAMETRES_CIBLE.get)
+            contrainte = st.selectbox("Contrainte", list(CONTRAINTES_CIBLE), format_func=CONTRAINTES_CIBLE.get)
+            options_cible = {"parametre": parametre_cible, "contrainte": contrainte}
+            if contrainte == "tri":
+                options_cible.update({
+                    "tri_cible": st.number_input("TRI cible (%)", value=6.0, step=0.5, format="%.1f"),
+                    "annee": st.number_input("Année de sortie", min_value=1, max_value=80, value=max(1, int(duree_pret)), step=1, format="%d"),
+                    "type_sortie": st.selectbox("Type de sortie", TYPES_SORTIE, index=TYPES_SORTIE.index("Parts")),
+                })
+
+        # --- Analyse de risque (Monte Carlo) ---
+        st.subheader("Analyse de Risque 🎲")
+        mode_monte_carlo = st.checkbox("Mode Monte Carlo", value=False,
+                                       help="Tire des trajectoires annuelles d'inflation, de revalorisation et d'occupation, et un taux de prêt, autour des valeurs saisies.")
+        options_monte_carlo = None
+        if mode_monte_carlo:
+            nb_simulations = st.number_input("Nombre de simulations", min_value=1000, max_value=100000, value=10000, step=1000, format="%d")
+            volatilites = {
+                "inflation_pc": st.number_input("Écart-type inflation (pts)", min_value=0.0, value=VOLATILITES_MONTE_CARLO_DEFAUT["inflation_pc"], step=0.1, format="%.2f"),
+                "revalo_bien_pc": st.number_input("Écart-type revalo. (pts)", min_value=0.0, value=VOLATILITES_MONTE_CARLO_DEFAUT["revalo_bien_pc"], step=0.1, format="%.2f"),
+                "taux_occupation_pc": st.number_input("Écart-type occupation (pts)", min_value=0.0, value=VOLATILITES_MONTE_CARLO_DEFAUT["taux_occupation_pc"], step=0.5, format="%.1f"),
+                "taux_interet_pret": st.number_input("Écart-type taux prêt (pts)", min_value=0.0, value=VOLATILITES_MONTE_CARLO_DEFAUT["taux_interet_pret"], step=0.05, format="%.2f"),
+            }
+            correlation_inflation_revalo = st.slider("Corrélation inflation / revalo.", min_value=-0.9, max_value=0.9, value=0.5, step=0.1)
+            correlation = np.eye(len(HYPOTHESES_MONTE_CARLO))
+            correlation[0, 1] = correlation[1, 0] = correlation_inflation_revalo
+            graine = st.number_input("Graine aléatoire", min_value=0, value=0, step=1, format="%d")
+            options_monte_carlo = {"nb_simulations": nb_simulations, "volatilites": volatilites,
+                                   "correlation": correlation, "graine": graine}
+
+        # --- Affichage ---
+        st.subheader("Affichage 🖥️")
+        st.toggle("Rendu rapide des tableaux", value=True, key="rendu_rapide",
+                  help="Formatage natif et pagination : seule la page affichée est envoyée au navigateur. "
+                       "Désactivé : mise en forme complète (surbrillance, '---'), plus lente sur les longs tableaux.")
+        st.toggle("Panneau de diagnostic", value=False, key="diagnostic",
+                  help="Temps par étape (prêt, boucle annuelle, TRI, DataFrame, rendu) du dernier rerun "
+                       "et métriques du processus au format Prometheus.")
+        
+    # --- Collecte des paramètres pour le moteur ---
+    params = {
+        "prix_achat": prix_achat, "cout_travaux": cout_travaux, "valeur_meubles": valeur_meubles,
+        "frais_notaire": frais_notaire, "frais_dossier": frais_dossier, "capital_social": capital_social,
+        "apport_personnel": apport_personnel, "duree_pret": duree_pret, "taux_interet_pret": taux_interet_pret,
+        "taux_assurance_pret": taux_assurance_pret, "loyer_mensuel": loyer_mensuel,
+        "taux_occupation_pc": taux_occupation_pc, "charges_copro": charges_copro,
+        "taxe_fonciere": taxe_fonciere, "frais_gestion_pc": frais_gestion_pc, "taux_gli_pc": taux_gli_pc,
+        "assurance_pno": assurance_pno, "cfe": cfe, "provision_gros_travaux_pc": provision_gros_travaux_pc,
+        "duree_amort_immo": duree_amort_immo, "duree_amort_travaux": duree_amort_travaux,
+        "duree_amort_meubles": duree_amort_meubles, "part_terrain_pc": part_terrain_pc,
+        "taux_distrib_pc": taux_distrib_pc, "inflation_pc": inflation_pc, "revalo_bien_pc": revalo_bien_pc,
+        "version_fiscale": version_fiscale,
+        "is_gerant_majoritaire": is_gerant_majoritaire,
+        "autoriser_remboursement_cca": autoriser_remboursement_cca # Ajout du nouveau paramètre
+    }
+
+    synthese_scenarios = afficher_scenarios_enregistres(params)
+
+    # --- Lancement de la simulation (cache mémoire, puis stock disque partagé entre sessions) ---
+    try:
+        with mesurer("app.projection"):
+            projection = calculer_avec_cache("projection", stock_scenarios().projeter, params)
+    except ValueError as erreur_calcul:
+        projection, message_erreur = None, str(erreur_calcul)
+
+    # --- Affichage des résultats ---
+    if projection is None:
+        st.error(f"Erreur dans le calcul : {message_erreur}")
+    elif not len(projection):
+        st.warning("Aucune donnée générée. Vérifiez les paramètres.")
+    else:
+        with mesurer("app.dataframe"):
+            df = projection.vers_dataframe()
+
+        # --- Statut du solveur TRI (un TRI non résolu s'affiche "---", jamais 0%) ---
+        echecs_tri = (projection.statuts_tri != STATUT_TRI_OK).any(axis=1)
+        if echecs_tri.any():
+            annees_echec = projection.annees[echecs_tri].tolist()
+            affichage = "cellule vide" if st.session_state.get("rendu_rapide", True) else "affiché '---'"
+            st.info(f"TRI non calculable pour les années : {', '.join(str(a) for a in annees_echec)} ({affichage}).")
+        df = df.drop(columns=COLONNES_STATUT_TRI)
+
+        # --- Formatage (€ et %) et surbrillance de la 1ère année post-crédit ---
+        colonnes_euro = [
+            "Loyers Annuels", "Résultat Exploitation", "IS Exploitation", 
+            "Cash-flow Investisseur", "Tréso. SCI", "Solde CCA", "PV Imposable", 
+            "IS sur PV", "Bénéfice Net (Immeuble)", "Bénéfice Net (Parts)"
+        ]
+        colonnes_pc = ["TRI (Immeuble) (%)", "TRI (Parts) (%)"]
+        formats = {col: "euro" for col in colonnes_euro}
+        formats.update({col: "pourcentage" for col in colonnes_pc})
+
+        st.subheader("Projection Financière Annuelle & Scénarios de Sortie")
+        afficher_tableau(df, formats, "projection", colonne_surbrillance=COLONNE_POST_CREDIT)
+
+        if version_comparee != "Aucun":
+            afficher_comparaison_fiscale(params, [version_fiscale, version_comparee])
+
+        # Sections masquées : leur calcul en cours est abandonné
+        if mode_sensibilite:
+            afficher_sensibilite(params)
+        else:
+            gestionnaire_taches().abandonner(groupe_taches("sensibilite"))
+
+        if options_optimisation is not None:
+            afficher_optimisation(params, options_optimisation)
+        else:
+            gestionnaire_taches().abandonner(groupe_taches("optimisation"))
+
+        if options_cible is not None:
+            afficher_valeur_cible(params, options_cible)
+        else:
+            gestionnaire_taches().abandonner(groupe_taches("valeur_cible"))
+
+        if options_monte_carlo is not None:
+            afficher_monte_carlo(params, options_monte_carlo)
+        else:
+            gestionnaire_taches().abandonner(groupe_taches("monte_carlo"))
+
+        if synthese_scenarios:
+            afficher_synthese_scenarios()
+
+        # --- Glossaire des colonnes ---
+        st.subheader("Glossaire des Colonnes")
+        with st.expander("Cliquez pour afficher les définitions des colonnes"):
+            for col_name, description in descriptions_calcul.items():
+                st.markdown(f"**{col_name}** : {description}")
+
+    afficher_statistiques_cache()
+
+# --- DIAGNOSTIC DES PERFORMANCES ---
+def afficher_diagnostic(releve):
+    """Panneau de diagnostic : décomposition des temps du rerun et export des métriques du processus."""
+    st.subheader("Diagnostic du Rerun ⏱️")
+    st.caption(f"Rerun : {releve.duree * 1000:,.1f} ms. 'projection.boucle_annuelle' inclut 'projection.tri' ; "
+               "une projection servie par le cache n'a pas d'étapes moteur, les tâches en arrière-plan ne sont pas mesurées.")
+    if releve.etapes:
+        decomposition = pd.DataFrame(
+            [{"Étape": etape, "Appels": nb, "Total (ms)": total * 1000, "Moyenne (ms)": total * 1000 / nb,
+              "Part du rerun (%)": 100 * total / releve.duree if releve.duree else np.nan}
+             for etape, (nb, total) in releve.etapes.items()]).set_index("Étape")
+        st.dataframe(decomposition, use_container_width=True, column_config={
+            col: st.column_config.NumberColumn(format="%.2f") for col in ["Total (ms)", "Moyenne (ms)", "Part du rerun (%)"]})
+    with st.expander("Métriques du processus (format Prometheus)"):
+        texte = exporter_mesures()
+        st.code(texte, language="text")
+        st.download_button("Télécharger", texte.encode("utf-8"), file_name="metriques.prom", mime="text/plain")
+
+def executer_page():
+    """Un rerun de la page ; relevé des temps par étape si le panneau de diagnostic est demandé."""
+    diagnostic = st.session_state.get("diagnostic", False)
+    with releve_mesures(activer=diagnostic, page="simulateur") as releve:
+        main()
+    if diagnostic:
+        afficher_diagnostic(releve)
+
+if __name__ == "__main__":
+    executer_page()
@@ -0,0 +1,138 @@
+# moteur_sci : moteur de calcul du simulateur SCI à l'IS, sans dépendance à Streamlit.
+#
+# Utilisable seul (workers, scripts, CLI) :
+#    from moteur_sci import generer_projection_sci_is, generer_projection_sci_is_batch
+#    python -m moteur_sci scenarios.csv --sortie projections.csv
+#    python -m moteur_sci.benchmark   (non-régression + performances)
+#
+# Les sous-modules ne sont importés qu'au premier accès à l'un de leurs noms,
+# et pandas / numpy_financial ne sont importés que par les fonctions qui en ont besoin.
+
+import importlib
+
+# Nom public -> sous-module qui le définit
+_EXPORTS = {
+    # Fiscalité
+    "BaremeFiscal": "fiscalite",
+    "BAREMES_FISCAUX": "fiscalite",
+    "VERSION_FISCALE_DEFAUT": "fiscalite",
+    "bareme_fiscal": "fiscalite",
+    "baremes_par_scenario": "fiscalite",
+    "calculer_impot_plus_value": "fiscalite",
+    "calculer_impot_societes": "fiscalite",
+    "calculer_impot_dividendes": "fiscalite",
+    "impot_societes_batch": "fiscalite",
+    "impot_dividendes_batch": "fiscalite",
+    "impot_plus_value_batch": "fiscalite",
+    # Prêt
+    "EcheancierPret": "pret",
+    "TAILLE_CACHE_ECHEANCIERS": "pret",
+    "generer_tableau_amortissement": "pret",
+    # TRI
+    "STATUT_TRI_OK": "tri",
+    "STATUT_TRI_SANS_SOLUTION": "tri",
+    "STATUT_TRI_NON_CONVERGE": "tri",
+    "STATUT_TRI_NON_CALCULE": "tri",
+    "LIBELLES_STATUT_TRI": "tri",
+    "SolveurTRI": "tri",
+    "calculer_tri": "tri",
+    "calculer_tri_batch": "tri",
+    # Projection scalaire
+    "COLONNES_PROJECTION": "projection",
+    "COLONNES_STATUT_TRI": "projection",
+    "COLONNE_POST_CREDIT": "projection",
+    "TYPES_SORTIE": "projection",
+    "COLONNES_SORTIE": "projection",
+    "selection_sorties": "projection",
+    "ProjectionSCI": "projection",
+    "generer_projection_sci_is": "projection",
+    # Projection vectorisée
+    "PARAMETRES_DEFAUT_BATCH": "batch",
+    "generer_projection_sci_is_batch": "batch",
+    "projection_batch_vers_dataframe": "batch",
+    "comparer_versions_fiscales": "batch",
+    # Monte Carlo
+    "HYPOTHESES_MONTE_CARLO": "monte_carlo",
+    "VOLATILITES_MONTE_CARLO_DEFAUT": "monte_carlo",
+    "COLONNES_MONTE_CARLO": "monte_carlo",
+    "PERCENTILES_MONTE_CARLO": "monte_carlo",
+    "simuler_monte_carlo": "monte_carlo",
+    "decouper_monte_carlo": "monte_carlo",
+    # Sensibilité
+    "LIBELLES_PARAMETRES": "sensibilite",
+    "COLONNES_SENSIBILITE": "sensibilite",
+    "calculer_grille_sensibilite": "sensibilite",
+    "decouper_grille_sensibilite": "sensibilite",
+    # Optimisation de la sortie
+    "OBJECTIFS_OPTIMISATION": "optimisation",
+    "COLONNES_OPTIMISATION": "optimisation",
+    "optimiser_sortie": "optimisation",
+    # Recherche de valeur cible (loyer d'équilibre, prix maximum...)
+    "PARAMETRES_CIBLE": "valeur_cible",
+    "CONTRAINTES_CIBLE": "valeur_cible",
+    "STATUT_CIBLE_OK": "valeur_cible",
+    "STATUT_CIBLE_TOUJOURS_ATTEINTE": "valeur_cible",
+    "STATUT_CIBLE_JAMAIS_ATTEINTE": "valeur_cible",
+    "STATUT_CIBLE_EN_ATTENTE": "valeur_cible",
+    "LIBELLES_STATUT_CIBLE": "valeur_cible",
+    "bornes_cible": "valeur_cible",
+    "rechercher_valeur_cible": "valeur_cible",
+    "decouper_valeur_cible": "valeur_cible",
+    # Portefeuille (plusieurs biens, une SCI)
+    "PARAMETRES_DEFAUT_LOT": "portefeuille",
+    "PARAMETRES_DEFAUT_SCI": "portefeuille",
+    "COLONNES_LOTS": "portefeuille",
+    "generer_projection_portefeuille": "portefeuille",
+    # Cache
+    "CacheLRU": "cache",
+    "TAILLE_CACHE_RESULTATS": "cache",
+    "hash_parametres": "cache",
+    "calculer_avec_cache": "cache",
+    "cle_resultat": "cache",
+    "statistiques_caches": "cache",
+    "vider_caches": "cache",
+    # Calculs en arrière-plan (pool de processus, progression, annulation)
+    "ETAT_TACHE_EN_COURS": "taches",
+    "ETAT_TACHE_TERMINEE": "taches",
+    "ETAT_TACHE_ANNULEE": "taches",
+    "ETAT_TACHE_ERREUR": "taches",
+    "Tache": "taches",
+    "GestionnaireTaches": "taches",
+    "gestionnaire_taches": "taches",
+    "sans_decoupage": "taches",
+    # Stock de scénarios (SQLite) et cache persistant des projections
+    "CHEMIN_STOCK_DEFAUT": "stockage",
+    "RETENTION_PROJECTIONS_S": "stockage",
+    "StockScenarios": "stockage",
+    "stock_scenarios": "stockage",
+    "version_moteur": "stockage",
+    # Instrumentation (temps par étape, export Prometheus, journal JSON)
+    "BORNES_HISTOGRAMME_S": "instrumentation",
+    "Mesures": "instrumentation",
+    "Releve": "instrumentation",
+    "activer_instrumentation": "instrumentation",
+    "instrumentation_active": "instrumentation",
+    "mesures": "instrumentation",
+    "mesurer": "instrumentation",
+    "chronometrer": "instrumentation",
+    "instrumenter": "instrumentation",
+    "debut_mesure": "instrumentation",
+    "fin_mesure": "instrumentation",
+    "compter": "instrumentation",
+    "releve_mesures": "instrumentation",
+    "exporter_mesures": "instrumentation",
+    "ecrire_mesures": "instrumentation",
+    "configurer_journal": "instrumentation",
+}
+
+__all__ = sorted(_EXPORTS)
+
+def __getattr__(nom):
+    if nom not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {nom!r}")
+    valeur = getattr(importlib.import_module(f".{_EXPORTS[nom]}", __name__), nom)
+    globals()[nom] = valeur # Les accès suivants ne passent plus par __getattr__
+    return valeur
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
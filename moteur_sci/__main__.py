@@ -0,0 +1,7 @@
+# Point d'entrée : python -m moteur_sci [options] (voir moteur_sci/cli.py)
+
+import sys
+
+from .cli import main
+
+sys.exit(main())
@@ -0,0 +1,330 @@
+# moteur_sci/batch.py
+#
+# Moteur de projection vectorisé : n scénarios simulés en une passe NumPy.
+
+import sys
+
+import numpy as np
+
+from .fiscalite import (VERSION_FISCALE_DEFAUT, baremes_par_scenario, impot_dividendes_batch,
+                        impot_plus_value_batch, impot_societes_batch)
+from .instrumentation import instrumenter
+from .pret import generer_tableau_amortissement
+from .projection import COLONNE_POST_CREDIT, COLONNES_PROJECTION, COLONNES_STATUT_TRI, selection_sorties
+from .tri import SolveurTRI, STATUT_TRI_NON_CALCULE
+
+# --- MOTEUR DE SIMULATION VECTORISÉ (BATCH MULTI-SCÉNARIOS) ---
+# Valeurs par défaut identiques aux .get() de generer_projection_sci_is
+PARAMETRES_DEFAUT_BATCH = {
+    "prix_achat": 0, "cout_travaux": 0, "valeur_meubles": 0, "frais_notaire": 0,
+    "frais_dossier": 0, "capital_social": 0, "apport_personnel": 0, "duree_pret": 0,
+    "taux_interet_pret": 0, "taux_assurance_pret": 0, "loyer_mensuel": 0,
+    "taux_occupation_pc": 100, "charges_copro": 0, "taxe_fonciere": 0,
+    "frais_gestion_pc": 0, "taux_gli_pc": 0, "assurance_pno": 0, "cfe": 0,
+    "provision_gros_travaux_pc": 0, "duree_amort_immo": 1, "duree_amort_travaux": 1,
+    "duree_amort_meubles": 1, "part_terrain_pc": 0, "taux_distrib_pc": 100,
+    "inflation_pc": 0, "revalo_bien_pc": 0,
+    "is_gerant_majoritaire": False, "autoriser_remboursement_cca": True,
+    "version_fiscale": VERSION_FISCALE_DEFAUT,
+}
+
+def _normaliser_scenarios(scenarios, defauts=PARAMETRES_DEFAUT_BATCH):
+    """
+    Convertit les scénarios (DataFrame, liste de dicts `params` ou dict de
+    colonnes) en un dict de tableaux NumPy 1D de même longueur.
+    Les colonnes absentes prennent les valeurs de `defauts` (par défaut, celles du moteur scalaire).
+    """
+    pd = sys.modules.get("pandas") # Sans pandas chargé, l'entrée ne peut pas être un DataFrame
+    if isinstance(scenarios, (list, tuple)):
+        colonnes = {cle: [scenario.get(cle, defaut) for scenario in scenarios]
+                    for cle, defaut in defauts.items()}
+    elif pd is not None and isinstance(scenarios, pd.DataFrame):
+        colonnes = {col: scenarios[col].to_numpy() for col in scenarios.columns}
+    else:
+        colonnes = dict(scenarios)
+
+    try:
+        valeurs = {}
+        for cle, defaut in defauts.items():
+            brut = colonnes.get(cle, defaut)
+            if isinstance(defaut, bool):
+                valeurs[cle] = np.asarray(brut).astype(bool)
+            else:
+                valeurs[cle] = np.asarray(brut, dtype=float)
+        tableaux = np.broadcast_arrays(*valeurs.values())
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Paramètres de scénarios invalides : {e}") from e
+    return {cle: np.atleast_1d(t) for cle, t in zip(valeurs.keys(), tableaux)}
+
+def _trajectoire_annuelle(valeurs, n, nb_annees):
+    """
+    Met une trajectoire (scalaire, (T,), (n,) ou (n, T)) à la forme (n, nb_annees) ;
+    une trajectoire trop courte est prolongée par sa dernière valeur.
+    """
+    valeurs = np.asarray(valeurs, dtype=float)
+    if valeurs.ndim == 1 and valeurs.shape[0] == n and n != nb_annees:
+        valeurs = valeurs[:, None] # Une valeur par scénario
+    valeurs = np.atleast_2d(valeurs)
+    if valeurs.shape[1] < nb_annees:
+        valeurs = np.concatenate([valeurs, np.repeat(valeurs[:, -1:], nb_annees - valeurs.shape[1], axis=1)], axis=1)
+    return np.broadcast_to(valeurs[:, :nb_annees], (n, nb_annees))
+
+@instrumenter("batch.projection")
+def generer_projection_sci_is_batch(scenarios, trajectoires=None, annee_max=None,
+                                    annees_sortie=None, types_sortie=None):
+    """
+    Génère la projection financière de n scénarios en une seule passe NumPy.
+    Accepte un DataFrame (une ligne par scénario), une liste de dicts `params`
+    ou un dict {paramètre: tableau}. Reproduit generer_projection_sci_is
+    année par année, vectorisé sur l'axe des scénarios.
+
+    Retourne un dict :
+      - "Année" : tableau (T,) des années 1..T (T = horizon le plus long),
+      - "Horizon" : tableau (n,) de la dernière année simulée par scénario,
+      - "Durée prêt" : tableau (n,), la 1ère année post-crédit est "Durée prêt" + 1,
+      - une entrée par colonne de la projection, de forme (n, T),
+        à NaN au-delà de l'horizon du scénario (et pour les TRI non résolus),
+      - "Statut TRI (Immeuble)" / "Statut TRI (Parts)" : codes STATUT_TRI_* (n, T).
+
+    `trajectoires` (optionnel) remplace les hypothèses constantes par des valeurs
+    annuelles (n, T) en % : "inflation_pc", "revalo_bien_pc", "taux_occupation_pc"
+    (valeur de l'année t appliquée à l'année t). Utilisé par le mode Monte Carlo.
+    Sortie supplémentaire : "Abondement" (n, T), apport en CCA exigé chaque année.
+    `annee_max` (optionnel) arrête la simulation à cette année (T <= annee_max).
+    `annees_sortie` / `types_sortie` (optionnels) limitent l'évaluation des scénarios de
+    sortie (VNC, IS sur PV, liquidation, PV sur parts, TRI) à ces années et à ces types
+    (TYPES_SORTIE) ; les sorties non évaluées valent NaN, statut STATUT_TRI_NON_CALCULE.
+    Les colonnes d'exploitation sont toujours calculées.
+    """
+    annees_sortie, types_sortie = selection_sorties(annees_sortie, types_sortie)
+    v = _normaliser_scenarios(scenarios)
+    trajectoires = trajectoires or {}
+    n = v["prix_achat"].shape[0]
+
+    prix_achat = v["prix_achat"]
+    cout_travaux = v["cout_travaux"]
+    frais_notaire = v["frais_notaire"]
+    valeur_meubles = v["valeur_meubles"]
+    capital_social = v["capital_social"]
+    apport_cca = v["apport_personnel"]
+    frais_dossier = v["frais_dossier"]
+    is_gerant_majoritaire = v["is_gerant_majoritaire"]
+    autoriser_remboursement_cca = v["autoriser_remboursement_cca"]
+    bareme = baremes_par_scenario(v["version_fiscale"]) # Une version fiscale par scénario possible
+
+    cout_acquisition = prix_achat + cout_travaux
+    part_terrain_pc = v["part_terrain_pc"] / 100
+    base_amort_immo_frais = (prix_achat * (1 - part_terrain_pc)) + frais_notaire
+    base_vnc_globale = prix_achat + cout_travaux + frais_notaire + valeur_meubles
+
+    investissement_initial_personnel = apport_cca + capital_social + frais_dossier
+    montant_pret = cout_acquisition + frais_notaire - apport_cca - capital_social
+
+    duree_pret = np.trunc(v["duree_pret"]).astype(int)
+    duree_pret = np.where(duree_pret <= 0, 1, duree_pret)
+    horizon = duree_pret + 25
+    nb_annees = int(horizon.max()) if n else 0
+    if annee_max is not None:
+        nb_annees = min(nb_annees, max(1, int(annee_max)))
+
+    # Échéanciers (n, nb_annees_pret) ramenés à (n, nb_annees), complétés par des zéros
+    echeancier_pret = generer_tableau_amortissement(montant_pret, v["taux_interet_pret"], duree_pret)
+    interets_pret, principal_pret, crd_pret = (
+        np.pad(tableau[:, :nb_annees], ((0, 0), (0, max(0, nb_annees - tableau.shape[1]))))
+        for tableau in echeancier_pret)
+    mensualite_assurance = (montant_pret * (v["taux_assurance_pret"] / 100)) / 12
+
+    # Facteurs annuels (n, T) : constants par scénario ou issus des trajectoires
+    annees = np.arange(1, nb_annees + 1)
+    if "inflation_pc" in trajectoires:
+        inflation = _trajectoire_annuelle(trajectoires["inflation_pc"], n, nb_annees) / 100
+        facteurs_inflation = np.concatenate([np.ones((n, 1)), np.cumprod(1 + inflation[:, :-1], axis=1)], axis=1)
+    else:
+        facteurs_inflation = (1 + v["inflation_pc"][:, None] / 100) ** (annees[None, :] - 1)
+    if "revalo_bien_pc" in trajectoires:
+        facteurs_revalo = np.cumprod(1 + _trajectoire_annuelle(trajectoires["revalo_bien_pc"], n, nb_annees) / 100, axis=1)
+    else:
+        facteurs_revalo = (1 + v["revalo_bien_pc"][:, None] / 100) ** annees[None, :]
+    taux_occupation = _trajectoire_annuelle(trajectoires.get("taux_occupation_pc", v["taux_occupation_pc"]), n, nb_annees) / 100
+    taux_distrib = v["taux_distrib_pc"] / 100
+    duree_amort_immo = np.maximum(1, v["duree_amort_immo"])
+    duree_amort_travaux = np.maximum(1, v["duree_amort_travaux"])
+    duree_amort_meubles = np.maximum(1, v["duree_amort_meubles"])
+
+    # --- Variables d'état (une valeur par scénario) ---
+    solde_cca = apport_cca.copy()
+    cashflow_investisseur_accumule = np.zeros(n)
+    amortissement_cumule = np.zeros(n)
+    tresorerie_sci_cumulee = np.zeros(n)
+    abondement_cumule = np.zeros(n)
+    solveur_tri = SolveurTRI(-investissement_initial_personnel, nb_annees + 1)
+
+    resultats = {col: np.full((n, nb_annees), np.nan) for col in COLONNES_PROJECTION[1:] + ["Abondement"]}
+    statuts_tri = {col: np.full((n, nb_annees), STATUT_TRI_NON_CALCULE) for col in COLONNES_STATUT_TRI}
+
+    for annee in range(1, nb_annees + 1):
+        i = annee - 1
+        is_pendant_credit = annee <= duree_pret
+        facteur_inflation = facteurs_inflation[:, i]
+
+        loyer_annuel = (v["loyer_mensuel"] * 12) * facteur_inflation * taux_occupation[:, i]
+        charges_copro_annuelles = (v["charges_copro"] * 12) * facteur_inflation
+        taxe_fonciere_actuelle = v["taxe_fonciere"] * facteur_inflation
+        frais_gestion_annuels = loyer_annuel * (v["frais_gestion_pc"] / 100)
+        gli_annuelle = (loyer_annuel + charges_copro_annuelles) * (v["taux_gli_pc"] / 100)
+
+        prix_revente = cout_acquisition * facteurs_revalo[:, i]
+        provision_gros_travaux_annuelle = prix_revente * (v["provision_gros_travaux_pc"] / 100)
+
+        charges_annuelles_cash = (charges_copro_annuelles + taxe_fonciere_actuelle +
+                                  v["assurance_pno"] + frais_gestion_annuels + gli_annuelle +
+                                  (v["cfe"] * facteur_inflation) +
+                                  provision_gros_travaux_annuelle)
+        if annee == 1:
+            charges_annuelles_cash = charges_annuelles_cash + frais_dossier
+
+        interets_annuels = np.where(is_pendant_credit, interets_pret[:, i], 0.0)
+        principal_annuel = np.where(is_pendant_credit, principal_pret[:, i], 0.0)
+        assurance_annuelle = np.where(is_pendant_credit, mensualite_assurance * 12, 0.0)
+        mensualite_credit_annuelle = interets_annuels + principal_annuel + assurance_annuelle
+
+        amortissement_annuel = (np.where(annee <= duree_amort_immo, base_amort_immo_frais / duree_amort_immo, 0.0) +
+                                np.where(annee <= duree_amort_travaux, cout_travaux / duree_amort_travaux, 0.0) +
+                                np.where(annee <= duree_amort_meubles, valeur_meubles / duree_amort_meubles, 0.0))
+        amortissement_cumule += amortissement_annuel
+
+        charges_deductibles_totales = (charges_annuelles_cash - provision_gros_travaux_annuelle) + interets_annuels + assurance_annuelle
+        resultat_fiscal_exploitation = loyer_annuel - charges_deductibles_totales - amortissement_annuel
+        is_exploitation = impot_societes_batch(resultat_fiscal_exploitation, bareme)
+        resultat_net_comptable = resultat_fiscal_exploitation - is_exploitation
+
+        # --- Trésorerie et CCA ---
+        cashflow_sci_avant_is = loyer_annuel - charges_annuelles_cash - mensualite_credit_annuelle
+        tresorerie_sci_avant_operations = tresorerie_sci_cumulee + cashflow_sci_avant_is - is_exploitation
+
+        abondement = np.where(tresorerie_sci_avant_operations < 0, -tresorerie_sci_avant_operations, 0.0)
+        abondement_cumule += abondement
+        solde_cca += abondement
+        tresorerie_sci_cumulee = np.where(tresorerie_sci_avant_operations < 0, 0.0, tresorerie_sci_avant_operations)
+
+        # --- Distribution (priorité CCA) ---
+        remboursement_cca = np.where(autoriser_remboursement_cca, np.minimum(tresorerie_sci_cumulee, solde_cca), 0.0)
+        tresorerie_disponible = tresorerie_sci_cumulee - remboursement_cca
+        solde_cca -= remboursement_cca
+
+        dividendes_potentiels = np.minimum(np.maximum(0, resultat_net_comptable), tresorerie_disponible)
+        dividendes_verses = dividendes_potentiels * taux_distrib
+        tresorerie_sci_cumulee = tresorerie_disponible - dividendes_verses
+
+        # --- Impôt sur dividendes (gérant majoritaire) ---
+        impot_dividendes = impot_dividendes_batch(dividendes_verses, capital_social + solde_cca + remboursement_cca,
+                                                  is_gerant_majoritaire, bareme)
+
+        cash_net_investisseur_annuel = (dividendes_verses - impot_dividendes) + remboursement_cca - abondement
+        cashflow_investisseur_accumule += cash_net_investisseur_annuel
+
+        # --- Stockage de la passe d'exploitation (NaN au-delà de l'horizon du scénario) ---
+        actif = annee <= horizon
+        colonnes_annee = {
+            "Loyers Annuels": loyer_annuel,
+            "Résultat Exploitation": resultat_fiscal_exploitation,
+            "IS Exploitation": is_exploitation,
+            "Cash-flow Investisseur": cash_net_investisseur_annuel,
+            "Tréso. SCI": tresorerie_sci_cumulee,
+            "Solde CCA": solde_cca,
+            "Abondement": abondement,
+        }
+
+        sortie_annee = annees_sortie is None or annee in annees_sortie
+        if sortie_annee:
+            crd = np.where(is_pendant_credit, crd_pret[:, i], 0.0)
+            tresorerie_sci_avant_distrib_annee_N = np.maximum(tresorerie_sci_avant_operations, 0)
+            total_cash_investi = investissement_initial_personnel + abondement_cumule
+            cash_accumule_annee_N_moins_1 = cashflow_investisseur_accumule - cash_net_investisseur_annuel
+
+        # --- SCÉNARIO 1: REVENTE IMMEUBLE (ASSET DEAL) ---
+        if sortie_annee and "Immeuble" in types_sortie:
+            valeur_nette_comptable = base_vnc_globale - amortissement_cumule
+            plus_value_pro = np.maximum(0, prix_revente - valeur_nette_comptable)
+            is_total_revente = impot_societes_batch(resultat_fiscal_exploitation + plus_value_pro, bareme)
+            is_sur_pv = np.maximum(0, is_total_revente - is_exploitation)
+
+            cash_revente_in_sci = prix_revente - crd - is_sur_pv
+            tresorerie_totale_finale = tresorerie_sci_avant_distrib_annee_N + cash_revente_in_sci
+
+            solde_cca_debut_annee_N = solde_cca + remboursement_cca
+            remboursement_cca_final = np.minimum(tresorerie_totale_finale, solde_cca_debut_annee_N)
+            tresorerie_totale_finale = tresorerie_totale_finale - remboursement_cca_final
+            remboursement_capital_social = np.minimum(tresorerie_totale_finale, capital_social)
+            tresorerie_totale_finale = tresorerie_totale_finale - remboursement_capital_social
+            boni_de_liquidation = np.maximum(0, tresorerie_totale_finale)
+            cash_net_final_investisseur_immo = remboursement_cca_final + remboursement_capital_social + (boni_de_liquidation - boni_de_liquidation * bareme.taux_pfu)
+
+            benefice_net_total_immo = cash_accumule_annee_N_moins_1 + cash_net_final_investisseur_immo - total_cash_investi
+
+            tri_immo, statut_tri_immo = solveur_tri.resoudre(cash_net_final_investisseur_immo - abondement, cle="immo")
+            colonnes_annee.update({
+                "PV Imposable": plus_value_pro,
+                "IS sur PV": is_sur_pv,
+                "Bénéfice Net (Immeuble)": benefice_net_total_immo,
+                "TRI (Immeuble) (%)": tri_immo * 100,
+            })
+            statuts_tri["Statut TRI (Immeuble)"][:, i] = statut_tri_immo
+
+        # --- SCÉNARIO 2: REVENTE DES PARTS (SHARE DEAL) ---
+        if sortie_annee and "Parts" in types_sortie:
+            prix_cession_parts = prix_revente + tresorerie_sci_avant_distrib_annee_N - crd
+            cout_acquisition_parts = capital_social + apport_cca + abondement_cumule
+            plus_value_sur_parts = np.maximum(0, prix_cession_parts - cout_acquisition_parts)
+            impot_pv_parts = impot_plus_value_batch(plus_value_sur_parts, annee, bareme)
+
+            cash_net_final_investisseur_parts = prix_cession_parts - impot_pv_parts
+            benefice_net_total_parts = cash_accumule_annee_N_moins_1 + cash_net_final_investisseur_parts - total_cash_investi
+
+            tri_parts, statut_tri_parts = solveur_tri.resoudre(cash_net_final_investisseur_parts - abondement, cle="parts")
+            colonnes_annee.update({
+                "Bénéfice Net (Parts)": benefice_net_total_parts,
+                "TRI (Parts) (%)": tri_parts * 100,
+            })
+            statuts_tri["Statut TRI (Parts)"][:, i] = statut_tri_parts
+        solveur_tri.ajouter_flux(cash_net_investisseur_annuel)
+
+        for col, valeurs in colonnes_annee.items():
+            resultats[col][:, i] = np.where(actif, valeurs, np.nan)
+
+    resultats.update(statuts_tri)
+    resultats["Année"] = np.arange(1, nb_annees + 1)
+    resultats["Horizon"] = horizon
+    resultats["Durée prêt"] = duree_pret
+    return resultats
+
+def projection_batch_vers_dataframe(resultats):
+    """
+    Aplatit le résultat de generer_projection_sci_is_batch en DataFrame long
+    (une ligne par scénario et par année simulée, colonnes "Scénario" et
+    COLONNE_POST_CREDIT en plus).
+    """
+    import pandas as pd
+    n, nb_annees = resultats["TRI (Parts) (%)"].shape
+    scenario = np.repeat(np.arange(n), nb_annees)
+    annee = np.tile(resultats["Année"], n)
+    actif = annee <= np.repeat(resultats["Horizon"], nb_annees)
+    donnees = {"Scénario": scenario[actif], "Année": annee[actif]}
+    for col in COLONNES_PROJECTION[1:]:
+        donnees[col] = resultats[col].ravel()[actif]
+    donnees[COLONNE_POST_CREDIT] = donnees["Année"] > resultats["Durée prêt"][donnees["Scénario"]]
+    return pd.DataFrame(donnees)
+
+def comparer_versions_fiscales(params, versions, colonnes=None):
+    """
+    Projette un même dossier sous plusieurs versions fiscales, côte à côte, en une passe batch.
+    Retourne un DataFrame indexé par année, colonnes "<colonne> (<version>)".
+    """
+    import pandas as pd
+    colonnes = list(colonnes) if colonnes else COLONNES_PROJECTION[1:]
+    scenarios = dict(params)
+    scenarios["version_fiscale"] = np.asarray(versions, dtype=float)
+    resultats = generer_projection_sci_is_batch(scenarios)
+    donnees = {f"{col} ({version})": resultats[col][i]
+               for col in colonnes for i, version in enumerate(versions)}
+    return pd.DataFrame(donnees, index=pd.Index(resultats["Année"], name="Année"))
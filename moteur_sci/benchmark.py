@@ -0,0 +1,236 @@
+# moteur_sci/benchmark.py
+#
+# Banc de performance et de non-régression du moteur :
+#  - scénarios de référence figés (prêts courts / longs, taux 0 %, abondements lourds,
+#    gérant majoritaire ou non) comparés colonne par colonne aux projections de référence,
+#  - débit (scénarios/s), latence par appel (percentiles) et pic mémoire des chemins
+#    scalaire et vectorisé, de l'échéancier et du TRI.
+#
+# Exemples :
+#    python -m moteur_sci.benchmark                 # vérification + mesures
+#    python -m moteur_sci.benchmark --verification  # vérification seule (code retour 1 si écart)
+#    python -m moteur_sci.benchmark --regenerer     # réécrit les références (changement fiscal voulu)
+
+import argparse
+import json
+import math
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from .batch import generer_projection_sci_is_batch
+from .cache import vider_caches
+from .pret import generer_tableau_amortissement
+from .projection import COLONNES_PROJECTION, COLONNES_STATUT_TRI, generer_projection_sci_is
+from .tri import calculer_tri_batch
+
+# --- SCÉNARIOS DE RÉFÉRENCE ---
+CHEMIN_REFERENCES = os.path.join(os.path.dirname(__file__), "references", "projections_reference.json")
+VERSION_REFERENCES = 1
+# Écart toléré entre le moteur et les références (arrondis flottants, ordre des opérations)
+TOLERANCE_RELATIVE = 1e-7
+TOLERANCE_ABSOLUE = 1e-6
+PERCENTILES_LATENCE = (50, 90, 99)
+GRAINE_BENCHMARK = 20240601
+
+SCENARIO_BASE = {
+    "prix_achat": 200000.0, "cout_travaux": 30000.0, "valeur_meubles": 15000.0, "frais_notaire": 16000.0,
+    "frais_dossier": 1500.0, "capital_social": 1000.0, "apport_personnel": 20000.0, "duree_pret": 20,
+    "taux_interet_pret": 3.5, "taux_assurance_pret": 0.34, "loyer_mensuel": 1200.0, "taux_occupation_pc": 95.0,
+    "charges_copro": 100.0, "taxe_fonciere": 1000.0, "frais_gestion_pc": 7.0, "taux_gli_pc": 3.5,
+    "assurance_pno": 200.0, "cfe": 200.0, "provision_gros_travaux_pc": 0.5, "duree_amort_immo": 30,
+    "duree_amort_travaux": 15, "duree_amort_meubles": 7, "part_terrain_pc": 15.0, "taux_distrib_pc": 100.0,
+    "inflation_pc": 2.0, "revalo_bien_pc": 3.0, "is_gerant_majoritaire": False, "autoriser_remboursement_cca": True,
+}
+SCENARIOS_REFERENCE = {
+    "base": {},
+    "pret_court": {"duree_pret": 5, "apport_personnel": 60000.0},
+    "pret_long": {"duree_pret": 30, "taux_interet_pret": 4.8},
+    "taux_zero": {"taux_interet_pret": 0.0, "taux_assurance_pret": 0.0},
+    "abondement_lourd": {"loyer_mensuel": 600.0, "taux_occupation_pc": 70.0, "apport_personnel": 0.0},
+    "gerant_majoritaire": {"is_gerant_majoritaire": True, "loyer_mensuel": 2200.0},
+    "gerant_majoritaire_capitalisation": {"is_gerant_majoritaire": True, "loyer_mensuel": 2200.0,
+                                          "autoriser_remboursement_cca": False, "taux_distrib_pc": 50.0},
+    "sans_remboursement_cca": {"autoriser_remboursement_cca": False},
+    "sans_pret": {"apport_personnel": 260000.0, "capital_social": 1000.0},
+    "sans_tri": {"loyer_mensuel": 300.0, "revalo_bien_pc": -5.0, "inflation_pc": 0.0},
+    "is_taux_plein": {"prix_achat": 900000.0, "loyer_mensuel": 9000.0, "duree_pret": 15, "taux_distrib_pc": 0.0},
+    "bareme_2021": {"prix_achat": 900000.0, "loyer_mensuel": 9000.0, "duree_pret": 15, "taux_distrib_pc": 0.0,
+                    "version_fiscale": 2021},
+}
+
+def scenarios_reference():
+    """Scénarios de référence complets (SCENARIO_BASE surchargé), par nom."""
+    return {nom: {**SCENARIO_BASE, **surcharge} for nom, surcharge in SCENARIOS_REFERENCE.items()}
+
+def scenarios_aleatoires(nb_scenarios, graine=GRAINE_BENCHMARK):
+    """Scénarios tirés avec une graine fixe (reproductibles) pour les mesures de débit."""
+    rng = np.random.default_rng(graine)
+    scenarios = []
+    for _ in range(nb_scenarios):
+        scenario = dict(SCENARIO_BASE)
+        scenario.update({
+            "prix_achat": float(rng.uniform(50e3, 800e3)), "loyer_mensuel": float(rng.uniform(300, 5000)),
+            "duree_pret": int(rng.integers(1, 31)), "taux_interet_pret": float(rng.choice([0.0, rng.uniform(0.5, 6)])),
+            "apport_personnel": float(rng.uniform(0, 100e3)), "capital_social": float(rng.uniform(0, 5e3)),
+            "taux_distrib_pc": float(rng.uniform(0, 100)), "is_gerant_majoritaire": bool(rng.integers(0, 2)),
+            "autoriser_remboursement_cca": bool(rng.integers(0, 2)), "taux_occupation_pc": float(rng.uniform(60, 100)),
+            "inflation_pc": float(rng.uniform(0, 4)), "revalo_bien_pc": float(rng.uniform(0, 5)),
+        })
+        scenarios.append(scenario)
+    return scenarios
+
+# --- RÉFÉRENCES (NON-RÉGRESSION) ---
+def _vers_json(valeurs):
+    return [None if math.isnan(x) else x for x in np.asarray(valeurs, dtype=float).tolist()]
+
+def _depuis_json(valeurs):
+    return np.array([np.nan if x is None else x for x in valeurs], dtype=float)
+
+def generer_references(chemin=CHEMIN_REFERENCES):
+    """Recalcule les projections de référence avec le moteur scalaire et les écrit dans `chemin`."""
+    references = {}
+    for nom, params in scenarios_reference().items():
+        projection = generer_projection_sci_is(params)
+        references[nom] = {
+            "params": params,
+            "duree_pret": projection.duree_pret,
+            "colonnes": {col: _vers_json(projection[col]) for col in COLONNES_PROJECTION[1:]},
+            "statuts_tri": {col: projection[col].tolist() for col in COLONNES_STATUT_TRI},
+        }
+    os.makedirs(os.path.dirname(chemin), exist_ok=True)
+    with open(chemin, "w", encoding="utf-8") as f:
+        json.dump({"version": VERSION_REFERENCES, "scenarios": references}, f, ensure_ascii=False, indent=1)
+        f.write("\n")
+    return len(references)
+
+def _comparer(nom, chemin_moteur, colonne, obtenu, attendu, ecarts):
+    if obtenu.shape != attendu.shape:
+        ecarts.append(f"{nom} [{chemin_moteur}] {colonne} : {obtenu.size} années au lieu de {attendu.size}")
+        return
+    egaux = np.isclose(obtenu, attendu, rtol=TOLERANCE_RELATIVE, atol=TOLERANCE_ABSOLUE, equal_nan=True)
+    if not egaux.all():
+        i = int(np.argmin(egaux))
+        ecarts.append(f"{nom} [{chemin_moteur}] {colonne} : année {i + 1}, {float(obtenu[i])!r} au lieu de {float(attendu[i])!r}"
+                      f" ({int((~egaux).sum())} année(s) en écart)")
+
+def verifier_references(chemin=CHEMIN_REFERENCES):
+    """
+    Compare chaque colonne (montants, TRI, statuts du solveur) des chemins scalaire
+    et vectorisé aux projections de référence. Retourne la liste des écarts (vide si conforme).
+    """
+    with open(chemin, encoding="utf-8") as f:
+        references = json.load(f)["scenarios"]
+    noms = list(references)
+    resultats_batch = generer_projection_sci_is_batch([references[nom]["params"] for nom in noms])
+    ecarts = []
+    for i, nom in enumerate(noms):
+        reference = references[nom]
+        projection = generer_projection_sci_is(reference["params"])
+        if projection.duree_pret != reference["duree_pret"]:
+            ecarts.append(f"{nom} [scalaire] durée du prêt : {projection.duree_pret} au lieu de {reference['duree_pret']}")
+        horizon = int(resultats_batch["Horizon"][i])
+        for col, valeurs in reference["colonnes"].items():
+            attendu = _depuis_json(valeurs)
+            _comparer(nom, "scalaire", col, projection[col], attendu, ecarts)
+            _comparer(nom, "batch", col, resultats_batch[col][i, :horizon], attendu, ecarts)
+        for col, codes in reference["statuts_tri"].items():
+            attendu = np.array(codes, dtype=float)
+            _comparer(nom, "scalaire", col, projection[col].astype(float), attendu, ecarts)
+            _comparer(nom, "batch", col, resultats_batch[col][i, :horizon].astype(float), attendu, ecarts)
+    return ecarts
+
+# --- MESURES DE PERFORMANCE ---
+def mesurer(nom, fonction, arguments, nb_scenarios_par_appel=1):
+    """
+    Appelle `fonction(*args)` pour chaque élément de `arguments` (caches vidés au préalable).
+    Passe chronométrée puis passe sous tracemalloc (le traçage fausserait les temps).
+    Retourne un dict : débit, percentiles de latence par appel (ms), pic mémoire (Mo).
+    """
+    vider_caches()
+    latences = np.empty(len(arguments))
+    debut_total = time.perf_counter()
+    for i, args in enumerate(arguments):
+        debut = time.perf_counter()
+        fonction(*args)
+        latences[i] = time.perf_counter() - debut
+    duree_totale = time.perf_counter() - debut_total
+
+    vider_caches()
+    tracemalloc.start()
+    for args in arguments:
+        fonction(*args)
+    _, pic_memoire = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    mesure = {
+        "nom": nom,
+        "appels": len(arguments),
+        "scenarios_par_seconde": len(arguments) * nb_scenarios_par_appel / duree_totale,
+    }
+    for p, valeur in zip(PERCENTILES_LATENCE, np.percentile(latences, PERCENTILES_LATENCE)):
+        mesure[f"latence_p{p}_ms"] = valeur * 1000
+    mesure["pic_memoire_mo"] = pic_memoire / 2**20
+    return mesure
+
+def executer_benchmarks(nb_scenarios=500, taille_batch=1000, nb_lots=5):
+    """Mesures sur des scénarios aléatoires figés : scalaire, batch, échéancier et TRI."""
+    scenarios = scenarios_aleatoires(nb_scenarios)
+    lots = [(scenarios_aleatoires(taille_batch, GRAINE_BENCHMARK + i),) for i in range(nb_lots)]
+    prets = [(s["prix_achat"] + s["cout_travaux"] + s["frais_notaire"] - s["apport_personnel"] - s["capital_social"],
+              s["taux_interet_pret"], s["duree_pret"]) for s in scenarios]
+    rng = np.random.default_rng(GRAINE_BENCHMARK)
+    flux_tri = [(np.column_stack([-rng.uniform(1e4, 1e5, taille_batch),
+                                  rng.normal(2e3, 5e3, (taille_batch, 30)),
+                                  rng.uniform(0, 3e5, taille_batch)]),) for _ in range(nb_lots)]
+    return [
+        mesurer("Projection scalaire", generer_projection_sci_is, [(s,) for s in scenarios]),
+        mesurer(f"Projection batch ({taille_batch}/appel)", generer_projection_sci_is_batch, lots, taille_batch),
+        mesurer("Échéancier de prêt", generer_tableau_amortissement, prets),
+        mesurer(f"TRI batch ({taille_batch} x 32 flux)", calculer_tri_batch, flux_tri, taille_batch),
+    ]
+
+def _afficher_mesures(mesures, flux):
+    entetes = ["Chemin", "Appels", "Scénarios/s"] + [f"p{p} (ms)" for p in PERCENTILES_LATENCE] + ["Pic mém. (Mo)"]
+    lignes = [[m["nom"], str(m["appels"]), f"{m['scenarios_par_seconde']:,.0f}"]
+              + [f"{m[f'latence_p{p}_ms']:.3f}" for p in PERCENTILES_LATENCE] + [f"{m['pic_memoire_mo']:.2f}"]
+              for m in mesures]
+    largeurs = [max(len(ligne[i]) for ligne in [entetes] + lignes) for i in range(len(entetes))]
+    for ligne in [entetes] + lignes:
+        flux.write("  ".join(v.ljust(l) if i == 0 else v.rjust(l) for i, (v, l) in enumerate(zip(ligne, largeurs))) + "\n")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m moteur_sci.benchmark",
+                                     description="Banc de performance et de non-régression du moteur SCI à l'IS.")
+    parser.add_argument("--references", default=CHEMIN_REFERENCES, help="Fichier des projections de référence.")
+    parser.add_argument("--regenerer", action="store_true", help="Réécrit les références avec le moteur actuel.")
+    parser.add_argument("--verification", action="store_true", help="Vérification des références seule, sans mesures.")
+    parser.add_argument("--scenarios", type=int, default=500, help="Appels du chemin scalaire et de l'échéancier.")
+    parser.add_argument("--taille-batch", type=int, default=1000, help="Scénarios par appel des chemins vectorisés.")
+    parser.add_argument("--lots", type=int, default=5, help="Appels des chemins vectorisés.")
+    parser.add_argument("--json", action="store_true", help="Mesures au format JSON sur stdout.")
+    args = parser.parse_args(argv)
+
+    if args.regenerer:
+        nb_references = generer_references(args.references)
+        print(f"{nb_references} projections de référence écrites dans {args.references}.", file=sys.stderr)
+        return 0
+
+    ecarts = verifier_references(args.references)
+    for ecart in ecarts:
+        print(f"ÉCART {ecart}", file=sys.stderr)
+    print(f"Références : {len(SCENARIOS_REFERENCE)} scénarios, {len(ecarts)} écart(s).", file=sys.stderr)
+    if not args.verification:
+        mesures = executer_benchmarks(args.scenarios, args.taille_batch, args.lots)
+        if args.json:
+            json.dump(mesures, sys.stdout, ensure_ascii=False, indent=1)
+            sys.stdout.write("\n")
+        else:
+            _afficher_mesures(mesures, sys.stdout)
+    return 1 if ecarts else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+# moteur_sci/cache.py
+#
+# Cache LRU borné et cache de résultats partagé (clé : empreinte stable des paramètres).
+# Les globales de ce module vivent aussi longtemps que le processus : le cache est
+# donc partagé par toutes les sessions Streamlit d'un même serveur.
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# --- CACHE LRU BORNÉ ---
+class CacheLRU:
+    """
+    Cache LRU borné (OrderedDict) avec compteurs de hits / misses / évictions.
+    Protégé par un verrou : partagé entre les sessions (threads) du serveur Streamlit.
+    """
+
+    def __init__(self, taille_max):
+        self.taille_max = taille_max
+        self._entrees = OrderedDict()
+        self._verrou = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, cle, defaut=None):
+        with self._verrou:
+            if cle in self._entrees:
+                self._entrees.move_to_end(cle)
+                self.hits += 1
+                return self._entrees[cle]
+            self.misses += 1
+            return defaut
+
+    def mettre(self, cle, valeur):
+        with self._verrou:
+            self._entrees[cle] = valeur
+            self._entrees.move_to_end(cle)
+            while len(self._entrees) > self.taille_max:
+                self._entrees.popitem(last=False) # Éviction du moins récemment utilisé
+                self.evictions += 1
+
+    def supprimer(self, cle):
+        with self._verrou:
+            self._entrees.pop(cle, None)
+
+    def vider(self):
+        with self._verrou:
+            self._entrees.clear()
+
+    def statistiques(self):
+        with self._verrou:
+            total = self.hits + self.misses
+            return {"taille": len(self._entrees), "taille_max": self.taille_max, "hits": self.hits,
+                    "misses": self.misses, "evictions": self.evictions,
+                    "taux_hit": self.hits / total if total else 0.0}
+
+    def __len__(self):
+        return len(self._entrees)
+
+# --- CACHE DE RÉSULTATS (RERUNS STREAMLIT, CLI, BATCH) ---
+TAILLE_CACHE_RESULTATS = 256
+_cache_resultats = CacheLRU(TAILLE_CACHE_RESULTATS)
+_ABSENT = object() # Sentinelle : distingue "absent du cache" d'un résultat None
+
+def _valeur_canonique(valeur):
+    """Convertit les types NumPy / tuples en types JSON pour un hachage stable."""
+    if isinstance(valeur, np.ndarray):
+        return {"__ndarray__": valeur.tolist(), "dtype": str(valeur.dtype)}
+    if isinstance(valeur, np.generic):
+        return valeur.item()
+    if isinstance(valeur, (set, frozenset)):
+        return sorted(valeur)
+    raise TypeError(f"Type non hachable pour le cache : {type(valeur).__name__}")
+
+def hash_parametres(params):
+    """
+    Empreinte stable (SHA-256) d'un dict de paramètres : indépendante de l'ordre des
+    clés et identique d'un processus à l'autre (contrairement à hash()).
+    Les entiers et flottants égaux (20 et 20.0) donnent la même empreinte.
+    """
+    def normaliser(valeur):
+        if isinstance(valeur, bool) or valeur is None or isinstance(valeur, str):
+            return valeur
+        if isinstance(valeur, (int, float, np.integer, np.floating)):
+            return float(valeur)
+        if isinstance(valeur, dict):
+            return {str(cle): normaliser(v) for cle, v in valeur.items()}
+        if isinstance(valeur, (list, tuple)):
+            return [normaliser(v) for v in valeur]
+        return valeur
+    texte = json.dumps(normaliser(params), sort_keys=True, default=_valeur_canonique, separators=(",", ":"))
+    return hashlib.sha256(texte.encode("utf-8")).hexdigest()
+
+def cle_resultat(nom, *args, **kwargs):
+    """Clé du cache de résultats : (nom, empreinte des arguments)."""
+    return (nom, hash_parametres({"args": list(args), "kwargs": kwargs}))
+
+def calculer_avec_cache(nom, fonction, *args, **kwargs):
+    """
+    Retourne fonction(*args, **kwargs) depuis le cache de résultats partagé, clé :
+    cle_resultat(nom, *args, **kwargs). Les résultats en cache sont partagés : ne pas les modifier.
+    """
+    cle = cle_resultat(nom, *args, **kwargs)
+    resultat = _cache_resultats.get(cle, _ABSENT)
+    if resultat is _ABSENT:
+        resultat = fonction(*args, **kwargs)
+        _cache_resultats.mettre(cle, resultat)
+    return resultat
+
+def statistiques_caches():
+    """Compteurs des caches du moteur (résultats et échéanciers de prêt)."""
+    from .pret import _cache_echeanciers
+    return {"Résultats": _cache_resultats.statistiques(), "Échéanciers": _cache_echeanciers.statistiques()}
+
+def vider_caches():
+    """Éviction explicite de toutes les entrées des caches du moteur."""
+    from .pret import _cache_echeanciers
+    _cache_resultats.vider()
+    _cache_echeanciers.vider()
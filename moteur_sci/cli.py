@@ -0,0 +1,183 @@
+# moteur_sci/cli.py
+#
+# Runner batch en ligne de commande : lit des scénarios (CSV ou JSONL, fichier ou stdin),
+# les projette par lots avec le moteur vectorisé et écrit les projections au fil de l'eau.
+# La mémoire reste constante quel que soit le nombre de scénarios (un lot en cours
+# par processus, plus une fenêtre bornée de lots en attente d'écriture).
+#
+# Exemples :
+#    python -m moteur_sci annonces.csv --sortie projections.csv
+#    cat annonces.jsonl | python -m moteur_sci --format-entree jsonl --annees 10 20 --processus 8
+
+import argparse
+import csv
+import json
+import math
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .batch import PARAMETRES_DEFAUT_BATCH, generer_projection_sci_is_batch
+from .projection import COLONNES_PROJECTION, COLONNES_SORTIE, COLONNES_STATUT_TRI, TYPES_SORTIE
+from .tri import LIBELLES_STATUT_TRI
+
+COLONNE_IDENTIFIANT = "id" # Colonne optionnelle recopiée telle quelle en sortie ("Scénario")
+VALEURS_VRAI = {"1", "true", "vrai", "oui", "yes", "o", "y"}
+TAILLE_LOT_CLI = 512
+
+def _convertir_scenario(brut, numero):
+    """Convertit une ligne brute (valeurs texte ou JSON) en dict `params` ; ignore les colonnes inconnues."""
+    scenario = {}
+    for cle, defaut in PARAMETRES_DEFAUT_BATCH.items():
+        valeur = brut.get(cle)
+        if valeur is None or valeur == "":
+            continue
+        try:
+            if isinstance(defaut, bool):
+                scenario[cle] = valeur if isinstance(valeur, bool) else str(valeur).strip().lower() in VALEURS_VRAI
+            else:
+                scenario[cle] = float(valeur)
+        except (TypeError, ValueError):
+            raise ValueError(f"scénario {numero} : valeur invalide pour '{cle}' ({valeur!r})")
+    scenario[COLONNE_IDENTIFIANT] = brut.get(COLONNE_IDENTIFIANT, numero)
+    return scenario
+
+def lire_scenarios(flux, format_entree):
+    """Générateur de scénarios depuis un flux texte CSV (avec en-tête) ou JSONL."""
+    if format_entree == "csv":
+        lignes = csv.DictReader(flux)
+    else:
+        lignes = (json.loads(ligne) for ligne in flux if ligne.strip())
+    for numero, brut in enumerate(lignes):
+        yield _convertir_scenario(brut, numero)
+
+def _par_lots(iterable, taille):
+    lot = []
+    for element in iterable:
+        lot.append(element)
+        if len(lot) == taille:
+            yield lot
+            lot = []
+    if lot:
+        yield lot
+
+def projeter_lot(scenarios, annees, colonnes):
+    """
+    Projette un lot de scénarios ; retourne les lignes de sortie
+    [Scénario, Année, *colonnes] des années demandées (toutes si `annees` est vide).
+    Seules les sorties écrites (années demandées, types dont une colonne est demandée) sont évaluées.
+    """
+    types_sortie = [t for t, statut in zip(TYPES_SORTIE, COLONNES_STATUT_TRI)
+                    if statut in colonnes or any(col in colonnes for col in COLONNES_SORTIE[t])]
+    resultats = generer_projection_sci_is_batch(scenarios, annees_sortie=annees or None, types_sortie=types_sortie)
+    masque = resultats["Année"][None, :] <= resultats["Horizon"][:, None]
+    if annees:
+        masque &= np.isin(resultats["Année"], annees)[None, :]
+    lignes_scenario, lignes_annee = np.nonzero(masque)
+
+    valeurs = []
+    for col in colonnes:
+        extrait = resultats[col][lignes_scenario, lignes_annee]
+        if col in COLONNES_STATUT_TRI:
+            valeurs.append([LIBELLES_STATUT_TRI[int(code)] for code in extrait])
+        else:
+            valeurs.append([None if math.isnan(x) else x for x in extrait.tolist()])
+    identifiants = [scenario[COLONNE_IDENTIFIANT] for scenario in scenarios]
+    colonnes_valeurs = list(zip(*valeurs)) if valeurs else [()] * lignes_scenario.size
+    return [[identifiants[i], a + 1, *ligne]
+            for i, a, ligne in zip(lignes_scenario.tolist(), lignes_annee.tolist(), colonnes_valeurs)]
+
+class _Ecrivain:
+    """Écriture incrémentale CSV ou JSONL des lignes de projection."""
+
+    def __init__(self, flux, format_sortie, entetes):
+        self.flux = flux
+        self.entetes = entetes
+        self.format_sortie = format_sortie
+        if format_sortie == "csv":
+            self._csv = csv.writer(flux, lineterminator="\n")
+            self._csv.writerow(entetes)
+
+    def ecrire(self, lignes):
+        if self.format_sortie == "csv":
+            self._csv.writerows([["" if x is None else x for x in ligne] for ligne in lignes])
+        else:
+            for ligne in lignes:
+                self.flux.write(json.dumps(dict(zip(self.entetes, ligne)), ensure_ascii=False) + "\n")
+        self.flux.flush()
+
+def executer(entree, sortie, format_entree="csv", format_sortie="csv", taille_lot=TAILLE_LOT_CLI,
+             nb_processus=1, annees=None, colonnes=None):
+    """
+    Lit les scénarios de `entree`, écrit les projections dans `sortie` lot par lot.
+    Avec nb_processus > 1, au plus 2 x nb_processus lots sont en vol ; l'ordre
+    d'entrée est conservé en sortie. Retourne le nombre de scénarios traités.
+    """
+    colonnes = list(colonnes) if colonnes else COLONNES_PROJECTION[1:] + COLONNES_STATUT_TRI
+    annees = list(annees or [])
+    ecrivain = _Ecrivain(sortie, format_sortie, ["Scénario", "Année"] + colonnes)
+    lots = _par_lots(lire_scenarios(entree, format_entree), taille_lot)
+    nb_scenarios = 0
+
+    if nb_processus <= 1:
+        for lot in lots:
+            ecrivain.ecrire(projeter_lot(lot, annees, colonnes))
+            nb_scenarios += len(lot)
+        return nb_scenarios
+
+    with ProcessPoolExecutor(max_workers=nb_processus) as executeur:
+        en_vol = deque()
+        for lot in lots:
+            en_vol.append((len(lot), executeur.submit(projeter_lot, lot, annees, colonnes)))
+            if len(en_vol) >= 2 * nb_processus:
+                taille, futur = en_vol.popleft()
+                ecrivain.ecrire(futur.result())
+                nb_scenarios += taille
+        while en_vol:
+            taille, futur = en_vol.popleft()
+            ecrivain.ecrire(futur.result())
+            nb_scenarios += taille
+    return nb_scenarios
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m moteur_sci",
+                                     description="Projections SCI à l'IS en batch (CSV / JSONL, fichier ou stdin).")
+    parser.add_argument("entree", nargs="?", default="-", help="Fichier de scénarios ('-' ou absent : stdin).")
+    parser.add_argument("--format-entree", choices=["csv", "jsonl"], help="Déduit de l'extension, csv par défaut.")
+    parser.add_argument("--sortie", default="-", help="Fichier de sortie ('-' : stdout).")
+    parser.add_argument("--format-sortie", choices=["csv", "jsonl"], default="csv")
+    parser.add_argument("--taille-lot", type=int, default=TAILLE_LOT_CLI, help="Scénarios par passe du moteur vectorisé.")
+    parser.add_argument("--processus", type=int, default=1, help="Nombre de processus de calcul.")
+    parser.add_argument("--annees", type=int, nargs="+", help="N'écrire que ces années (toutes par défaut).")
+    parser.add_argument("--colonnes", nargs="+", choices=COLONNES_PROJECTION[1:] + COLONNES_STATUT_TRI, metavar="COLONNE",
+                        help="Colonnes à écrire (toutes par défaut).")
+    args = parser.parse_args(argv)
+
+    format_entree = args.format_entree or ("jsonl" if args.entree.endswith((".jsonl", ".json")) else "csv")
+    try:
+        entree = sys.stdin if args.entree == "-" else open(args.entree, newline="", encoding="utf-8")
+    except OSError as e:
+        print(f"Erreur : impossible de lire {args.entree} ({e.strerror or e})", file=sys.stderr)
+        return 1
+    try:
+        sortie = sys.stdout if args.sortie == "-" else open(args.sortie, "w", newline="", encoding="utf-8")
+    except OSError as e:
+        if entree is not sys.stdin:
+            entree.close()
+        print(f"Erreur : impossible d'écrire {args.sortie} ({e.strerror or e})", file=sys.stderr)
+        return 1
+    try:
+        nb_scenarios = executer(entree, sortie, format_entree, args.format_sortie, max(1, args.taille_lot),
+                                args.processus, args.annees, args.colonnes)
+    except ValueError as e:
+        print(f"Erreur : {e}", file=sys.stderr)
+        return 1
+    finally:
+        if entree is not sys.stdin:
+            entree.close()
+        if sortie is not sys.stdout:
+            sortie.close()
+    print(f"{nb_scenarios} scénarios projetés.", file=sys.stderr)
+    return 0
@@ -0,0 +1,147 @@
+# moteur_sci/fiscalite.py
+#
+# Règles fiscales versionnées par année d'imposition : IS, impôt sur les dividendes
+# (PFU ou gérant majoritaire) et impôt sur la plus-value des particuliers (cession de parts).
+# Les abattements pour durée de détention sont précalculés en tableaux indexés par
+# le nombre d'années de détention ; chaque règle existe en version scalaire (boucles
+# du moteur scalaire) et vectorisée (colonnes entières, moteur batch).
+
+from collections import namedtuple
+
+import numpy as np
+
+# --- BARÈMES FISCAUX VERSIONNÉS ---
+BaremeFiscal = namedtuple("BaremeFiscal", [
+    "seuil_is_taux_reduit", "taux_is_reduit", "taux_is_normal",
+    "taux_pfu", # Dividendes, boni de liquidation
+    "seuil_dividendes_tns_pc", "taux_cotisations_tns", "taux_ir_dividendes_tns", # Gérant majoritaire
+    "taux_ir_plus_value", "taux_ps_plus_value",
+    "abattements_ir", "abattements_ps", # Tableaux indexés par la durée de détention (années)
+])
+DUREE_DETENTION_MAX = 30 # Abattements constants au-delà
+
+def _tables_abattements(ir_annuel, ir_22, ps_annuel, ps_22, ps_23_30):
+    """
+    Abattements IR / PS pour 0..DUREE_DETENTION_MAX années de détention :
+    ir_annuel / ps_annuel de la 6e à la 21e année, ir_22 au-delà de 21 ans,
+    ps_22 la 22e année seule, ps_23_30 par année de la 23e à la 30e.
+    """
+    abattements_ir = np.zeros(DUREE_DETENTION_MAX + 1)
+    abattements_ps = np.zeros(DUREE_DETENTION_MAX + 1)
+    for duree_detention in range(6, DUREE_DETENTION_MAX + 1):
+        abattement_ir = sum(ir_annuel for _ in range(6, min(duree_detention, 21) + 1))
+        if duree_detention >= 22: abattement_ir += ir_22
+        abattement_ps = sum(ps_annuel for _ in range(6, min(duree_detention, 21) + 1))
+        if duree_detention == 22: abattement_ps += ps_22
+        if duree_detention > 22: abattement_ps += sum(ps_23_30 for _ in range(23, min(duree_detention, 30) + 1))
+        abattements_ir[duree_detention] = abattement_ir
+        abattements_ps[duree_detention] = abattement_ps
+    for table in (abattements_ir, abattements_ps):
+        table.setflags(write=False)
+    return abattements_ir, abattements_ps
+
+_ABATTEMENTS_PLUS_VALUE = _tables_abattements(ir_annuel=0.06, ir_22=0.04, ps_annuel=0.0165, ps_22=0.0160, ps_23_30=0.09)
+
+# Barèmes par première année d'imposition d'application. Seuil du taux réduit d'IS porté
+# à 42 500 € pour les exercices clos à compter du 31/12/2022 (loi de finances pour 2023)
+BAREMES_FISCAUX = {
+    2021: BaremeFiscal(38120, 0.15, 0.25, 0.30, 0.10, 0.45, 0.128, 0.19, 0.172, *_ABATTEMENTS_PLUS_VALUE),
+    2022: BaremeFiscal(42500, 0.15, 0.25, 0.30, 0.10, 0.45, 0.128, 0.19, 0.172, *_ABATTEMENTS_PLUS_VALUE),
+}
+VERSION_FISCALE_DEFAUT = max(BAREMES_FISCAUX)
+
+def bareme_fiscal(version=None):
+    """Barème en vigueur pour l'année d'imposition `version` (None : VERSION_FISCALE_DEFAUT)."""
+    version = VERSION_FISCALE_DEFAUT if version is None else int(version)
+    applicables = [annee for annee in BAREMES_FISCAUX if annee <= version]
+    if not applicables:
+        raise ValueError(f"Aucun barème fiscal pour {version} (premier barème : {min(BAREMES_FISCAUX)}).")
+    return BAREMES_FISCAUX[max(applicables)]
+
+def baremes_par_scenario(versions):
+    """
+    Barème « vectorisé » pour n scénarios : champs numériques (n,), abattements (n, durées).
+    Permet de projeter un même dossier sous plusieurs versions dans une seule passe batch.
+    Une version absente (None, devenu NaN à la normalisation) vaut VERSION_FISCALE_DEFAUT,
+    comme dans bareme_fiscal.
+    """
+    versions = np.asarray(versions, dtype=float)
+    versions = np.where(np.isnan(versions), VERSION_FISCALE_DEFAUT, versions)
+    uniques, inverse = np.unique(versions, return_inverse=True)
+    if uniques.size == 1:
+        return bareme_fiscal(uniques[0])
+    baremes = [bareme_fiscal(version) for version in uniques]
+    return BaremeFiscal(*(np.asarray([getattr(b, champ) for b in baremes], dtype=float)[inverse]
+                          for champ in BaremeFiscal._fields))
+
+# --- MOTEUR DE CALCUL IMPÔT PLUS-VALUE (Particuliers, pour Scénario 2) ---
+def calculer_impot_plus_value(plus_value_brute, duree_detention, bareme=None):
+    bareme = bareme or bareme_fiscal()
+    if plus_value_brute <= 0: return 0, 0
+    duree = min(max(int(duree_detention), 0), DUREE_DETENTION_MAX)
+    base_imposable_ir = plus_value_brute * (1 - bareme.abattements_ir[duree])
+    impot_sur_revenu_pv = base_imposable_ir * bareme.taux_ir_plus_value
+    base_imposable_ps = plus_value_brute * (1 - bareme.abattements_ps[duree])
+    prelevements_sociaux_pv = base_imposable_ps * bareme.taux_ps_plus_value
+    impot_total_pv = max(0, impot_sur_revenu_pv) + max(0, prelevements_sociaux_pv)
+    return float(impot_total_pv), plus_value_brute
+
+# --- VERSIONS SCALAIRES (MOTEUR SCALAIRE, PORTEFEUILLE) ---
+def calculer_impot_societes(resultat_fiscal, bareme):
+    """IS taux réduit jusqu'au seuil, taux normal au-delà (0 si résultat négatif)."""
+    if resultat_fiscal <= 0:
+        return 0
+    benefice_taux_reduit = min(resultat_fiscal, bareme.seuil_is_taux_reduit)
+    return (benefice_taux_reduit * bareme.taux_is_reduit) + (max(0, resultat_fiscal - benefice_taux_reduit) * bareme.taux_is_normal)
+
+def calculer_impot_dividendes(dividendes_verses, base_seuil_tns, is_gerant_majoritaire, bareme):
+    """
+    Impôt sur les dividendes versés : PFU, ou pour un gérant majoritaire, PFU jusqu'à
+    seuil_dividendes_tns_pc de `base_seuil_tns` (capital + CCA) et cotisations TNS + IR au-delà.
+    """
+    if dividendes_verses <= 0:
+        return 0
+    if not is_gerant_majoritaire:
+        return dividendes_verses * bareme.taux_pfu
+    seuil_tns = base_seuil_tns * bareme.seuil_dividendes_tns_pc
+    dividendes_charges_sociales = max(0, dividendes_verses - seuil_tns)
+    dividendes_pfu = dividendes_verses - dividendes_charges_sociales
+    return (dividendes_pfu * bareme.taux_pfu + dividendes_charges_sociales * bareme.taux_cotisations_tns +
+            dividendes_charges_sociales * bareme.taux_ir_dividendes_tns)
+
+# --- VERSIONS VECTORISÉES (MOTEUR BATCH) ---
+def impot_societes_batch(resultat_fiscal, bareme=None):
+    """Version vectorisée de calculer_impot_societes (barème scalaire ou par scénario)."""
+    bareme = bareme or bareme_fiscal()
+    base = np.maximum(resultat_fiscal, 0)
+    benefice_taux_reduit = np.minimum(base, bareme.seuil_is_taux_reduit)
+    return benefice_taux_reduit * bareme.taux_is_reduit + (base - benefice_taux_reduit) * bareme.taux_is_normal
+
+def impot_dividendes_batch(dividendes_verses, base_seuil_tns, is_gerant_majoritaire, bareme=None):
+    """Version vectorisée de calculer_impot_dividendes."""
+    bareme = bareme or bareme_fiscal()
+    dividendes_charges_sociales = np.maximum(0, dividendes_verses - base_seuil_tns * bareme.seuil_dividendes_tns_pc)
+    dividendes_pfu = dividendes_verses - dividendes_charges_sociales
+    impot_gerant = (dividendes_pfu * bareme.taux_pfu + dividendes_charges_sociales * bareme.taux_cotisations_tns +
+                    dividendes_charges_sociales * bareme.taux_ir_dividendes_tns)
+    return np.where(dividendes_verses > 0,
+                    np.where(is_gerant_majoritaire, impot_gerant, dividendes_verses * bareme.taux_pfu),
+                    0.0)
+
+def impot_plus_value_batch(plus_value_brute, duree_detention, bareme=None):
+    """
+    Version vectorisée de calculer_impot_plus_value : durée scalaire ou tableau,
+    barème scalaire ou par scénario (abattements lus dans les tables précalculées).
+    """
+    bareme = bareme or bareme_fiscal()
+    duree = np.clip(np.asarray(duree_detention).astype(int), 0, DUREE_DETENTION_MAX)
+    if np.ndim(bareme.abattements_ir) == 2 and duree.ndim:
+        lignes = np.arange(bareme.abattements_ir.shape[0])
+        abattement_ir = bareme.abattements_ir[lignes, duree]
+        abattement_ps = bareme.abattements_ps[lignes, duree]
+    else:
+        abattement_ir = bareme.abattements_ir[..., duree]
+        abattement_ps = bareme.abattements_ps[..., duree]
+    impot_ir = np.maximum(0, plus_value_brute * (1 - abattement_ir) * bareme.taux_ir_plus_value)
+    impot_ps = np.maximum(0, plus_value_brute * (1 - abattement_ps) * bareme.taux_ps_plus_value)
+    return np.where(plus_value_brute > 0, impot_ir + impot_ps, 0.0)
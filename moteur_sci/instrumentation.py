@@ -0,0 +1,268 @@
+# moteur_sci/instrumentation.py
+#
+# Mesure des temps des étapes chaudes (échéancier du prêt, boucle annuelle, TRI,
+# construction des DataFrames, rendu des tableaux) : compteurs et histogrammes de
+# latence par étape, exportés au format texte Prometheus et journalisés en JSON.
+#
+# Désactivée par défaut : mesurer() rend alors un contexte vide partagé et
+# chronometrer() la fonction d'origine, seuls deux tests de booléens restent sur le
+# chemin chaud. Activation pour tout le processus : variable d'environnement
+# SIMULATEUR_SCI_INSTRUMENTATION=1 ou activer_instrumentation() ; pour le seul thread
+# courant : relevé demandé avec `activer` (panneau de diagnostic d'une session).
+#
+# Les mesures sont propres au processus : les calculs des tâches en arrière-plan
+# (pool de processus) n'y figurent pas.
+
+import bisect
+import contextlib
+import functools
+import json
+import logging
+import os
+import threading
+import time
+
+# --- INSTRUMENTATION DES ÉTAPES ---
+VALEURS_VRAI = {"1", "true", "vrai", "oui", "yes"}
+INSTRUMENTATION_ACTIVE_DEFAUT = os.environ.get("SIMULATEUR_SCI_INSTRUMENTATION", "").strip().lower() in VALEURS_VRAI
+# Fichier texte Prometheus réécrit après chaque relevé (collecteur "textfile"), journal JSON
+CHEMIN_METRIQUES = os.environ.get("SIMULATEUR_SCI_METRIQUES")
+CHEMIN_JOURNAL_MESURES = os.environ.get("SIMULATEUR_SCI_JOURNAL_MESURES")
+PREFIXE_METRIQUES = "simulateur_sci"
+# Bornes supérieures (secondes) des classes des histogrammes de latence
+BORNES_HISTOGRAMME_S = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+                        0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+journal = logging.getLogger(__name__)
+
+class _Etat:
+    """Activation pour tout le processus."""
+    actif = INSTRUMENTATION_ACTIVE_DEFAUT
+
+class _EtatThread(threading.local):
+    """Activation et relevé en cours du thread (un rerun Streamlit par thread)."""
+    actif = False
+    releve = None
+
+_etat = _Etat()
+_local = _EtatThread()
+
+def activer_instrumentation(actif=True):
+    """Active (ou désactive) les mesures pour tout le processus."""
+    _etat.actif = bool(actif)
+
+def instrumentation_active():
+    """Les mesures sont-elles prises dans le thread courant ?"""
+    return _etat.actif or _local.actif
+
+class Mesures:
+    """
+    Registre des mesures du processus : par étape, nombre d'appels, durée totale et
+    histogramme de latence ; compteurs libres. Partagé entre threads (verrou).
+    """
+
+    def __init__(self, bornes=BORNES_HISTOGRAMME_S):
+        self.bornes = tuple(bornes)
+        self._durees = {} # Étape -> [nb, total, classes (len(bornes) + 1)]
+        self._compteurs = {}
+        self._verrou = threading.Lock()
+
+    def enregistrer(self, etape, duree):
+        classe = bisect.bisect_left(self.bornes, duree)
+        with self._verrou:
+            mesure = self._durees.get(etape)
+            if mesure is None:
+                mesure = self._durees[etape] = [0, 0.0, [0] * (len(self.bornes) + 1)]
+            mesure[0] += 1
+            mesure[1] += duree
+            mesure[2][classe] += 1
+
+    def compter(self, nom, valeur=1):
+        with self._verrou:
+            self._compteurs[nom] = self._compteurs.get(nom, 0) + valeur
+
+    def vider(self):
+        with self._verrou:
+            self._durees.clear()
+            self._compteurs.clear()
+
+    def statistiques(self):
+        """{"durees": {étape: {"nb", "total_s", "moyenne_s"}}, "compteurs": {nom: valeur}}."""
+        with self._verrou:
+            durees = {etape: {"nb": nb, "total_s": total, "moyenne_s": total / nb}
+                      for etape, (nb, total, _) in sorted(self._durees.items())}
+            return {"durees": durees, "compteurs": dict(sorted(self._compteurs.items()))}
+
+    def exporter(self):
+        """Mesures au format d'exposition texte Prometheus (histogrammes cumulés, compteurs *_total)."""
+        nom_histogramme = f"{PREFIXE_METRIQUES}_etape_duree_secondes"
+        lignes = [f"# HELP {nom_histogramme} Durée des étapes de calcul et d'affichage.",
+                  f"# TYPE {nom_histogramme} histogram"]
+        with self._verrou:
+            durees = {etape: (nb, total, list(classes)) for etape, (nb, total, classes) in self._durees.items()}
+            compteurs = dict(self._compteurs)
+        for etape, (nb, total, classes) in sorted(durees.items()):
+            etiquette = _etiquette(etape)
+            cumul = 0
+            for borne, effectif in zip(self.bornes, classes):
+                cumul += effectif
+                lignes.append(f'{nom_histogramme}_bucket{{etape="{etiquette}",le="{borne:g}"}} {cumul}')
+            lignes.append(f'{nom_histogramme}_bucket{{etape="{etiquette}",le="+Inf"}} {nb}')
+            lignes.append(f'{nom_histogramme}_sum{{etape="{etiquette}"}} {total:.9g}')
+            lignes.append(f'{nom_histogramme}_count{{etape="{etiquette}"}} {nb}')
+        nom_compteur = f"{PREFIXE_METRIQUES}_evenements_total"
+        lignes += [f"# HELP {nom_compteur} Compteurs d'événements (lignes rendues, projections...).",
+                   f"# TYPE {nom_compteur} counter"]
+        lignes += [f'{nom_compteur}{{nom="{_etiquette(nom)}"}} {valeur:g}' for nom, valeur in sorted(compteurs.items())]
+        return "\n".join(lignes) + "\n"
+
+def _etiquette(texte):
+    """Valeur d'étiquette Prometheus échappée."""
+    return str(texte).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+# Un registre par processus (partagé par les sessions Streamlit, comme les caches)
+_mesures = Mesures()
+
+def mesures():
+    return _mesures
+
+def _enregistrer(etape, duree):
+    _mesures.enregistrer(etape, duree)
+    releve = _local.releve
+    if releve is not None:
+        releve._ajouter(etape, duree)
+
+class _Chronometre:
+    __slots__ = ("etape", "debut")
+
+    def __init__(self, etape):
+        self.etape = etape
+
+    def __enter__(self):
+        self.debut = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        _enregistrer(self.etape, time.perf_counter() - self.debut)
+        return False
+
+_SANS_MESURE = contextlib.nullcontext()
+
+def mesurer(etape):
+    """Contexte qui chronomètre `etape` ; contexte vide partagé si l'instrumentation est désactivée."""
+    return _Chronometre(etape) if _etat.actif or _local.actif else _SANS_MESURE
+
+def chronometrer(etape, fonction):
+    """
+    `fonction` chronométrée sous `etape` si l'instrumentation est active, `fonction` elle-même
+    sinon. À appeler hors des boucles (ex. méthode d'un solveur appelée à chaque année).
+    """
+    if not (_etat.actif or _local.actif):
+        return fonction
+
+    def fonction_chronometree(*args, **kwargs):
+        debut = time.perf_counter()
+        try:
+            return fonction(*args, **kwargs)
+        finally:
+            _enregistrer(etape, time.perf_counter() - debut)
+    return fonction_chronometree
+
+def instrumenter(etape):
+    """Décorateur : chaque appel est chronométré sous `etape` quand l'instrumentation est active."""
+    def decorer(fonction):
+        @functools.wraps(fonction)
+        def fonction_instrumentee(*args, **kwargs):
+            if not (_etat.actif or _local.actif):
+                return fonction(*args, **kwargs)
+            debut = time.perf_counter()
+            try:
+                return fonction(*args, **kwargs)
+            finally:
+                _enregistrer(etape, time.perf_counter() - debut)
+        return fonction_instrumentee
+    return decorer
+
+def debut_mesure():
+    """
+    Horodatage de début pour fin_mesure() (None si l'instrumentation est désactivée) :
+    mesure d'un bloc long sans le réindenter dans un `with`.
+    """
+    return time.perf_counter() if _etat.actif or _local.actif else None
+
+def fin_mesure(etape, debut):
+    if debut is not None:
+        _enregistrer(etape, time.perf_counter() - debut)
+
+def compter(nom, valeur=1):
+    """Incrémente le compteur `nom` (sans effet si l'instrumentation est désactivée)."""
+    if _etat.actif or _local.actif:
+        _mesures.compter(nom, valeur)
+
+# --- RELEVÉ PAR RERUN ---
+class Releve:
+    """Décomposition des temps d'un rerun (ou de tout bloc) : {étape: [nb, total]}, dans l'ordre d'apparition."""
+
+    def __init__(self):
+        self.etapes = {}
+        self.duree = 0.0
+
+    def _ajouter(self, etape, duree):
+        mesure = self.etapes.get(etape)
+        if mesure is None:
+            self.etapes[etape] = [1, duree]
+        else:
+            mesure[0] += 1
+            mesure[1] += duree
+
+    def vers_dict(self):
+        return {"duree_s": round(self.duree, 6),
+                "etapes": {etape: {"nb": nb, "total_s": round(total, 6)} for etape, (nb, total) in self.etapes.items()}}
+
+@contextlib.contextmanager
+def releve_mesures(activer=False, **contexte):
+    """
+    Relevé des étapes chronométrées dans le thread courant pendant le bloc. `activer` :
+    active l'instrumentation le temps du bloc pour ce seul thread (panneau de diagnostic) ;
+    les autres threads (sessions) restent sans mesure. En fin de bloc, si les mesures
+    étaient prises : une ligne JSON dans le journal (avec `contexte`) et réécriture du
+    fichier CHEMIN_METRIQUES s'il est configuré.
+    """
+    releve = Releve()
+    actif_precedent, releve_precedent = _local.actif, _local.releve
+    _local.actif = actif_precedent or activer
+    actif = _etat.actif or _local.actif
+    _local.releve = releve if actif else None
+    debut = time.perf_counter()
+    try:
+        yield releve
+    finally:
+        releve.duree = time.perf_counter() - debut
+        _local.actif, _local.releve = actif_precedent, releve_precedent
+        if actif:
+            journal.info(json.dumps({"evenement": "releve", "horodatage": time.time(), **contexte,
+                                     **releve.vers_dict()}, ensure_ascii=False))
+            if CHEMIN_METRIQUES:
+                ecrire_mesures(CHEMIN_METRIQUES)
+
+def exporter_mesures():
+    """Mesures du processus au format texte Prometheus."""
+    return _mesures.exporter()
+
+def ecrire_mesures(chemin):
+    """Écrit exporter_mesures() dans `chemin` (remplacement atomique, lisible par un collecteur)."""
+    temporaire = f"{chemin}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temporaire, "w", encoding="utf-8") as f:
+        f.write(exporter_mesures())
+    os.replace(temporaire, chemin)
+
+def configurer_journal(chemin=None):
+    """Journal JSON des relevés : une ligne par relevé, dans `chemin` (stderr si None)."""
+    gestionnaire = logging.FileHandler(chemin, encoding="utf-8") if chemin else logging.StreamHandler()
+    gestionnaire.setFormatter(logging.Formatter("%(message)s"))
+    journal.addHandler(gestionnaire)
+    journal.setLevel(logging.INFO)
+    return gestionnaire
+
+if CHEMIN_JOURNAL_MESURES:
+    configurer_journal(CHEMIN_JOURNAL_MESURES)
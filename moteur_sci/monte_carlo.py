@@ -0,0 +1,111 @@
+# moteur_sci/monte_carlo.py
+#
+# Mode Monte Carlo : hypothèses aléatoires, lots répartis sur un pool de processus.
+
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .batch import PARAMETRES_DEFAUT_BATCH, generer_projection_sci_is_batch
+
+# --- MODE MONTE CARLO (RISQUE) ---
+# Hypothèses tirées aléatoirement : trajectoires annuelles pour les trois premières,
+# taux du prêt tiré une fois par simulation (prêt à taux fixe souscrit à l'achat)
+HYPOTHESES_MONTE_CARLO = ["inflation_pc", "revalo_bien_pc", "taux_occupation_pc", "taux_interet_pret"]
+VOLATILITES_MONTE_CARLO_DEFAUT = {
+    "inflation_pc": 1.0, "revalo_bien_pc": 2.0, "taux_occupation_pc": 5.0, "taux_interet_pret": 0.75,
+}
+COLONNES_MONTE_CARLO = ["TRI (Immeuble) (%)", "TRI (Parts) (%)", "Tréso. SCI", "Solde CCA"]
+PERCENTILES_MONTE_CARLO = (5, 25, 50, 75, 95)
+TAILLE_LOT_MONTE_CARLO = 2000
+
+def _tirer_hypotheses_monte_carlo(params, volatilites, correlation, nb_annees, taille, graine):
+    """
+    Tire `taille` jeux d'hypothèses : chocs gaussiens annuels (écarts-types en points
+    de %), corrélés entre hypothèses via Cholesky si `correlation` (matrice 4x4) est fournie.
+    Retourne (trajectoires, taux_interet_pret).
+    """
+    rng = np.random.default_rng(graine)
+    chocs = rng.standard_normal((taille, nb_annees, len(HYPOTHESES_MONTE_CARLO)))
+    if correlation is not None:
+        chocs = chocs @ np.linalg.cholesky(np.asarray(correlation, dtype=float)).T
+    centres = np.array([float(params.get(h, PARAMETRES_DEFAUT_BATCH[h])) for h in HYPOTHESES_MONTE_CARLO])
+    ecarts = np.array([float(volatilites.get(h, 0)) for h in HYPOTHESES_MONTE_CARLO])
+    valeurs = centres + chocs * ecarts
+
+    trajectoires = {
+        "inflation_pc": valeurs[:, :, 0],
+        "revalo_bien_pc": np.maximum(valeurs[:, :, 1], -100),
+        "taux_occupation_pc": np.clip(valeurs[:, :, 2], 0, 100),
+    }
+    taux_interet_pret = np.maximum(valeurs[:, 0, 3], 0)
+    return trajectoires, taux_interet_pret
+
+def _executer_lot_monte_carlo(params, volatilites, correlation, taille, graine):
+    """Un lot de simulations (exécuté dans un processus du pool). Résultats en float32."""
+    duree_pret = int(params.get("duree_pret", 0))
+    nb_annees = max(duree_pret, 1) + 25
+    trajectoires, taux_interet_pret = _tirer_hypotheses_monte_carlo(
+        params, volatilites, correlation, nb_annees, taille, graine)
+    scenarios = dict(params)
+    scenarios["taux_interet_pret"] = taux_interet_pret
+    resultats = generer_projection_sci_is_batch(scenarios, trajectoires)
+    return {col: resultats[col].astype(np.float32) for col in COLONNES_MONTE_CARLO + ["Abondement"]}
+
+def _assembler_monte_carlo(lots):
+    """Agrège les lots terminés (None : lot en attente) en résultat de simuler_monte_carlo."""
+    import pandas as pd
+
+    lots = [lot for lot in lots if lot is not None]
+    resultats = {col: np.concatenate([lot[col] for lot in lots]) for col in lots[0]}
+    nb_simulations, nb_annees = resultats["Abondement"].shape
+    percentiles = {}
+    for col in COLONNES_MONTE_CARLO:
+        with np.errstate(all="ignore"):
+            valeurs = np.nanpercentile(resultats[col], PERCENTILES_MONTE_CARLO, axis=0)
+        for p, ligne in zip(PERCENTILES_MONTE_CARLO, valeurs):
+            percentiles[f"{col} P{p}"] = ligne
+    annees = pd.Index(np.arange(1, nb_annees + 1), name="Année")
+    abondement = resultats["Abondement"] > 0
+    return {
+        "percentiles": pd.DataFrame(percentiles, index=annees),
+        "proba_abondement": pd.Series(abondement.mean(axis=0), index=annees, name="Probabilité d'abondement"),
+        "proba_abondement_totale": float(abondement.any(axis=1).mean()),
+        "nb_simulations": int(nb_simulations),
+    }
+
+def decouper_monte_carlo(params, nb_simulations=10000, volatilites=None, correlation=None, graine=0):
+    """
+    Découpe simuler_monte_carlo en lots de TAILLE_LOT_MONTE_CARLO indépendants.
+    Retourne (sous_taches, assembler) : sous_taches = [(fonction, args)] picklables,
+    assembler(lots) agrège les lots terminés (résultat partiel tant qu'il en manque).
+    """
+    volatilites = VOLATILITES_MONTE_CARLO_DEFAUT if volatilites is None else volatilites
+    nb_lots = max(1, -(-int(nb_simulations) // TAILLE_LOT_MONTE_CARLO))
+    tailles = [TAILLE_LOT_MONTE_CARLO] * (nb_lots - 1) + [int(nb_simulations) - TAILLE_LOT_MONTE_CARLO * (nb_lots - 1)]
+    graines = np.random.SeedSequence(graine).spawn(nb_lots)
+    params = {cle: valeur for cle, valeur in params.items()} # Copie picklable
+    sous_taches = [(_executer_lot_monte_carlo, (params, volatilites, correlation, t, g)) for t, g in zip(tailles, graines)]
+    return sous_taches, _assembler_monte_carlo
+
+def simuler_monte_carlo(params, nb_simulations=10000, volatilites=None, correlation=None,
+                        graine=0, nb_processus=None):
+    """
+    Mode Monte Carlo : `nb_simulations` projections de `params` sous hypothèses aléatoires.
+    Les simulations sont découpées en lots de TAILLE_LOT_MONTE_CARLO, chacun avec sa
+    propre graine issue de SeedSequence(graine) : le résultat est reproductible et ne
+    dépend pas du nombre de processus. nb_processus=None -> tous les cœurs, 1 -> sans pool.
+
+    Retourne un dict :
+      - "percentiles" : DataFrame indexé par année, colonnes "<colonne> P<p>",
+      - "proba_abondement" : Series, probabilité d'un abondement en CCA chaque année,
+      - "proba_abondement_totale" : probabilité d'au moins un abondement sur l'horizon,
+      - "nb_simulations".
+    """
+    sous_taches, assembler = decouper_monte_carlo(params, nb_simulations, volatilites, correlation, graine)
+    if nb_processus == 1 or len(sous_taches) == 1:
+        lots = [fonction(*args) for fonction, args in sous_taches]
+    else:
+        with ProcessPoolExecutor(max_workers=nb_processus) as executeur:
+            lots = list(executeur.map(sous_taches[0][0], *zip(*(args for _, args in sous_taches))))
+    return assembler(lots)
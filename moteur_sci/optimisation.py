@@ -0,0 +1,187 @@
+# moteur_sci/optimisation.py
+#
+# Optimiseur de sortie : meilleure année de revente, type de sortie (immeuble / parts)
+# et leviers de structuration, sous contraintes d'abondement en CCA.
+
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .batch import PARAMETRES_DEFAUT_BATCH, generer_projection_sci_is_batch
+from .projection import TYPES_SORTIE
+
+# --- OPTIMISATION DE LA SORTIE ---
+# Colonne de la projection à maximiser, par objectif et par type de sortie (TYPES_SORTIE)
+OBJECTIFS_OPTIMISATION = {
+    "TRI": ["TRI (Immeuble) (%)", "TRI (Parts) (%)"],
+    "Bénéfice net": ["Bénéfice Net (Immeuble)", "Bénéfice Net (Parts)"],
+}
+COLONNES_OPTIMISATION = [
+    "Année de sortie", "Type de sortie", "Taux distrib. (%)", "Remboursement CCA",
+    "Capital social", "Apport en CCA", "TRI (%)", "Bénéfice net",
+    "Abondement max annuel", "Abondement cumulé",
+]
+TAILLE_LOT_OPTIMISATION = 2000
+NB_AFFINAGES_OPTIMISATION = 2 # Passes de raffinement autour des meilleurs candidats
+NB_CANDIDATS_AFFINES = 5
+
+def _evaluer_lot_optimisation(params, candidats, objectif, annee_min, annee_max,
+                              abondement_max, abondement_cumule_max):
+    """
+    Évalue un lot de candidats (dict levier -> tableau (n,)) : une passe du moteur vectorisé
+    donne, pour chaque candidat, toutes les années de sortie et les deux types de sortie.
+    Ne retourne que la meilleure sortie admissible de chaque candidat (objectif -inf sinon).
+    """
+    scenarios = dict(params)
+    scenarios.update(candidats)
+    resultats = generer_projection_sci_is_batch(scenarios, annee_max=annee_max)
+    annees = resultats["Année"]
+    n, nb_annees = resultats["Abondement"].shape
+
+    # Contraintes : l'abondement exigé jusqu'à l'année de sortie reste sous les plafonds
+    abondement = np.nan_to_num(resultats["Abondement"])
+    abondement_max_annuel = np.maximum.accumulate(abondement, axis=1)
+    abondement_cumule = np.cumsum(abondement, axis=1)
+    admissible = np.broadcast_to(annees >= annee_min, (n, nb_annees)).copy()
+    if abondement_max is not None:
+        admissible &= abondement_max_annuel <= abondement_max
+    if abondement_cumule_max is not None:
+        admissible &= abondement_cumule <= abondement_cumule_max
+
+    valeurs = np.stack([resultats[col] for col in OBJECTIFS_OPTIMISATION[objectif]], axis=1) # (n, types, T)
+    valeurs = np.where(admissible[:, None, :] & ~np.isnan(valeurs), valeurs, -np.inf)
+    meilleur = valeurs.reshape(n, -1).argmax(axis=1)
+    type_sortie, indice_annee = np.divmod(meilleur, nb_annees)
+    lignes = np.arange(n)
+
+    def extraire(colonnes):
+        return np.stack([resultats[col] for col in colonnes], axis=1)[lignes, type_sortie, indice_annee]
+
+    return {
+        "objectif": valeurs[lignes, type_sortie, indice_annee],
+        "annee": annees[indice_annee],
+        "type": type_sortie,
+        "tri": extraire(OBJECTIFS_OPTIMISATION["TRI"]),
+        "benefice": extraire(OBJECTIFS_OPTIMISATION["Bénéfice net"]),
+        "abondement_max": abondement_max_annuel[lignes, indice_annee],
+        "abondement_cumule": abondement_cumule[lignes, indice_annee],
+    }
+
+def _evaluer_candidats(params, candidats, options, nb_processus):
+    """Découpe les candidats en lots de TAILLE_LOT_OPTIMISATION (pool de processus si demandé)."""
+    n = candidats["taux_distrib_pc"].size
+    lots = [{cle: valeurs[debut:debut + TAILLE_LOT_OPTIMISATION] for cle, valeurs in candidats.items()}
+            for debut in range(0, n, TAILLE_LOT_OPTIMISATION)]
+    if nb_processus == 1 or len(lots) == 1:
+        evaluations = [_evaluer_lot_optimisation(params, lot, *options) for lot in lots]
+    else:
+        with ProcessPoolExecutor(max_workers=nb_processus) as executeur:
+            evaluations = list(executeur.map(_evaluer_lot_optimisation, [params] * len(lots), lots,
+                                             *[[option] * len(lots) for option in options]))
+    return {cle: np.concatenate([e[cle] for e in evaluations]) for cle in evaluations[0]}
+
+def _grille_candidats(taux_distrib, remboursement_cca, parts_capital, fonds_propres):
+    """Produit cartésien des leviers -> dict de tableaux (n,) prêt pour le moteur."""
+    t, r, p = (g.ravel() for g in np.meshgrid(taux_distrib, remboursement_cca, parts_capital, indexing="ij"))
+    return {
+        "taux_distrib_pc": t,
+        "autoriser_remboursement_cca": r.astype(bool),
+        "capital_social": p * fonds_propres,
+        "apport_personnel": (1 - p) * fonds_propres,
+    }
+
+def optimiser_sortie(params, objectif="TRI", abondement_max=None, abondement_cumule_max=None,
+                     annee_min=1, annee_max=None, valeurs_taux_distrib=None,
+                     valeurs_remboursement_cca=(True, False), nb_parts_capital=11,
+                     nb_meilleurs=10, nb_processus=1):
+    """
+    Cherche la combinaison (année de sortie, type de sortie, taux de distribution,
+    remboursement du CCA, répartition capital social / apport en CCA) qui maximise
+    `objectif` ("TRI" ou "Bénéfice net"). Les fonds propres (capital social + apport
+    en CCA de `params`) sont conservés, seule leur répartition varie.
+
+    Contraintes : `abondement_max` (abondement annuel) et `abondement_cumule_max`
+    ne doivent jamais être dépassés jusqu'à l'année de sortie ; sortie entre
+    `annee_min` et `annee_max` (la simulation s'arrête à `annee_max`).
+
+    Recherche : grille grossière évaluée par lots vectorisés, puis
+    NB_AFFINAGES_OPTIMISATION passes de raffinement (pas divisé par deux) autour des
+    NB_CANDIDATS_AFFINES meilleurs candidats admissibles ; le reste de l'espace est élagué.
+
+    Retourne un dict :
+      - "meilleur" : dict (COLONNES_OPTIMISATION) de la meilleure combinaison, None si aucune n'est admissible,
+      - "classement" : DataFrame des `nb_meilleurs` candidats admissibles (meilleure sortie de chacun),
+      - "nb_candidats" / "nb_evaluations" : candidats évalués / combinaisons (candidat x année x type).
+    """
+    import pandas as pd
+
+    if objectif not in OBJECTIFS_OPTIMISATION:
+        raise ValueError(f"objectif inconnu : {objectif!r} (attendu : {', '.join(OBJECTIFS_OPTIMISATION)})")
+    params = {cle: valeur for cle, valeur in params.items()} # Copie picklable
+    fonds_propres = (float(params.get("capital_social", PARAMETRES_DEFAUT_BATCH["capital_social"]))
+                     + float(params.get("apport_personnel", PARAMETRES_DEFAUT_BATCH["apport_personnel"])))
+    options = (objectif, annee_min, annee_max, abondement_max, abondement_cumule_max)
+
+    # --- Grille grossière ---
+    taux_distrib = np.linspace(0, 100, 11) if valeurs_taux_distrib is None else np.asarray(valeurs_taux_distrib, dtype=float)
+    parts_capital = np.linspace(0, 1, max(2, int(nb_parts_capital))) if fonds_propres > 0 else np.zeros(1)
+    remboursement_cca = np.asarray(valeurs_remboursement_cca, dtype=bool)
+    candidats = _grille_candidats(taux_distrib, remboursement_cca, parts_capital, fonds_propres)
+    evaluations = _evaluer_candidats(params, candidats, options, nb_processus)
+
+    # --- Raffinement autour des meilleurs candidats (leviers continus) ---
+    pas_distrib = np.diff(np.unique(taux_distrib)).min() / 2 if np.unique(taux_distrib).size > 1 else 0.0
+    pas_capital = np.diff(parts_capital).min() / 2 if parts_capital.size > 1 else 0.0
+    deja_evalues = {(round(t, 9), bool(r), round(c, 6))
+                    for t, r, c in zip(candidats["taux_distrib_pc"], candidats["autoriser_remboursement_cca"], candidats["capital_social"])}
+    for _ in range(NB_AFFINAGES_OPTIMISATION):
+        if pas_distrib == 0 and pas_capital == 0:
+            break
+        meilleurs = np.argsort(-evaluations["objectif"], kind="stable")[:NB_CANDIDATS_AFFINES]
+        meilleurs = meilleurs[np.isfinite(evaluations["objectif"][meilleurs])]
+        voisins = []
+        for i in meilleurs:
+            part = candidats["capital_social"][i] / fonds_propres if fonds_propres > 0 else 0.0
+            grille = _grille_candidats(
+                np.clip(candidats["taux_distrib_pc"][i] + np.array([-pas_distrib, 0, pas_distrib]), 0, 100),
+                candidats["autoriser_remboursement_cca"][i:i + 1],
+                np.clip(part + np.array([-pas_capital, 0, pas_capital]), 0, 1), fonds_propres)
+            for t, r, c in zip(grille["taux_distrib_pc"], grille["autoriser_remboursement_cca"], grille["capital_social"]):
+                cle = (round(t, 9), bool(r), round(c, 6))
+                if cle not in deja_evalues:
+                    deja_evalues.add(cle)
+                    voisins.append((t, r, c))
+        if not voisins:
+            break
+        t, r, c = (np.array(v) for v in zip(*voisins))
+        nouveaux = {"taux_distrib_pc": t, "autoriser_remboursement_cca": r.astype(bool),
+                    "capital_social": c, "apport_personnel": fonds_propres - c}
+        nouvelles_evaluations = _evaluer_candidats(params, nouveaux, options, nb_processus)
+        candidats = {cle: np.concatenate([candidats[cle], nouveaux[cle]]) for cle in candidats}
+        evaluations = {cle: np.concatenate([evaluations[cle], nouvelles_evaluations[cle]]) for cle in evaluations}
+        pas_distrib, pas_capital = pas_distrib / 2, pas_capital / 2
+
+    # --- Classement des candidats admissibles ---
+    admissibles = np.flatnonzero(np.isfinite(evaluations["objectif"]))
+    ordre = admissibles[np.argsort(-evaluations["objectif"][admissibles], kind="stable")][:nb_meilleurs]
+    classement = pd.DataFrame({
+        "Année de sortie": evaluations["annee"][ordre],
+        "Type de sortie": np.array(TYPES_SORTIE)[evaluations["type"][ordre]],
+        "Taux distrib. (%)": candidats["taux_distrib_pc"][ordre],
+        "Remboursement CCA": candidats["autoriser_remboursement_cca"][ordre],
+        "Capital social": candidats["capital_social"][ordre],
+        "Apport en CCA": candidats["apport_personnel"][ordre],
+        "TRI (%)": evaluations["tri"][ordre],
+        "Bénéfice net": evaluations["benefice"][ordre],
+        "Abondement max annuel": evaluations["abondement_max"][ordre],
+        "Abondement cumulé": evaluations["abondement_cumule"][ordre],
+    }, columns=COLONNES_OPTIMISATION)
+    nb_candidats = candidats["taux_distrib_pc"].size
+    nb_annees = max(1, int(params.get("duree_pret", 0))) + 25
+    nb_annees = nb_annees if annee_max is None else min(nb_annees, annee_max)
+    return {
+        "meilleur": classement.iloc[0].to_dict() if len(classement) else None,
+        "classement": classement,
+        "nb_candidats": int(nb_candidats),
+        "nb_evaluations": int(nb_candidats * len(TYPES_SORTIE) * max(0, nb_annees - annee_min + 1)),
+    }
@@ -0,0 +1,270 @@
+# moteur_sci/portefeuille.py
+#
+# Mode portefeuille : plusieurs biens (lots) détenus par une même SCI à l'IS.
+# Les montants de chaque lot (loyers, charges, prêt, amortissements, valeur de revente)
+# sont calculés en tableaux (lots x années) sans boucle Python par lot ; seuls l'IS
+# (un seul barème 15 % / 25 % par société), la trésorerie, le CCA et les dividendes
+# sont consolidés année par année, au niveau de la SCI.
+
+import numpy as np
+
+from .batch import _normaliser_scenarios
+from .fiscalite import (VERSION_FISCALE_DEFAUT, bareme_fiscal, calculer_impot_dividendes,
+                        calculer_impot_plus_value, calculer_impot_societes)
+from .pret import generer_tableau_amortissement
+from .projection import COLONNES_PROJECTION, COLONNES_STATUT_TRI, ProjectionSCI, selection_sorties
+from .tri import SolveurTRI, STATUT_TRI_NON_CALCULE
+
+# --- MODE PORTEFEUILLE (MULTI-BIENS) ---
+# Paramètres propres à chaque lot (mêmes noms que `params`). Les montants d'un lot sont
+# exprimés à son année d'achat (indexation et revalorisation à partir de cette année).
+# apport_personnel / capital_social : apport en CCA et capital souscrits à l'achat du lot.
+PARAMETRES_DEFAUT_LOT = {
+    "annee_achat": 1, "prix_achat": 0, "cout_travaux": 0, "valeur_meubles": 0, "frais_notaire": 0,
+    "frais_dossier": 0, "capital_social": 0, "apport_personnel": 0, "duree_pret": 0,
+    "taux_interet_pret": 0, "taux_assurance_pret": 0, "loyer_mensuel": 0,
+    "taux_occupation_pc": 100, "charges_copro": 0, "taxe_fonciere": 0,
+    "frais_gestion_pc": 0, "taux_gli_pc": 0, "assurance_pno": 0,
+    "provision_gros_travaux_pc": 0, "duree_amort_immo": 1, "duree_amort_travaux": 1,
+    "duree_amort_meubles": 1, "part_terrain_pc": 0, "revalo_bien_pc": 0,
+}
+# Paramètres de la société (une seule CFE, une seule politique de distribution)
+PARAMETRES_DEFAUT_SCI = {
+    "cfe": 0, "taux_distrib_pc": 100, "inflation_pc": 0,
+    "is_gerant_majoritaire": False, "autoriser_remboursement_cca": True,
+    "version_fiscale": VERSION_FISCALE_DEFAUT,
+}
+# Détail par lot (tableaux (lots, années), nuls avant l'achat)
+COLONNES_LOTS = [
+    "Loyers Annuels", "Charges", "Intérêts", "Amortissements",
+    "Résultat avant IS", "CRD", "Valeur de revente",
+]
+
+def _calendrier_pret(tableau, age, pendant_credit):
+    """Ramène un échéancier (lots, années de prêt) au calendrier de la SCI (lots, T)."""
+    if tableau.shape[1] == 0:
+        return np.zeros(age.shape)
+    indices = np.clip(age - 1, 0, tableau.shape[1] - 1)
+    return np.where(pendant_credit, np.take_along_axis(tableau, indices, axis=1), 0.0)
+
+def generer_projection_portefeuille(biens, params_sci=None, annee_max=None, annees_sortie=None, types_sortie=None):
+    """
+    Projection consolidée d'une SCI à l'IS détenant plusieurs biens.
+    `biens` : liste de dicts, DataFrame ou dict de colonnes (PARAMETRES_DEFAUT_LOT),
+    chaque lot avec son année d'achat, son prêt et ses durées d'amortissement.
+    `params_sci` : paramètres de la société (PARAMETRES_DEFAUT_SCI).
+
+    Chaque année : résultat fiscal et IS de la société (barème appliqué une fois),
+    trésorerie, CCA et dividendes communs. Les scénarios de sortie portent sur tout le
+    portefeuille détenu à l'année N (revente des biens ou des parts, parts détenues
+    depuis l'année 1). Un portefeuille d'un seul lot acheté l'année 1 reproduit
+    generer_projection_sci_is. `annees_sortie` / `types_sortie` : comme pour
+    generer_projection_sci_is, seules ces sorties sont évaluées.
+
+    Retourne un dict :
+      - "projection" : ProjectionSCI consolidée (duree_pret : dernière année de crédit),
+      - "lots" : dict {colonne: tableau (nb_lots, T)} (COLONNES_LOTS) et "Année d'achat" (nb_lots,).
+    """
+    annees_sortie, types_sortie = selection_sorties(annees_sortie, types_sortie)
+    v = _normaliser_scenarios(biens, PARAMETRES_DEFAUT_LOT)
+    sci = {**PARAMETRES_DEFAUT_SCI, **(params_sci or {})}
+    nb_lots = v["prix_achat"].shape[0]
+    if nb_lots == 0:
+        raise ValueError("Le portefeuille ne contient aucun bien.")
+
+    annee_achat = np.maximum(1, np.trunc(v["annee_achat"]).astype(int))
+    duree_pret = np.trunc(v["duree_pret"]).astype(int)
+    duree_pret = np.where(duree_pret <= 0, 1, duree_pret)
+    fin_credit = annee_achat + duree_pret - 1
+    nb_annees = int(fin_credit.max()) + 25
+    if annee_max is not None:
+        nb_annees = min(nb_annees, max(1, int(annee_max)))
+    annees = np.arange(1, nb_annees + 1)
+
+    # --- Calendrier de chaque lot (lots, T) ---
+    age = annees[None, :] - annee_achat[:, None] + 1 # 1 l'année d'achat
+    detenu = age >= 1
+    age_detenu = np.maximum(age, 1)
+    facteur_inflation = np.where(detenu, (1 + sci["inflation_pc"] / 100) ** (age_detenu - 1), 0.0)
+
+    cout_acquisition = v["prix_achat"] + v["cout_travaux"]
+    loyer_annuel = (v["loyer_mensuel"] * 12)[:, None] * facteur_inflation * (v["taux_occupation_pc"] / 100)[:, None]
+    charges_copro_annuelles = (v["charges_copro"] * 12)[:, None] * facteur_inflation
+    taxe_fonciere_actuelle = v["taxe_fonciere"][:, None] * facteur_inflation
+    frais_gestion_annuels = loyer_annuel * (v["frais_gestion_pc"] / 100)[:, None]
+    gli_annuelle = (loyer_annuel + charges_copro_annuelles) * (v["taux_gli_pc"] / 100)[:, None]
+    prix_revente = np.where(detenu, cout_acquisition[:, None] * (1 + v["revalo_bien_pc"] / 100)[:, None] ** age_detenu, 0.0)
+    provision_gros_travaux_annuelle = prix_revente * (v["provision_gros_travaux_pc"] / 100)[:, None]
+    charges_annuelles_cash = (charges_copro_annuelles + taxe_fonciere_actuelle +
+                              np.where(detenu, v["assurance_pno"][:, None], 0.0) + frais_gestion_annuels +
+                              gli_annuelle + provision_gros_travaux_annuelle +
+                              np.where(age == 1, v["frais_dossier"][:, None], 0.0))
+
+    # Prêt de chaque lot, décalé à son année d'achat
+    montant_pret = cout_acquisition + v["frais_notaire"] - v["apport_personnel"] - v["capital_social"]
+    echeancier_pret = generer_tableau_amortissement(montant_pret, v["taux_interet_pret"], duree_pret)
+    pendant_credit = detenu & (age <= duree_pret[:, None])
+    interets_pret = _calendrier_pret(echeancier_pret.interet, age, pendant_credit)
+    principal_pret = _calendrier_pret(echeancier_pret.principal, age, pendant_credit)
+    crd_pret = _calendrier_pret(echeancier_pret.crd_fin_annee, age, pendant_credit)
+    mensualite_assurance = (montant_pret * (v["taux_assurance_pret"] / 100)) / 12
+    assurance_pret = np.where(pendant_credit, (mensualite_assurance * 12)[:, None], 0.0)
+
+    # Amortissements et valeur nette comptable de chaque lot
+    part_terrain = v["part_terrain_pc"] / 100
+    base_amort_immo_frais = (v["prix_achat"] * (1 - part_terrain)) + v["frais_notaire"]
+    base_vnc_globale = cout_acquisition + v["frais_notaire"] + v["valeur_meubles"]
+    amortissements = np.zeros(age.shape)
+    for base, duree in ((base_amort_immo_frais, v["duree_amort_immo"]), (v["cout_travaux"], v["duree_amort_travaux"]),
+                        (v["valeur_meubles"], v["duree_amort_meubles"])):
+        duree = np.maximum(1, duree)
+        amortissements += np.where(detenu & (age <= duree[:, None]), (base / duree)[:, None], 0.0)
+    valeur_nette_comptable = np.where(detenu, base_vnc_globale[:, None] - np.cumsum(amortissements, axis=1), 0.0)
+
+    resultat_avant_is = (loyer_annuel - (charges_annuelles_cash - provision_gros_travaux_annuelle)
+                         - interets_pret - assurance_pret - amortissements)
+
+    # --- Consolidation (T,) : sommes sur les lots ---
+    cfe = np.where(annees >= annee_achat.min(), sci["cfe"] * (1 + sci["inflation_pc"] / 100) ** (annees - 1), 0.0)
+    achats = np.minimum(annee_achat, nb_annees + 1) - 1 # Achats postérieurs à l'horizon regroupés hors calendrier
+    def par_annee_achat(montants):
+        return np.bincount(achats, weights=montants, minlength=nb_annees + 1)[:nb_annees]
+    investissement_annee = par_annee_achat(v["apport_personnel"] + v["capital_social"] + v["frais_dossier"]).tolist()
+    apport_cca_annee = par_annee_achat(v["apport_personnel"]).tolist()
+    capital_social_annee = par_annee_achat(v["capital_social"]).tolist()
+
+    loyers = loyer_annuel.sum(axis=0).tolist()
+    charges_cash = (charges_annuelles_cash.sum(axis=0) + cfe).tolist()
+    provisions = provision_gros_travaux_annuelle.sum(axis=0).tolist()
+    interets = interets_pret.sum(axis=0).tolist()
+    principal = principal_pret.sum(axis=0).tolist()
+    assurances = assurance_pret.sum(axis=0).tolist()
+    amortissement = amortissements.sum(axis=0).tolist()
+    reventes = prix_revente.sum(axis=0).tolist()
+    vnc = valeur_nette_comptable.sum(axis=0).tolist()
+    crds = crd_pret.sum(axis=0).tolist()
+
+    taux_distrib = sci["taux_distrib_pc"] / 100
+    is_gerant_majoritaire = bool(sci["is_gerant_majoritaire"])
+    autoriser_remboursement_cca = bool(sci["autoriser_remboursement_cca"])
+    bareme = bareme_fiscal(sci["version_fiscale"])
+
+    # --- Variables d'état de la SCI ---
+    solde_cca = 0.0
+    capital_social = 0.0
+    apport_cca_cumule = 0.0
+    investissement_cumule = 0.0
+    cashflow_investisseur_accumule = 0.0
+    tresorerie_sci_cumulee = 0.0
+    abondement_cumule = 0.0
+    lignes = []
+    statuts_tri = []
+    solveur_tri = SolveurTRI(-investissement_annee[0], nb_annees + 1)
+
+    for i in range(nb_annees):
+        annee = i + 1
+        # Apports des lots achetés cette année (ils financent l'achat, pas la trésorerie)
+        solde_cca += apport_cca_annee[i]
+        apport_cca_cumule += apport_cca_annee[i]
+        capital_social += capital_social_annee[i]
+        investissement_cumule += investissement_annee[i]
+
+        mensualite_credit_annuelle = interets[i] + principal[i] + assurances[i]
+        charges_deductibles_totales = (charges_cash[i] - provisions[i]) + interets[i] + assurances[i]
+        resultat_fiscal_exploitation = loyers[i] - charges_deductibles_totales - amortissement[i]
+        is_exploitation = calculer_impot_societes(resultat_fiscal_exploitation, bareme)
+        resultat_net_comptable = resultat_fiscal_exploitation - is_exploitation
+
+        # --- Trésorerie et CCA ---
+        cashflow_sci_avant_is = loyers[i] - charges_cash[i] - mensualite_credit_annuelle
+        tresorerie_sci_avant_operations = tresorerie_sci_cumulee + cashflow_sci_avant_is - is_exploitation
+        abondement = 0.0
+        if tresorerie_sci_avant_operations < 0:
+            abondement = -tresorerie_sci_avant_operations
+            abondement_cumule += abondement
+            solde_cca += abondement
+            tresorerie_sci_cumulee = 0.0
+        else:
+            tresorerie_sci_cumulee = tresorerie_sci_avant_operations
+
+        # --- Distribution (priorité CCA) ---
+        remboursement_cca = min(tresorerie_sci_cumulee, solde_cca) if autoriser_remboursement_cca else 0.0
+        tresorerie_disponible = tresorerie_sci_cumulee - remboursement_cca
+        solde_cca -= remboursement_cca
+        dividendes_verses = min(max(0, resultat_net_comptable), tresorerie_disponible) * taux_distrib
+        tresorerie_sci_cumulee = tresorerie_disponible - dividendes_verses
+
+        impot_dividendes = calculer_impot_dividendes(dividendes_verses, capital_social + solde_cca + remboursement_cca,
+                                                     is_gerant_majoritaire, bareme)
+
+        cash_net_investisseur_annuel = (dividendes_verses - impot_dividendes) + remboursement_cca - abondement
+        cashflow_investisseur_accumule += cash_net_investisseur_annuel
+
+        sortie_annee = annees_sortie is None or annee in annees_sortie
+        tresorerie_sci_avant_distrib_annee_N = max(tresorerie_sci_avant_operations, 0)
+        total_cash_investi = investissement_cumule + abondement_cumule
+        cash_accumule_annee_N_moins_1 = cashflow_investisseur_accumule - cash_net_investisseur_annuel
+
+        # --- SCÉNARIO 1: REVENTE DE TOUS LES BIENS (ASSET DEAL) ---
+        if sortie_annee and "Immeuble" in types_sortie:
+            plus_value_pro = max(0, reventes[i] - vnc[i])
+            is_total_revente = calculer_impot_societes(resultat_fiscal_exploitation + plus_value_pro, bareme)
+            is_sur_pv = max(0, is_total_revente - is_exploitation)
+            cash_revente_in_sci = reventes[i] - crds[i] - is_sur_pv
+            tresorerie_totale_finale = tresorerie_sci_avant_distrib_annee_N + cash_revente_in_sci
+
+            remboursement_cca_final = min(tresorerie_totale_finale, solde_cca + remboursement_cca)
+            tresorerie_totale_finale -= remboursement_cca_final
+            remboursement_capital_social = min(tresorerie_totale_finale, capital_social)
+            tresorerie_totale_finale -= remboursement_capital_social
+            boni_de_liquidation = max(0, tresorerie_totale_finale)
+            cash_net_final_investisseur_immo = remboursement_cca_final + remboursement_capital_social + (boni_de_liquidation - boni_de_liquidation * bareme.taux_pfu)
+
+            benefice_net_total_immo = cash_accumule_annee_N_moins_1 + cash_net_final_investisseur_immo - total_cash_investi
+            tri_immo, statut_tri_immo = solveur_tri.resoudre(cash_net_final_investisseur_immo - abondement, cle="immo")
+        else:
+            plus_value_pro = is_sur_pv = benefice_net_total_immo = np.nan
+            tri_immo, statut_tri_immo = (np.nan,), (STATUT_TRI_NON_CALCULE,)
+
+        # --- SCÉNARIO 2: REVENTE DES PARTS (SHARE DEAL) ---
+        if sortie_annee and "Parts" in types_sortie:
+            prix_cession_parts = reventes[i] + tresorerie_sci_avant_distrib_annee_N - crds[i]
+            cout_acquisition_parts = capital_social + apport_cca_cumule + abondement_cumule
+            plus_value_sur_parts = max(0, prix_cession_parts - cout_acquisition_parts)
+            impot_pv_parts, _ = calculer_impot_plus_value(plus_value_sur_parts, annee, bareme)
+            cash_net_final_investisseur_parts = prix_cession_parts - impot_pv_parts
+            benefice_net_total_parts = cash_accumule_annee_N_moins_1 + cash_net_final_investisseur_parts - total_cash_investi
+            tri_parts, statut_tri_parts = solveur_tri.resoudre(cash_net_final_investisseur_parts - abondement, cle="parts")
+        else:
+            benefice_net_total_parts = np.nan
+            tri_parts, statut_tri_parts = (np.nan,), (STATUT_TRI_NON_CALCULE,)
+
+        # Flux de l'année N, moins les apports des lots achetés en N+1 (versés fin d'année N)
+        investissement_suivant = investissement_annee[i + 1] if i + 1 < nb_annees else 0.0
+        solveur_tri.ajouter_flux(cash_net_investisseur_annuel - investissement_suivant)
+
+        lignes.append((
+            loyers[i], resultat_fiscal_exploitation, is_exploitation,
+            cash_net_investisseur_annuel, tresorerie_sci_cumulee, solde_cca,
+            plus_value_pro, is_sur_pv, benefice_net_total_immo, float(tri_immo[0]) * 100,
+            benefice_net_total_parts, float(tri_parts[0]) * 100
+        ))
+        statuts_tri.append((statut_tri_immo[0], statut_tri_parts[0]))
+
+    projection = ProjectionSCI(
+        valeurs=np.array(lignes, dtype=np.float64).reshape(-1, len(COLONNES_PROJECTION) - 1),
+        annees=annees,
+        statuts_tri=np.array(statuts_tri, dtype=np.int8).reshape(-1, len(COLONNES_STATUT_TRI)),
+        duree_pret=int(fin_credit.max())
+    )
+    lots = {
+        "Loyers Annuels": loyer_annuel,
+        "Charges": charges_annuelles_cash,
+        "Intérêts": interets_pret,
+        "Amortissements": amortissements,
+        "Résultat avant IS": resultat_avant_is,
+        "CRD": crd_pret,
+        "Valeur de revente": prix_revente,
+        "Année d'achat": annee_achat,
+    }
+    return {"projection": projection, "lots": lots}
@@ -0,0 +1,94 @@
+# moteur_sci/pret.py
+#
+# Tableau d'amortissement du prêt (forme fermée, vectorisé, mémoïsé).
+
+from collections import namedtuple
+
+import numpy as np
+
+from .cache import CacheLRU
+from .instrumentation import instrumenter
+
+# --- MOTEUR DE CALCUL DU PRÊT (Forme fermée, vectorisé, mémoïsé) ---
+# Échéancier annuel : tableaux indexés par année - 1 (interet, principal, CRD fin d'année)
+EcheancierPret = namedtuple("EcheancierPret", ["interet", "principal", "crd_fin_annee"])
+TAILLE_CACHE_ECHEANCIERS = 4096
+_cache_echeanciers = CacheLRU(TAILLE_CACHE_ECHEANCIERS)
+
+def _echeanciers_forme_fermee(montant_pret, taux_annuel_pc, nb_mois, nb_annees):
+    """
+    Échéanciers annuels de k prêts valides (montant > 0, taux >= 0, nb_mois > 0)
+    sans boucle mensuelle : CRD(m) = P(1+t)^m - M((1+t)^m - 1)/t.
+    Taux nul : amortissement linéaire, intérêts nuls.
+    Retourne (interet, principal, crd_fin_annee) de forme (k, nb_annees).
+    """
+    taux_mensuel = (taux_annuel_pc / 100) / 12
+    taux_nul = taux_mensuel == 0
+    taux_calcul = np.where(taux_nul, 1.0, taux_mensuel) # Évite la division par zéro
+    mensualite = np.where(taux_nul, montant_pret / nb_mois,
+                          montant_pret * taux_calcul / (1 - (1 + taux_calcul) ** -nb_mois))
+
+    mois = np.minimum(np.arange(nb_annees + 1)[None, :] * 12, nb_mois[:, None])
+    capitalisation = (1 + taux_calcul[:, None]) ** mois
+    crd = np.where(taux_nul[:, None],
+                   montant_pret[:, None] * (1 - mois / nb_mois[:, None]),
+                   montant_pret[:, None] * capitalisation - mensualite[:, None] * (capitalisation - 1) / taux_calcul[:, None])
+
+    principal = crd[:, :-1] - crd[:, 1:]
+    interet = mensualite[:, None] * np.diff(mois, axis=1) - principal
+    crd_fin_annee = np.where(crd[:, 1:] > 0.01, crd[:, 1:], 0.0)
+    return interet, principal, crd_fin_annee
+
+@instrumenter("pret.tableau_amortissement")
+def generer_tableau_amortissement(montant_pret, taux_annuel_pc, duree_annees):
+    """
+    Tableau d'amortissement annuel (mensualités constantes) en forme fermée.
+    Accepte des scalaires ou des vecteurs (diffusés entre eux) de termes de prêt.
+    Retourne un EcheancierPret :
+      - entrées scalaires : tableaux 1D de longueur ceil(nb_mois / 12),
+      - entrées vectorielles : tableaux (n, nb_annees_max), complétés par des zéros.
+    Cas limites : montant <= 0, durée < 1 mois ou taux < 0 -> pas de prêt (tableaux vides
+    ou lignes nulles) ; taux = 0 -> amortissement linéaire sans intérêts.
+    Les échéanciers sont mémoïsés dans un cache LRU borné (clé : montant, taux, nb de mois).
+    """
+    scalaire = np.ndim(montant_pret) == 0 and np.ndim(taux_annuel_pc) == 0 and np.ndim(duree_annees) == 0
+    montants, taux, durees = np.broadcast_arrays(
+        np.atleast_1d(np.asarray(montant_pret, dtype=float)),
+        np.atleast_1d(np.asarray(taux_annuel_pc, dtype=float)),
+        np.atleast_1d(np.asarray(duree_annees, dtype=float)))
+    nb_mois = np.trunc(durees * 12)
+    valide = (montants > 0) & (taux >= 0) & (nb_mois > 0)
+
+    # Déduplication des prêts identiques, puis lecture du cache / calcul des absents
+    termes = np.stack([montants[valide], taux[valide], nb_mois[valide]], axis=1)
+    uniques, inverse = np.unique(termes, axis=0, return_inverse=True)
+    cles = list(map(tuple, uniques.tolist()))
+    echeanciers_caches = [_cache_echeanciers.get(cle) for cle in cles]
+    absents = [j for j, echeancier in enumerate(echeanciers_caches) if echeancier is None]
+    calcules = None
+    if absents:
+        m, t, nm = uniques[absents].T
+        calcules = np.stack(_echeanciers_forme_fermee(m, t, nm, int(np.ceil(nm.max() / 12))))
+        for ligne, j in enumerate(absents):
+            echeancier = tuple(calcules[:, ligne, :int(np.ceil(nm[ligne] / 12))].copy())
+            for tableau in echeancier:
+                tableau.setflags(write=False) # Partagé via le cache
+            echeanciers_caches[j] = echeancier
+            _cache_echeanciers.mettre(cles[j], echeancier)
+
+    if scalaire:
+        if not valide[0]:
+            return EcheancierPret(np.zeros(0), np.zeros(0), np.zeros(0))
+        return EcheancierPret(*echeanciers_caches[0])
+
+    nb_annees = int(np.ceil(nb_mois[valide].max() / 12)) if valide.any() else 0
+    par_unique = np.zeros((3, uniques.shape[0], nb_annees))
+    if calcules is not None:
+        par_unique[:, absents, :calcules.shape[2]] = calcules
+    presents = set(range(len(cles))).difference(absents)
+    for j in presents:
+        for c, tableau in enumerate(echeanciers_caches[j]):
+            par_unique[c, j, :tableau.size] = tableau
+    resultat = np.zeros((3, montants.shape[0], nb_annees))
+    resultat[:, valide] = par_unique[:, inverse.reshape(-1)]
+    return EcheancierPret(*resultat)
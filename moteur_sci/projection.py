@@ -0,0 +1,347 @@
+# moteur_sci/projection.py
+#
+# Projection financière année par année d'une SCI à l'IS (un jeu de paramètres).
+
+import numpy as np
+
+from .fiscalite import bareme_fiscal, calculer_impot_dividendes, calculer_impot_plus_value, calculer_impot_societes
+from .instrumentation import chronometrer, debut_mesure, fin_mesure
+from .pret import generer_tableau_amortissement
+from .tri import SolveurTRI, LIBELLES_STATUT_TRI, STATUT_TRI_NON_CALCULE
+
+# --- MOTEUR DE SIMULATION SCI À L'IS (SCALAIRE) ---
+# Définition des colonnes de la projection
+COLONNES_PROJECTION = [
+    "Année", "Loyers Annuels", "Résultat Exploitation", "IS Exploitation", 
+    "Cash-flow Investisseur", "Tréso. SCI", "Solde CCA", "PV Imposable", 
+    "IS sur PV", "Bénéfice Net (Immeuble)", "TRI (Immeuble) (%)",
+    "Bénéfice Net (Parts)", "TRI (Parts) (%)"
+]
+# Statut du solveur pour chaque TRI (voir LIBELLES_STATUT_TRI)
+COLONNES_STATUT_TRI = ["Statut TRI (Immeuble)", "Statut TRI (Parts)"]
+# Indicateur booléen des années postérieures au crédit (remplace l'ancienne ligne "An X" + séparateur NA)
+COLONNE_POST_CREDIT = "Post-crédit"
+# Scénarios de sortie et colonnes qu'ils produisent ; les autres colonnes forment la passe d'exploitation
+TYPES_SORTIE = ["Immeuble", "Parts"]
+COLONNES_SORTIE = {
+    "Immeuble": ["PV Imposable", "IS sur PV", "Bénéfice Net (Immeuble)", "TRI (Immeuble) (%)"],
+    "Parts": ["Bénéfice Net (Parts)", "TRI (Parts) (%)"],
+}
+
+def selection_sorties(annees_sortie=None, types_sortie=None):
+    """
+    Normalise la sélection des sorties à évaluer : (années, types), années None = toutes.
+    Les sorties non sélectionnées valent NaN, statut TRI STATUT_TRI_NON_CALCULE.
+    """
+    types_sortie = TYPES_SORTIE if types_sortie is None else list(types_sortie)
+    inconnus = [t for t in types_sortie if t not in TYPES_SORTIE]
+    if inconnus:
+        raise ValueError(f"Type de sortie inconnu : {', '.join(map(str, inconnus))} (attendu : {', '.join(TYPES_SORTIE)})")
+    annees_sortie = None if annees_sortie is None else {int(annee) for annee in annees_sortie}
+    return annees_sortie, set(types_sortie)
+
+class ProjectionSCI:
+    """
+    Résultat en colonnes de generer_projection_sci_is.
+    - valeurs : float64 (années x COLONNES_PROJECTION[1:]), une ligne par année
+    - annees : int64, statuts_tri : int8 (années x COLONNES_STATUT_TRI, codes STATUT_TRI_*)
+    - duree_pret : la 1ère année post-crédit est duree_pret + 1
+    Les tableaux sont en lecture seule : une projection peut être partagée par le cache.
+    """
+    __slots__ = ("valeurs", "annees", "statuts_tri", "duree_pret")
+
+    def __init__(self, valeurs, annees, statuts_tri, duree_pret):
+        for tableau in (valeurs, annees, statuts_tri):
+            tableau.setflags(write=False)
+        self.valeurs = valeurs
+        self.annees = annees
+        self.statuts_tri = statuts_tri
+        self.duree_pret = duree_pret
+
+    def __len__(self):
+        return self.annees.size
+
+    def __getitem__(self, colonne):
+        """Colonne par son nom (vue, sans copie)."""
+        if colonne == "Année":
+            return self.annees
+        if colonne == COLONNE_POST_CREDIT:
+            return self.post_credit
+        if colonne in COLONNES_STATUT_TRI:
+            return self.statuts_tri[:, COLONNES_STATUT_TRI.index(colonne)]
+        return self.valeurs[:, COLONNES_PROJECTION.index(colonne) - 1]
+
+    @property
+    def post_credit(self):
+        return self.annees > self.duree_pret
+
+    @property
+    def premiere_annee_post_credit(self):
+        """Masque de la 1ère année après la fin du crédit (ligne mise en avant à l'affichage)."""
+        return self.annees == self.duree_pret + 1
+
+    def vers_dataframe(self):
+        """
+        DataFrame de la projection. Le bloc float64 est repris sans copie ;
+        les statuts TRI deviennent des catégories (libellés LIBELLES_STATUT_TRI).
+        """
+        import pandas as pd # Import différé : seul usage de pandas dans ce module
+        df = pd.DataFrame(self.valeurs, columns=COLONNES_PROJECTION[1:], copy=False)
+        df.insert(0, "Année", self.annees)
+        categories = [LIBELLES_STATUT_TRI[code] for code in sorted(LIBELLES_STATUT_TRI)]
+        for i, col in enumerate(COLONNES_STATUT_TRI):
+            df[col] = pd.Categorical.from_codes(self.statuts_tri[:, i], categories=categories)
+        df[COLONNE_POST_CREDIT] = self.post_credit
+        return df
+
+def generer_projection_sci_is(params, annees_sortie=None, types_sortie=None):
+    """
+    Génère la projection financière.
+    MODIFIÉ : Accepte des nombres (float/int) en entrée et retourne
+    une ProjectionSCI (colonnes numériques typées, non formatées),
+    convertible en DataFrame Pandas via vers_dataframe().
+    Les scénarios de sortie (revente immeuble / parts, TRI compris) ne sont évalués
+    que pour `annees_sortie` et `types_sortie` (par défaut : toutes les années, TYPES_SORTIE).
+    """
+    annees_sortie, types_sortie = selection_sorties(annees_sortie, types_sortie)
+    try:
+        # Streamlit envoie des nombres, pas des strings.
+        valeurs_num = params.copy()
+        is_gerant_majoritaire = valeurs_num.pop("is_gerant_majoritaire", False)
+        # NOUVEAU LEVIER STRATÉGIQUE
+        autoriser_remboursement_cca = valeurs_num.pop("autoriser_remboursement_cca", True) 
+        version_fiscale = valeurs_num.pop("version_fiscale", None)
+    except (ValueError, TypeError):
+        raise ValueError("Veuillez entrer des nombres valides.")
+    bareme = bareme_fiscal(version_fiscale) # Règles fiscales de l'année choisie
+
+    # --- Initialisation des valeurs de base ---
+    prix_achat = valeurs_num.get("prix_achat", 0)
+    cout_travaux = valeurs_num.get("cout_travaux", 0)
+    frais_notaire = valeurs_num.get("frais_notaire", 0)
+    valeur_meubles = valeurs_num.get("valeur_meubles", 0)
+    
+    # --- NOUVEAU: Distinction Capital Social / Apport en CCA (M1) ---
+    capital_social = valeurs_num.get("capital_social", 0)
+    apport_cca = valeurs_num.get("apport_personnel", 0) # Traité comme apport initial en CCA
+    frais_dossier = valeurs_num.get("frais_dossier", 0)
+    
+    cout_acquisition = prix_achat + cout_travaux
+    
+    # --- CORRIGÉ: Base d'amortissement (C1) ---
+    part_terrain_pc = valeurs_num.get("part_terrain_pc", 0) / 100
+    base_amort_immo_frais = (prix_achat * (1 - part_terrain_pc)) + frais_notaire
+    base_vnc_globale = prix_achat + cout_travaux + frais_notaire + valeur_meubles # Base pour calcul VNC
+
+    # --- MIS À JOUR: Investissement et Prêt (M1) ---
+    investissement_initial_personnel = apport_cca + capital_social + frais_dossier # Total cash out investisseur
+    montant_pret = cout_acquisition + frais_notaire - apport_cca - capital_social
+    
+    duree_pret = int(valeurs_num.get("duree_pret", 0))
+    if duree_pret <= 0: duree_pret = 1 # Evite division par zéro
+        
+    echeancier_pret = generer_tableau_amortissement(montant_pret, valeurs_num.get("taux_interet_pret", 0), duree_pret)
+    nb_annees_pret = echeancier_pret.interet.size
+    interets_pret = echeancier_pret.interet.tolist()
+    principal_pret = echeancier_pret.principal.tolist()
+    crd_pret = echeancier_pret.crd_fin_annee.tolist()
+    mensualite_assurance = (montant_pret * (valeurs_num.get("taux_assurance_pret", 0) / 100)) / 12
+    
+    loyer_mensuel_base = valeurs_num.get("loyer_mensuel", 0)
+    charges_copro_base = valeurs_num.get("charges_copro", 0)
+    taxe_fonciere_base = valeurs_num.get("taxe_fonciere", 0)
+    
+    inflation_pc = valeurs_num.get("inflation_pc", 0) / 100
+    revalo_bien_pc = valeurs_num.get("revalo_bien_pc", 0) / 100
+    
+    # --- NOUVEAU: Variables d'état (M1) ---
+    solde_cca = apport_cca
+    
+    cashflow_investisseur_accumule = 0
+    amortissement_cumule = 0
+    tresorerie_sci_cumulee = 0
+    abondement_cumule = 0 # Ne traque que les NOUVEAUX abondements post-initiaux
+    lignes = [] # Une ligne de valeurs (COLONNES_PROJECTION[1:]) par année
+    statuts_tri = []
+    
+    # Simule pour 25 ans après le crédit pour voir le long terme
+    duree_simulation_totale = duree_pret + 25 
+    solveur_tri = SolveurTRI(-investissement_initial_personnel, duree_simulation_totale + 1)
+    resoudre_tri = chronometrer("projection.tri", solveur_tri.resoudre)
+    
+    # --- Boucle principale de simulation (durée mesurée TRI compris) ---
+    debut_boucle = debut_mesure()
+    for annee in range(1, duree_simulation_totale + 1):
+        
+        is_pendant_credit = (annee <= duree_pret)
+        facteur_inflation = (1 + inflation_pc)**(annee - 1)
+        
+        # --- NOUVEAU: Vacance locative (R1) ---
+        taux_occupation = valeurs_num.get("taux_occupation_pc", 100) / 100
+        loyer_annuel = (loyer_mensuel_base * 12) * facteur_inflation * taux_occupation
+        
+        charges_copro_annuelles = (charges_copro_base * 12) * facteur_inflation
+        taxe_fonciere_actuelle = taxe_fonciere_base * facteur_inflation
+        
+        frais_gestion_annuels = loyer_annuel * (valeurs_num.get("frais_gestion_pc", 0) / 100)
+        gli_annuelle = (loyer_annuel + charges_copro_annuelles) * (valeurs_num.get("taux_gli_pc", 0) / 100)
+        
+        # --- NOUVEAU: Provision Gros Travaux (R2) ---
+        prix_revente = cout_acquisition * (1 + revalo_bien_pc)**annee
+        provision_gros_travaux_pc = valeurs_num.get("provision_gros_travaux_pc", 0) / 100
+        provision_gros_travaux_annuelle = prix_revente * provision_gros_travaux_pc
+        
+        charges_annuelles_cash = (charges_copro_annuelles + taxe_fonciere_actuelle + 
+                                  valeurs_num.get("assurance_pno", 0) + frais_gestion_annuels + gli_annuelle + 
+                                  (valeurs_num.get("cfe", 0) * facteur_inflation) +
+                                  provision_gros_travaux_annuelle) # Ajout de la provision au cash out
+        
+        if annee == 1: 
+            charges_annuelles_cash += frais_dossier
+        
+        interets_annuels = interets_pret[annee - 1] if is_pendant_credit and annee <= nb_annees_pret else 0
+        principal_annuel = principal_pret[annee - 1] if is_pendant_credit and annee <= nb_annees_pret else 0
+        assurance_annuelle = mensualite_assurance * 12 if is_pendant_credit else 0
+        mensualite_credit_annuelle = interets_annuels + principal_annuel + assurance_annuelle
+        
+        # --- CORRIGÉ: Calcul amortissement (C1) ---
+        duree_amort_immo = max(1, valeurs_num.get("duree_amort_immo", 1))
+        duree_amort_travaux = max(1, valeurs_num.get("duree_amort_travaux", 1))
+        duree_amort_meubles = max(1, valeurs_num.get("duree_amort_meubles", 1))
+
+        amort_immo_et_frais = base_amort_immo_frais / duree_amort_immo if annee <= duree_amort_immo else 0
+        amort_travaux = cout_travaux / duree_amort_travaux if annee <= duree_amort_travaux else 0
+        amort_meubles = valeur_meubles / duree_amort_meubles if annee <= duree_amort_meubles else 0
+        
+        amortissement_annuel = amort_immo_et_frais + amort_travaux + amort_meubles
+        amortissement_cumule += amortissement_annuel
+        
+        # --- CORRIGÉ: Provision non-déductible (R2) ---
+        charges_deductibles_totales = (charges_annuelles_cash - provision_gros_travaux_annuelle) + interets_annuels + assurance_annuelle
+        
+        # --- CORRIGÉ: IS sur Exploitation (C2) ---
+        resultat_fiscal_exploitation = loyer_annuel - charges_deductibles_totales - amortissement_annuel
+
+        is_exploitation = calculer_impot_societes(resultat_fiscal_exploitation, bareme)
+
+        resultat_net_comptable = resultat_fiscal_exploitation - is_exploitation # Base pour dividendes
+
+        # --- MIS À JOUR: Logique de Trésorerie et CCA (M1) ---
+        cashflow_sci_avant_is = loyer_annuel - charges_annuelles_cash - mensualite_credit_annuelle
+        tresorerie_sci_avant_operations = tresorerie_sci_cumulee + cashflow_sci_avant_is - is_exploitation
+        
+        abondement = 0
+        if tresorerie_sci_avant_operations < 0:
+            abondement = abs(tresorerie_sci_avant_operations)
+            abondement_cumule += abondement
+            solde_cca += abondement # L'abondement augmente le CCA
+            tresorerie_sci_cumulee = 0 
+        else:
+            tresorerie_sci_cumulee = tresorerie_sci_avant_operations
+            
+        # --- MIS À JOUR: Logique de Distribution (Priorité CCA) (M1 & M2) ---
+        tresorerie_disponible = tresorerie_sci_cumulee
+        
+        # 1. Remboursement CCA (Prioritaire, non fiscalisé)
+        remboursement_cca = 0 # Initialisation
+        
+        # NOUVELLE CONDITION : On ne rembourse que si l'utilisateur l'autorise
+        if autoriser_remboursement_cca:
+            remboursement_cca = min(tresorerie_disponible, solde_cca)
+            
+        tresorerie_disponible -= remboursement_cca
+        solde_cca -= remboursement_cca
+        
+        # 2. Distribution de Dividendes (Secondaire, fiscalisé)
+        dividendes_distribuables = max(0, resultat_net_comptable)
+        taux_distrib = valeurs_num.get("taux_distrib_pc", 100) / 100
+        dividendes_potentiels = min(dividendes_distribuables, tresorerie_disponible)
+        dividendes_verses = dividendes_potentiels * taux_distrib
+        
+        tresorerie_sci_cumulee = tresorerie_disponible - dividendes_verses
+        
+        # 3. Calcul Impôt sur Dividendes (Logique Gérant Majoritaire) (M2)
+        solde_cca_pour_seuil = solde_cca + remboursement_cca
+        impot_dividendes = calculer_impot_dividendes(dividendes_verses, capital_social + solde_cca_pour_seuil,
+                                                     is_gerant_majoritaire, bareme)
+        
+        cash_net_investisseur_annuel = (dividendes_verses - impot_dividendes) + remboursement_cca - abondement
+        cashflow_investisseur_accumule += cash_net_investisseur_annuel
+
+        # --- Sorties demandées pour cette année (passe d'exploitation seule sinon) ---
+        sortie_annee = annees_sortie is None or annee in annees_sortie
+        crd = crd_pret[annee - 1] if is_pendant_credit and annee <= nb_annees_pret else 0
+        tresorerie_sci_avant_distrib_annee_N = tresorerie_sci_avant_operations if tresorerie_sci_avant_operations > 0 else 0
+        total_cash_investi = investissement_initial_personnel + abondement_cumule
+        cash_accumule_annee_N_moins_1 = cashflow_investisseur_accumule - cash_net_investisseur_annuel
+
+        # --- SCÉNARIO 1: REVENTE IMMEUBLE (ASSET DEAL) (Corrigé C2, M1) ---
+        if sortie_annee and "Immeuble" in types_sortie:
+            valeur_nette_comptable = base_vnc_globale - amortissement_cumule
+            plus_value_pro = max(0, prix_revente - valeur_nette_comptable)
+            resultat_fiscal_total_revente = resultat_fiscal_exploitation + plus_value_pro
+            
+            is_total_revente = calculer_impot_societes(resultat_fiscal_total_revente, bareme)
+            
+            is_sur_pv = max(0, is_total_revente - is_exploitation)
+            
+            cash_revente_in_sci = prix_revente - crd - is_sur_pv
+            tresorerie_totale_finale = tresorerie_sci_avant_distrib_annee_N + cash_revente_in_sci
+            
+            solde_cca_debut_annee_N = solde_cca + remboursement_cca
+            remboursement_cca_final = min(tresorerie_totale_finale, solde_cca_debut_annee_N)
+            tresorerie_totale_finale -= remboursement_cca_final
+            remboursement_capital_social = min(tresorerie_totale_finale, capital_social)
+            tresorerie_totale_finale -= remboursement_capital_social
+            
+            boni_de_liquidation = max(0, tresorerie_totale_finale)
+            impot_boni = boni_de_liquidation * bareme.taux_pfu
+            
+            cash_net_final_investisseur_immo = remboursement_cca_final + remboursement_capital_social + (boni_de_liquidation - impot_boni)
+            
+            total_cash_recu_immo = cash_accumule_annee_N_moins_1 + cash_net_final_investisseur_immo
+            benefice_net_total_immo = total_cash_recu_immo - total_cash_investi
+
+            # TRI : flux des années précédentes (préfixe du solveur) + flux de sortie de l'année N
+            flux_annee_N_immo = cash_net_final_investisseur_immo - (abondement if abondement > 0 else 0)
+            tri_immo, statut_tri_immo = resoudre_tri(flux_annee_N_immo, cle="immo")
+            tri_pc_immo = float(tri_immo[0]) * 100 # NaN si statut != STATUT_TRI_OK
+        else:
+            plus_value_pro = is_sur_pv = benefice_net_total_immo = tri_pc_immo = np.nan
+            statut_tri_immo = (STATUT_TRI_NON_CALCULE,)
+
+        # --- SCÉNARIO 2: REVENTE DES PARTS (SHARE DEAL) (Nouveau M3) ---
+        if sortie_annee and "Parts" in types_sortie:
+            prix_cession_parts = prix_revente + tresorerie_sci_avant_distrib_annee_N - crd
+            cout_acquisition_parts = capital_social + apport_cca + abondement_cumule
+            plus_value_sur_parts = max(0, prix_cession_parts - cout_acquisition_parts)
+            impot_pv_parts, _ = calculer_impot_plus_value(plus_value_sur_parts, annee, bareme)
+            
+            cash_net_final_investisseur_parts = prix_cession_parts - impot_pv_parts
+            total_cash_recu_parts = cash_accumule_annee_N_moins_1 + cash_net_final_investisseur_parts
+            benefice_net_total_parts = total_cash_recu_parts - total_cash_investi
+            
+            flux_annee_N_parts = cash_net_final_investisseur_parts - (abondement if abondement > 0 else 0)
+            tri_parts, statut_tri_parts = resoudre_tri(flux_annee_N_parts, cle="parts")
+            tri_pc_parts = float(tri_parts[0]) * 100
+        else:
+            benefice_net_total_parts = tri_pc_parts = np.nan
+            statut_tri_parts = (STATUT_TRI_NON_CALCULE,)
+        solveur_tri.ajouter_flux(cash_net_investisseur_annuel)
+
+        # --- MODIFIÉ: Ajout des données BRUTES (nombres) ---
+        lignes.append((
+            loyer_annuel, resultat_fiscal_exploitation, is_exploitation,
+            cash_net_investisseur_annuel, tresorerie_sci_cumulee, solde_cca,
+            plus_value_pro, is_sur_pv, benefice_net_total_immo, tri_pc_immo,
+            benefice_net_total_parts, tri_pc_parts
+        ))
+        statuts_tri.append((statut_tri_immo[0], statut_tri_parts[0]))
+    fin_mesure("projection.boucle_annuelle", debut_boucle)
+
+    return ProjectionSCI(
+        valeurs=np.array(lignes, dtype=np.float64).reshape(-1, len(COLONNES_PROJECTION) - 1),
+        annees=np.arange(1, duree_simulation_totale + 1),
+        statuts_tri=np.array(statuts_tri, dtype=np.int8).reshape(-1, len(COLONNES_STATUT_TRI)),
+        duree_pret=duree_pret
+    )
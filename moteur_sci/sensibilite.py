@@ -0,0 +1,84 @@
+# moteur_sci/sensibilite.py
+#
+# Sensibilité 2D : un indicateur évalué sur une grille de deux paramètres.
+
+import numpy as np
+
+from .batch import generer_projection_sci_is_batch
+from .projection import COLONNES_PROJECTION, COLONNES_SORTIE
+
+# --- SENSIBILITÉ 2D (GRILLE DE PARAMÈTRES) ---
+# Paramètres numériques de la sidebar pouvant servir d'axe de sensibilité
+LIBELLES_PARAMETRES = {
+    "prix_achat": "Prix d'achat", "cout_travaux": "Coût travaux", "valeur_meubles": "Valeur meubles",
+    "frais_notaire": "Frais notaire", "frais_dossier": "Frais dossier", "capital_social": "Capital social",
+    "apport_personnel": "Apport en CCA initial", "duree_pret": "Durée prêt (années)",
+    "taux_interet_pret": "Taux intérêt prêt (%)", "taux_assurance_pret": "Taux assurance prêt (%)",
+    "loyer_mensuel": "Loyer mensuel", "taux_occupation_pc": "Taux d'occupation (%)",
+    "charges_copro": "Charges copro (mensuelles)", "taxe_fonciere": "Taxe foncière (annuelle)",
+    "frais_gestion_pc": "Frais gestion (%)", "taux_gli_pc": "Taux GLI (%)", "assurance_pno": "Assurance PNO (annuelle)",
+    "cfe": "CFE (annuelle)", "provision_gros_travaux_pc": "Provision gros travaux (% val. bien)",
+    "part_terrain_pc": "Part terrain (%)", "taux_distrib_pc": "Taux distrib. dividendes (%)",
+    "inflation_pc": "Inflation (%)", "revalo_bien_pc": "Revalo. bien (%)",
+}
+# Colonnes disponibles pour la carte de chaleur (projection + abondement cumulé)
+COLONNES_SENSIBILITE = COLONNES_PROJECTION[1:] + ["Abondement Cumulé"]
+
+TAILLE_LOT_SENSIBILITE = 500 # Scénarios par sous-tâche (decouper_grille_sensibilite)
+
+def _valeurs_sensibilite(params, param_x, valeurs_x, param_y, valeurs_y, colonne, annee):
+    """Tableau (len(valeurs_y), len(valeurs_x)) de `colonne` à l'année `annee`, en une passe batch."""
+    grille_x, grille_y = np.meshgrid(valeurs_x, valeurs_y)
+    scenarios = dict(params)
+    scenarios[param_x] = grille_x.ravel()
+    scenarios[param_y] = grille_y.ravel()
+    # Seule la sortie lue (année `annee`, type de la colonne) est évaluée
+    types_sortie = [t for t, colonnes in COLONNES_SORTIE.items() if colonne in colonnes]
+    resultats = generer_projection_sci_is_batch(scenarios, annee_max=annee, annees_sortie=[annee], types_sortie=types_sortie)
+
+    if colonne == "Abondement Cumulé":
+        valeurs = np.nancumsum(resultats["Abondement"], axis=1)
+        valeurs[np.isnan(resultats["Abondement"])] = np.nan
+    else:
+        valeurs = resultats[colonne]
+    if annee > valeurs.shape[1]:
+        return np.full(grille_x.shape, np.nan)
+    return valeurs[:, annee - 1].reshape(grille_x.shape)
+
+def _grille_vers_dataframe(valeurs, param_x, valeurs_x, param_y, valeurs_y):
+    import pandas as pd
+
+    return pd.DataFrame(valeurs, index=pd.Index(valeurs_y, name=param_y), columns=pd.Index(valeurs_x, name=param_x))
+
+def calculer_grille_sensibilite(params, param_x, valeurs_x, param_y, valeurs_y, colonne, annee):
+    """
+    Évalue `colonne` à l'année `annee` pour toutes les combinaisons (valeurs_x, valeurs_y)
+    des paramètres param_x / param_y, les autres paramètres restant ceux de `params`.
+    Toute la grille est calculée en une passe du moteur vectorisé, arrêtée à `annee`.
+    Retourne un DataFrame (index : valeurs_y, colonnes : valeurs_x), NaN si l'année
+    dépasse l'horizon du scénario.
+    """
+    valeurs_x = np.asarray(valeurs_x, dtype=float)
+    valeurs_y = np.asarray(valeurs_y, dtype=float)
+    valeurs = _valeurs_sensibilite(params, param_x, valeurs_x, param_y, valeurs_y, colonne, annee)
+    return _grille_vers_dataframe(valeurs, param_x, valeurs_x, param_y, valeurs_y)
+
+def decouper_grille_sensibilite(params, param_x, valeurs_x, param_y, valeurs_y, colonne, annee):
+    """
+    Découpe calculer_grille_sensibilite en bandes de lignes (valeurs_y) d'environ
+    TAILLE_LOT_SENSIBILITE scénarios. Retourne (sous_taches, assembler) : les lignes
+    des bandes en attente valent NaN dans le DataFrame partiel.
+    """
+    valeurs_x = np.asarray(valeurs_x, dtype=float)
+    valeurs_y = np.asarray(valeurs_y, dtype=float)
+    params = {cle: valeur for cle, valeur in params.items()} # Copie picklable
+    lignes_par_lot = max(1, TAILLE_LOT_SENSIBILITE // max(1, valeurs_x.size))
+    bandes = [valeurs_y[debut:debut + lignes_par_lot] for debut in range(0, valeurs_y.size, lignes_par_lot)]
+    sous_taches = [(_valeurs_sensibilite, (params, param_x, valeurs_x, param_y, bande, colonne, annee)) for bande in bandes]
+
+    def assembler(resultats):
+        valeurs = np.vstack([np.full((bande.size, valeurs_x.size), np.nan) if resultat is None else resultat
+                             for bande, resultat in zip(bandes, resultats)])
+        return _grille_vers_dataframe(valeurs, param_x, valeurs_x, param_y, valeurs_y)
+
+    return sous_taches, assembler
@@ -0,0 +1,229 @@
+# moteur_sci/stockage.py
+#
+# Stock local de scénarios nommés (SQLite, un fichier, sans service externe) et cache
+# persistant des projections, adressé par contenu : clé = (empreinte des params,
+# version du moteur). La version du moteur est l'empreinte du code source des modules
+# de calcul : toute modification du moteur invalide d'elle-même les projections stockées.
+#
+# Plusieurs processus (workers Streamlit, CLI) peuvent partager le même fichier :
+# journal WAL, délai d'attente sur verrou et transactions courtes. Les projections des
+# autres versions du moteur ne sont jamais supprimées à l'ouverture (un processus au
+# code plus ancien peut encore s'en servir) : purge explicite, au-delà d'une rétention.
+
+import functools
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+from .cache import hash_parametres
+from .projection import COLONNES_PROJECTION, COLONNES_STATUT_TRI, ProjectionSCI, generer_projection_sci_is
+
+# --- STOCK DE SCÉNARIOS (SQLITE) ---
+CHEMIN_STOCK_DEFAUT = os.environ.get(
+    "SIMULATEUR_SCI_STOCK", os.path.join(os.path.expanduser("~"), ".simulateur_sci", "scenarios.sqlite3"))
+# Modules dont le code détermine les projections (version du moteur)
+MODULES_MOTEUR = ["fiscalite", "pret", "tri", "projection"]
+DELAI_VERROU_S = 10.0
+TAILLE_LOT_SQL = 500 # Paramètres par requête IN (...), sous la limite de SQLite
+RETENTION_PROJECTIONS_S = 30 * 24 * 3600.0 # Âge minimal d'une projection obsolète purgée
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS scenarios (
+    nom TEXT PRIMARY KEY,
+    params TEXT NOT NULL,
+    hash_params TEXT NOT NULL,
+    cree_le REAL NOT NULL,
+    modifie_le REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS scenarios_hash ON scenarios (hash_params);
+CREATE TABLE IF NOT EXISTS projections (
+    hash_params TEXT NOT NULL,
+    version_moteur TEXT NOT NULL,
+    nb_annees INTEGER NOT NULL,
+    duree_pret INTEGER NOT NULL,
+    valeurs BLOB NOT NULL,
+    statuts_tri BLOB NOT NULL,
+    cree_le REAL NOT NULL,
+    PRIMARY KEY (hash_params, version_moteur)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS projections_version ON projections (version_moteur);
+"""
+
+@functools.lru_cache(maxsize=1)
+def version_moteur():
+    """Empreinte (SHA-256 tronqué) du code source des MODULES_MOTEUR."""
+    empreinte = hashlib.sha256()
+    dossier = os.path.dirname(__file__)
+    for module in MODULES_MOTEUR:
+        with open(os.path.join(dossier, f"{module}.py"), "rb") as f:
+            empreinte.update(f.read())
+    return empreinte.hexdigest()[:16]
+
+def _vers_ligne(cle, projection):
+    return (cle, version_moteur(), len(projection), projection.duree_pret,
+            np.ascontiguousarray(projection.valeurs).tobytes(), projection.statuts_tri.tobytes(), time.time())
+
+def _depuis_ligne(nb_annees, duree_pret, valeurs, statuts_tri):
+    """Projection relue sans copie ni analyse : les tableaux pointent sur les blobs SQLite."""
+    return ProjectionSCI(
+        valeurs=np.frombuffer(valeurs, dtype=np.float64).reshape(nb_annees, len(COLONNES_PROJECTION) - 1),
+        annees=np.arange(1, nb_annees + 1),
+        statuts_tri=np.frombuffer(statuts_tri, dtype=np.int8).reshape(nb_annees, len(COLONNES_STATUT_TRI)),
+        duree_pret=duree_pret,
+    )
+
+class StockScenarios:
+    """
+    Scénarios nommés (dict `params` complet) et projections persistées dans un fichier SQLite.
+    Une connexion par thread (sessions Streamlit) ; sûr entre processus.
+    """
+
+    def __init__(self, chemin=CHEMIN_STOCK_DEFAUT):
+        self.chemin = chemin
+        self._local = threading.local()
+        self._verrou = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        dossier = os.path.dirname(os.path.abspath(chemin))
+        os.makedirs(dossier, exist_ok=True)
+        with self._connexion() as connexion:
+            connexion.executescript(_SCHEMA)
+
+    def _connexion(self):
+        connexion = getattr(self._local, "connexion", None)
+        if connexion is None:
+            connexion = sqlite3.connect(self.chemin, timeout=DELAI_VERROU_S)
+            connexion.execute("PRAGMA journal_mode=WAL") # Lecteurs concurrents d'un écrivain
+            connexion.execute("PRAGMA synchronous=NORMAL")
+            self._local.connexion = connexion
+        return connexion
+
+    def _compter(self, hits, misses):
+        with self._verrou:
+            self.hits += hits
+            self.misses += misses
+
+    # --- Scénarios nommés ---
+    def enregistrer_scenario(self, nom, params):
+        """Enregistre (ou remplace) le scénario `nom`."""
+        maintenant = time.time()
+        with self._connexion() as connexion:
+            connexion.execute(
+                "INSERT INTO scenarios (nom, params, hash_params, cree_le, modifie_le) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (nom) DO UPDATE SET params = excluded.params, hash_params = excluded.hash_params, "
+                "modifie_le = excluded.modifie_le",
+                (nom, json.dumps(params, ensure_ascii=False), hash_parametres(params), maintenant, maintenant))
+
+    def charger_scenario(self, nom):
+        """`params` du scénario `nom`, None s'il n'existe pas."""
+        ligne = self._connexion().execute("SELECT params FROM scenarios WHERE nom = ?", (nom,)).fetchone()
+        return None if ligne is None else json.loads(ligne[0])
+
+    def charger_scenarios(self, noms=None):
+        """{nom: params} de tous les scénarios (ou de `noms`), en une requête par lot."""
+        connexion = self._connexion()
+        if noms is None:
+            lignes = connexion.execute("SELECT nom, params FROM scenarios ORDER BY nom").fetchall()
+        else:
+            noms = list(noms)
+            lignes = []
+            for debut in range(0, len(noms), TAILLE_LOT_SQL):
+                lot = noms[debut:debut + TAILLE_LOT_SQL]
+                lignes += connexion.execute(
+                    f"SELECT nom, params FROM scenarios WHERE nom IN ({','.join('?' * len(lot))})", lot).fetchall()
+        return {nom: json.loads(params) for nom, params in lignes}
+
+    def lister_scenarios(self):
+        """Liste [(nom, date de modification)] triée par modification décroissante."""
+        return self._connexion().execute(
+            "SELECT nom, modifie_le FROM scenarios ORDER BY modifie_le DESC").fetchall()
+
+    def supprimer_scenario(self, nom):
+        with self._connexion() as connexion:
+            connexion.execute("DELETE FROM scenarios WHERE nom = ?", (nom,))
+
+    # --- Projections (cache adressé par contenu) ---
+    def lire_projections(self, cles):
+        """{empreinte: ProjectionSCI} des empreintes présentes pour la version courante du moteur."""
+        cles = list(dict.fromkeys(cles))
+        connexion = self._connexion()
+        trouvees = {}
+        for debut in range(0, len(cles), TAILLE_LOT_SQL):
+            lot = cles[debut:debut + TAILLE_LOT_SQL]
+            for cle, *ligne in connexion.execute(
+                    "SELECT hash_params, nb_annees, duree_pret, valeurs, statuts_tri FROM projections "
+                    f"WHERE version_moteur = ? AND hash_params IN ({','.join('?' * len(lot))})",
+                    [version_moteur(), *lot]):
+                trouvees[cle] = _depuis_ligne(*ligne)
+        self._compter(len(trouvees), len(cles) - len(trouvees))
+        return trouvees
+
+    def ecrire_projections(self, projections):
+        """Enregistre {empreinte: ProjectionSCI} pour la version courante du moteur."""
+        with self._connexion() as connexion:
+            connexion.executemany(
+                "INSERT OR REPLACE INTO projections (hash_params, version_moteur, nb_annees, duree_pret, "
+                "valeurs, statuts_tri, cree_le) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [_vers_ligne(cle, projection) for cle, projection in projections.items()])
+
+    def projeter_plusieurs(self, liste_params):
+        """
+        Projections d'une liste de `params` : lecture groupée du stock, calcul des
+        absentes seulement, écriture groupée. Retourne une liste dans l'ordre d'entrée.
+        """
+        cles = [hash_parametres(params) for params in liste_params]
+        projections = self.lire_projections(cles)
+        calculees = {}
+        for cle, params in zip(cles, liste_params):
+            if cle not in projections and cle not in calculees:
+                calculees[cle] = generer_projection_sci_is(params)
+        if calculees:
+            self.ecrire_projections(calculees)
+            projections.update(calculees)
+        return [projections[cle] for cle in cles]
+
+    def projeter(self, params):
+        """generer_projection_sci_is(params) lue depuis le stock si déjà calculée."""
+        return self.projeter_plusieurs([params])[0]
+
+    def projeter_scenarios(self, noms=None):
+        """{nom: ProjectionSCI} des scénarios enregistrés (tous par défaut)."""
+        scenarios = self.charger_scenarios(noms)
+        return dict(zip(scenarios, self.projeter_plusieurs(list(scenarios.values()))))
+
+    def purger_projections_obsoletes(self, retention_s=RETENTION_PROJECTIONS_S):
+        """
+        Supprime les projections calculées par une autre version du moteur depuis plus de
+        `retention_s` secondes (0 : toutes). Opération de maintenance, jamais implicite.
+        Retourne leur nombre.
+        """
+        limite = time.time() - retention_s
+        with self._connexion() as connexion:
+            return connexion.execute("DELETE FROM projections WHERE version_moteur != ? AND cree_le < ?",
+                                     (version_moteur(), limite)).rowcount
+
+    def statistiques(self):
+        connexion = self._connexion()
+        nb_scenarios = connexion.execute("SELECT COUNT(*) FROM scenarios").fetchone()[0]
+        nb_projections = connexion.execute("SELECT COUNT(*) FROM projections").fetchone()[0]
+        with self._verrou:
+            total = self.hits + self.misses
+            return {"scenarios": nb_scenarios, "projections": nb_projections, "hits": self.hits,
+                    "misses": self.misses, "taux_hit": self.hits / total if total else 0.0,
+                    "version_moteur": version_moteur()}
+
+# Un stock par fichier et par processus (partagé par les sessions Streamlit)
+_stocks = {}
+_verrou_stocks = threading.Lock()
+
+def stock_scenarios(chemin=CHEMIN_STOCK_DEFAUT):
+    """Stock de scénarios du fichier `chemin`, ouvert une seule fois par processus."""
+    with _verrou_stocks:
+        if chemin not in _stocks:
+            _stocks[chemin] = StockScenarios(chemin)
+        return _stocks[chemin]
@@ -0,0 +1,239 @@
+# moteur_sci/taches.py
+#
+# Calculs longs (Monte Carlo, sensibilité, optimisation) exécutés hors du thread
+# appelant : les sous-tâches d'un travail sont réparties sur un pool de processus
+# partagé, la progression et le résultat partiel sont lisibles à tout moment, et un
+# travail qui n'intéresse plus personne (paramètres modifiés) est annulé.
+#
+# Un travail est décrit par une fonction de découpage : decouper(*args, **kwargs)
+# -> (sous_taches, assembler), sous_taches = [(fonction, args)] picklables,
+# assembler(resultats) -> résultat (None pour les sous-tâches non terminées).
+# Le résultat final est rangé dans le cache de résultats sous cle_resultat(nom, ...) :
+# revenir à des paramètres déjà calculés est immédiat, et partagé avec calculer_avec_cache.
+# Une tâche en erreur reste au registre tant qu'un groupe la demande : les mêmes
+# paramètres ne relancent pas un calcul voué à échouer. Sauf panne du pool (processus
+# tué en cours de calcul) : le pool est recréé et la tâche relancée à la soumission suivante.
+
+import functools
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from .cache import _ABSENT, _cache_resultats, cle_resultat
+
+# --- TÂCHES EN ARRIÈRE-PLAN ---
+ETAT_TACHE_EN_COURS = "en cours"
+ETAT_TACHE_TERMINEE = "terminée"
+ETAT_TACHE_ANNULEE = "annulée"
+ETAT_TACHE_ERREUR = "erreur"
+
+def sans_decoupage(fonction):
+    """Découpage trivial : `fonction(*args, **kwargs)` en une seule sous-tâche (progression 0 -> 1)."""
+    def decouper(*args, **kwargs):
+        return [(functools.partial(fonction, **kwargs), args)], lambda resultats: resultats[0]
+    return decouper
+
+class Tache:
+    """
+    Un travail soumis au GestionnaireTaches. Lecture sans blocage depuis le thread
+    de l'interface : etat, progression, resultat_partiel(), resultat, erreur.
+    """
+
+    def __init__(self, cle, nb_sous_taches, assembler):
+        self.cle = cle
+        self.etat = ETAT_TACHE_EN_COURS
+        self.resultat = None
+        self.erreur = None
+        self._assembler = assembler
+        self._resultats = [None] * nb_sous_taches
+        self._nb_terminees = 0
+        self._futures = []
+        self._executeur = None # Pool des sous-tâches
+        self._partiel = (0, None) # (sous-tâches agrégées, résultat partiel)
+        self._verrou = threading.Lock()
+
+    @classmethod
+    def terminee_avec(cls, cle, resultat):
+        tache = cls(cle, 0, None)
+        tache.etat, tache.resultat = ETAT_TACHE_TERMINEE, resultat
+        return tache
+
+    @property
+    def terminee(self):
+        return self.etat != ETAT_TACHE_EN_COURS
+
+    @property
+    def progression(self):
+        """Part des sous-tâches terminées (0 à 1)."""
+        return 1.0 if not self._resultats else self._nb_terminees / len(self._resultats)
+
+    def resultat_partiel(self):
+        """Résultat assemblé à partir des sous-tâches terminées (None si aucune), final si terminée."""
+        if self.etat == ETAT_TACHE_TERMINEE:
+            return self.resultat
+        with self._verrou:
+            nb_terminees, resultats = self._nb_terminees, list(self._resultats)
+            if nb_terminees and self._partiel[0] != nb_terminees:
+                self._partiel = (nb_terminees, self._assembler(resultats))
+            return self._partiel[1]
+
+    def annuler(self):
+        """Annule les sous-tâches en attente (celles déjà en cours s'achèvent, leur résultat est ignoré)."""
+        with self._verrou:
+            if self.terminee:
+                return
+            self.etat = ETAT_TACHE_ANNULEE
+        for future in self._futures:
+            future.cancel()
+
+    def _sous_tache_terminee(self, indice, future, rangement):
+        if future.cancelled() or self.terminee:
+            return
+        erreur = future.exception()
+        with self._verrou:
+            if self.terminee:
+                return
+            if erreur is not None:
+                self.etat, self.erreur = ETAT_TACHE_ERREUR, erreur
+            else:
+                self._resultats[indice] = future.result()
+                self._nb_terminees += 1
+            complete = erreur is None and self._nb_terminees == len(self._resultats)
+        if erreur is not None:
+            for autre in self._futures:
+                autre.cancel()
+        elif complete:
+            try:
+                resultat = self._assembler(self._resultats)
+            except Exception as erreur_assemblage:
+                self.etat, self.erreur = ETAT_TACHE_ERREUR, erreur_assemblage
+            else:
+                rangement(self.cle, resultat)
+                self.resultat, self.etat = resultat, ETAT_TACHE_TERMINEE
+                self._resultats = [None] * len(self._resultats) # Libère les sous-résultats
+        if self.terminee:
+            rangement(self.cle, None)
+
+class GestionnaireTaches:
+    """
+    Pool de processus partagé et registre des tâches en cours, par clé de résultat.
+    Une même clé n'est calculée qu'une fois (les sessions qui la demandent partagent la
+    tâche). Chaque demandeur s'identifie par un `groupe` (ex. session + section de page) :
+    quand un groupe soumet une nouvelle clé, sa tâche précédente est annulée si plus
+    aucun groupe ne l'attend.
+    """
+
+    def __init__(self, nb_processus=None):
+        self.nb_processus = nb_processus or os.cpu_count() or 1
+        self._executeur = None
+        self._taches = {} # Tâches en cours, par clé
+        self._groupes = {} # Groupe -> clé demandée
+        self._verrou = threading.Lock()
+        self.nb_soumises = 0
+        self.nb_annulees = 0
+
+    def _executeur_actif(self):
+        if self._executeur is None:
+            self._executeur = ProcessPoolExecutor(max_workers=self.nb_processus)
+        return self._executeur
+
+    def _ranger(self, cle, resultat):
+        """
+        Fin d'une tâche : résultat dans le cache partagé (si terminée), retrait du registre.
+        Une tâche en erreur demandée par un groupe y reste jusqu'à ce que plus aucun groupe
+        ne la demande (_liberer), sauf si l'erreur vient du pool (BrokenProcessPool) : le pool
+        est abandonné et la tâche retirée, les mêmes paramètres seront recalculés.
+        """
+        if resultat is not None:
+            _cache_resultats.mettre(cle, resultat)
+        with self._verrou:
+            tache = self._taches.get(cle)
+            if tache is None or not tache.terminee:
+                return
+            pool_casse = isinstance(tache.erreur, BrokenProcessPool)
+            if pool_casse and self._executeur is tache._executeur:
+                self._executeur = None # Processus déjà arrêtés par le pool ; recréé à la prochaine soumission
+            if tache.etat != ETAT_TACHE_ERREUR or pool_casse or cle not in self._groupes.values():
+                del self._taches[cle]
+
+    def soumettre(self, nom, decouper, *args, groupe=None, **kwargs):
+        """
+        Tâche calculant assembler(sous-tâches de decouper(*args, **kwargs)), clé
+        cle_resultat(nom, *args, **kwargs). Retourne immédiatement : tâche déjà terminée
+        si le résultat est en cache, tâche existante pour la même clé (en cours ou en
+        erreur), ou nouvelle tâche.
+        """
+        cle = cle_resultat(nom, *args, **kwargs)
+        with self._verrou:
+            precedente = self._groupes.get(groupe) if groupe is not None else None
+            if groupe is not None:
+                self._groupes[groupe] = cle
+            if precedente is not None and precedente != cle:
+                self._liberer(precedente)
+            tache = self._taches.get(cle)
+            if tache is not None:
+                return tache
+            resultat = _cache_resultats.get(cle, _ABSENT)
+            if resultat is not _ABSENT:
+                return Tache.terminee_avec(cle, resultat)
+
+            sous_taches, assembler = decouper(*args, **kwargs)
+            tache = Tache(cle, len(sous_taches), assembler)
+            self._taches[cle] = tache
+            self.nb_soumises += 1
+            try:
+                tache._executeur = self._executeur_actif()
+                tache._futures = [tache._executeur.submit(fonction, *arguments) for fonction, arguments in sous_taches]
+            except BrokenProcessPool:
+                self._executeur = None # Processus tué : pool recréé à la prochaine soumission
+                del self._taches[cle]
+                raise
+        for indice, future in enumerate(tache._futures):
+            future.add_done_callback(functools.partial(tache._sous_tache_terminee, indice, rangement=self._ranger))
+        return tache
+
+    def _liberer(self, cle):
+        """Annule (ou oublie, si en erreur) la tâche `cle` si aucun groupe ne l'attend plus (verrou tenu)."""
+        tache = self._taches.get(cle)
+        if tache is None or cle in self._groupes.values():
+            return
+        del self._taches[cle]
+        if not tache.terminee:
+            tache.annuler()
+            self.nb_annulees += 1
+
+    def abandonner(self, groupe):
+        """Le groupe ne demande plus rien (section masquée) : sa tâche est annulée si orpheline."""
+        with self._verrou:
+            cle = self._groupes.pop(groupe, None)
+            if cle is not None:
+                self._liberer(cle)
+
+    def statistiques(self):
+        with self._verrou:
+            en_erreur = sum(tache.etat == ETAT_TACHE_ERREUR for tache in self._taches.values())
+            return {"en_cours": len(self._taches) - en_erreur, "en_erreur": en_erreur, "soumises": self.nb_soumises,
+                    "annulees": self.nb_annulees, "nb_processus": self.nb_processus}
+
+    def arreter(self):
+        """Annule tout et arrête le pool (fin de processus, tests)."""
+        with self._verrou:
+            taches, self._taches, self._groupes = list(self._taches.values()), {}, {}
+            executeur, self._executeur = self._executeur, None
+        for tache in taches:
+            tache.annuler()
+        if executeur is not None:
+            executeur.shutdown(wait=False, cancel_futures=True)
+
+# Un gestionnaire par processus (partagé par les sessions Streamlit, comme les caches)
+_gestionnaire = None
+_verrou_gestionnaire = threading.Lock()
+
+def gestionnaire_taches():
+    """Gestionnaire de tâches du processus, créé au premier appel."""
+    global _gestionnaire
+    with _verrou_gestionnaire:
+        if _gestionnaire is None:
+            _gestionnaire = GestionnaireTaches()
+        return _gestionnaire
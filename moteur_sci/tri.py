@@ -0,0 +1,272 @@
+# moteur_sci/tri.py
+#
+# Solveur de TRI incrémental (préfixe partagé, warm-start, batch) avec statut explicite.
+
+import numpy as np
+
+# --- SOLVEUR TRI (INCRÉMENTAL, WARM-START, BATCH) ---
+# Statuts explicites : un TRI non résolu n'est plus confondu avec un TRI de 0%
+STATUT_TRI_OK = 0
+STATUT_TRI_SANS_SOLUTION = 1 # Pas de racine réelle (ex. flux tous du même signe)
+STATUT_TRI_NON_CONVERGE = 2 # Échec du solveur
+STATUT_TRI_NON_CALCULE = 3 # Sortie non demandée (annees_sortie / types_sortie)
+LIBELLES_STATUT_TRI = {
+    STATUT_TRI_OK: "OK",
+    STATUT_TRI_SANS_SOLUTION: "Pas de TRI",
+    STATUT_TRI_NON_CONVERGE: "Non convergé",
+    STATUT_TRI_NON_CALCULE: "Non calculé",
+}
+
+# Grille de taux pour l'encadrement des racines du TRI (de -99% à +1 000 000%)
+GRILLE_TAUX_TRI = np.concatenate([-np.geomspace(0.99, 1e-4, 40), [0.0], np.geomspace(1e-4, 1e4, 60)])
+_INDICE_TAUX_NUL = 40
+_X_GRILLE_TRI = 1 / (1 + GRILLE_TAUX_TRI)
+# En dessous de cette taille de lot, la VAN est évaluée par puissances (peu d'appels NumPy),
+# au-delà par schéma de Horner (moins d'opérations par élément)
+_SEUIL_HORNER_TRI = 64
+
+class SolveurTRI:
+    """
+    Solveur de TRI incrémental pour n séries de flux partageant un même préfixe.
+    Chaque année de la projection ajoute un flux au préfixe (ajouter_flux), puis
+    on demande le TRI « préfixe + flux final de sortie » (resoudre). La VAN du
+    préfixe sur GRILLE_TAUX_TRI est tenue à jour en O(n x grille) par flux ajouté,
+    ce qui évite de reconstruire et de re-résoudre toute la série chaque année.
+
+    Résolution :
+    1. Encadrement, de part et d'autre de 0, du premier changement de signe de la VAN
+       sur GRILLE_TAUX_TRI.
+    2. Newton sécurisé par bissection dans l'encadrement utile (celui pouvant
+       contenir la racine encadrée la plus proche de 0), démarré sur le TRI
+       de l'appel précédent de même `cle` (warm-start) s'il est dans l'encadrement.
+    3. Les racines hors grille retombent sur npf.irr.
+    Limite : deux racines dans une même maille de la grille ne changent pas le signe de
+    la VAN et ne sont pas vues. Pour des flux à plusieurs changements de signe, le TRI
+    retenu peut alors être une racine plus éloignée de 0 que celle de npf.irr.
+    Pour n = 1 (moteur scalaire), le raffinement se fait en flottants Python.
+    Retourne (taux, statuts) ; taux à NaN lorsque le statut n'est pas STATUT_TRI_OK.
+    """
+
+    def __init__(self, flux_initial, nb_flux_max, max_iter=60, tolerance=1e-11):
+        flux_initial = np.atleast_1d(np.asarray(flux_initial, dtype=float))
+        self.n = flux_initial.shape[0]
+        self.max_iter = max_iter
+        self.tolerance = tolerance
+        self._flux = np.zeros((self.n, max(1, nb_flux_max)))
+        self._flux[:, 0] = flux_initial
+        self._flux_scalaire = [float(flux_initial[0])] if self.n == 1 else None
+        self._flux_max, self._flux_min = flux_initial.copy(), flux_initial.copy()
+        self._k = 1 # Nombre de flux dans le préfixe
+        self._van_grille = flux_initial[:, None] * np.ones(GRILLE_TAUX_TRI.size)
+        self._x_puissance = _X_GRILLE_TRI.copy() # x^k pour le prochain flux
+        self._taux_precedents = {}
+
+    def ajouter_flux(self, flux):
+        """Ajoute un flux (un par série) au préfixe partagé."""
+        if self._k >= self._flux.shape[1]:
+            self._flux = np.concatenate([self._flux, np.zeros_like(self._flux)], axis=1)
+        flux = np.broadcast_to(np.asarray(flux, dtype=float), (self.n,))
+        self._flux[:, self._k] = flux
+        self._flux_max = np.maximum(self._flux_max, flux)
+        self._flux_min = np.minimum(self._flux_min, flux)
+        if self._flux_scalaire is not None:
+            self._flux_scalaire.append(float(flux[0]))
+        self._van_grille += flux[:, None] * self._x_puissance[None, :]
+        self._x_puissance = self._x_puissance * _X_GRILLE_TRI
+        self._k += 1
+
+    def resoudre(self, flux_final, cle=None):
+        """TRI des séries « préfixe + flux_final » ; `cle` identifie la suite de warm-start."""
+        if self.n == 1:
+            return self._resoudre_scalaire(float(np.asarray(flux_final).reshape(-1)[0]), cle)
+
+        flux_final = np.broadcast_to(np.asarray(flux_final, dtype=float), (self.n,))
+        van = self._van_grille + flux_final[:, None] * self._x_puissance[None, :]
+        signe_zero = np.sign(van[:, _INDICE_TAUX_NUL])
+        change = (van > 0) != (signe_zero > 0)[:, None]
+        change[signe_zero == 0] = False
+        change_pos = change[:, _INDICE_TAUX_NUL + 1:]
+        change_neg = change[:, _INDICE_TAUX_NUL - 1::-1]
+        trouve_pos, trouve_neg = change_pos.any(axis=1), change_neg.any(axis=1)
+        i_pos = _INDICE_TAUX_NUL + 1 + change_pos.argmax(axis=1) # Bord extérieur (r > 0)
+        i_neg = _INDICE_TAUX_NUL - 1 - change_neg.argmax(axis=1) # Bord extérieur (r < 0)
+
+        # Encadrements utiles : on écarte le côté dont la racine est forcément plus loin de 0
+        r_pos_int, r_pos_ext = GRILLE_TAUX_TRI[i_pos - 1], GRILLE_TAUX_TRI[i_pos]
+        r_neg_int, r_neg_ext = -GRILLE_TAUX_TRI[i_neg + 1], -GRILLE_TAUX_TRI[i_neg]
+        utile_pos = trouve_pos & ~(trouve_neg & (r_neg_ext < r_pos_int))
+        utile_neg = trouve_neg & ~(trouve_pos & (r_pos_ext < r_neg_int))
+
+        lignes_pos, lignes_neg = np.flatnonzero(utile_pos), np.flatnonzero(utile_neg)
+        lignes = np.concatenate([lignes_pos, lignes_neg])
+        # x = 1/(1+r) décroît avec r : borne basse en x = bord extérieur côté r > 0
+        x_bas = np.concatenate([_X_GRILLE_TRI[i_pos[lignes_pos]], _X_GRILLE_TRI[i_neg[lignes_neg] + 1]])
+        x_haut = np.concatenate([_X_GRILLE_TRI[i_pos[lignes_pos] - 1], _X_GRILLE_TRI[i_neg[lignes_neg]]])
+        p_bas = np.concatenate([van[lignes_pos, i_pos[lignes_pos]], van[lignes_neg, i_neg[lignes_neg] + 1]])
+        p_haut = np.concatenate([van[lignes_pos, i_pos[lignes_pos] - 1], van[lignes_neg, i_neg[lignes_neg]]])
+        # Départ : TRI précédent de même `cle` s'il est dans l'encadrement, sinon interpolation
+        # linéaire de la VAN entre les bords (quelques itérations de Newton en moins)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            x_depart = x_bas - p_bas * (x_haut - x_bas) / (p_haut - p_bas)
+        taux_precedent = self._taux_precedents.get(cle)
+        if taux_precedent is not None:
+            x_precedent = 1 / (1 + taux_precedent[lignes])
+            x_depart = np.where((x_precedent > x_bas) & (x_precedent < x_haut), x_precedent, x_depart)
+        x, converge = self._raffiner(lignes, flux_final[lignes], x_bas, x_haut, p_bas, x_depart)
+
+        r = np.where(converge, 1 / x - 1, np.nan)
+        r_pos, r_neg = np.full(self.n, np.nan), np.full(self.n, np.nan)
+        r_pos[lignes_pos], r_neg[lignes_neg] = r[:lignes_pos.size], r[lignes_pos.size:]
+        prendre_neg = ~np.isnan(r_neg) & (np.isnan(r_pos) | (np.abs(r_neg) < np.abs(r_pos)))
+        taux = np.where(prendre_neg, r_neg, r_pos)
+        taux[signe_zero == 0] = 0.0
+        statuts = np.where(np.isnan(taux), STATUT_TRI_SANS_SOLUTION, STATUT_TRI_OK)
+
+        # Encadrement trouvé mais non convergé, ou racine hors grille : repli npf.irr
+        signes_opposes = ((self._flux_max > 0) | (flux_final > 0)) & ((self._flux_min < 0) | (flux_final < 0))
+        encadre = trouve_pos | trouve_neg
+        for i in np.flatnonzero((statuts != STATUT_TRI_OK) & signes_opposes):
+            taux[i], statuts[i] = self._repli_npf(np.append(self._flux[i, :self._k], flux_final[i]), encadre[i])
+
+        self._taux_precedents[cle] = np.where(np.isnan(taux), 0.0, taux)
+        return taux, statuts
+
+    def _raffiner(self, lignes, flux_final, bas, haut, p_bas, x_depart):
+        """
+        Newton-bissection vectorisé dans [bas, haut] sur p(x) = somme(flux_t * x^t).
+        Les lignes convergées sortent du lot à chaque itération.
+        Retourne (x, converge) dans l'ordre de `lignes`.
+        """
+        x_final = np.full(lignes.size, np.nan)
+        converge_final = np.zeros(lignes.size, dtype=bool)
+        if lignes.size == 0:
+            return x_final, converge_final
+        prefixe = self._flux[lignes, :self._k]
+        actives = np.arange(lignes.size)
+        x = (bas + haut) / 2
+        if x_depart is not None:
+            x = np.where((x_depart > bas) & (x_depart < haut), x_depart, x)
+        for _ in range(self.max_iter):
+            p, dp = self._evaluer(prefixe, flux_final, x)
+            # Mise à jour de l'encadrement
+            meme_signe = np.sign(p) == np.sign(p_bas)
+            bas = np.where(meme_signe, x, bas)
+            p_bas = np.where(meme_signe, p, p_bas)
+            haut = np.where(meme_signe, haut, x)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                x_newton = x - p / dp
+            dans_encadrement = (x_newton >= bas) & (x_newton <= haut)
+            x_nouveau = np.where(dans_encadrement, x_newton, (bas + haut) / 2)
+            racine_exacte = p == 0
+            converge = (np.abs(x_nouveau - x) <= self.tolerance * x) | racine_exacte
+            x = np.where(racine_exacte, x, x_nouveau)
+
+            x_final[actives[converge]] = x[converge]
+            converge_final[actives[converge]] = True
+            if converge.all():
+                break
+            reste = ~converge
+            actives, prefixe, flux_final = actives[reste], prefixe[reste], flux_final[reste]
+            x, bas, haut, p_bas = x[reste], bas[reste], haut[reste], p_bas[reste]
+        return x_final, converge_final
+
+    @staticmethod
+    def _evaluer(prefixe, flux_final, x):
+        """p(x) = somme(flux_t * x^t) et p'(x), le flux final étant au rang k."""
+        n, k = prefixe.shape
+        if n < _SEUIL_HORNER_TRI:
+            puissances = x[:, None] ** np.arange(k + 1)[None, :]
+            p = (prefixe * puissances[:, :k]).sum(axis=1) + flux_final * puissances[:, k]
+            dp = (prefixe[:, 1:] * np.arange(1, k) * puissances[:, :k - 1]).sum(axis=1) + k * flux_final * puissances[:, k - 1]
+            return p, dp
+        p = flux_final.copy()
+        dp = np.zeros_like(p)
+        for t in range(k - 1, -1, -1):
+            dp = dp * x + p
+            p = p * x + prefixe[:, t]
+        return p, dp
+
+    def _resoudre_scalaire(self, flux_final, cle):
+        """Chemin n = 1 : encadrement sur la grille (NumPy) puis raffinement en flottants Python."""
+        van = self._van_grille[0] + flux_final * self._x_puissance
+        signe = np.sign(van)
+        signe_zero = signe[_INDICE_TAUX_NUL]
+        taux, statut = np.nan, STATUT_TRI_SANS_SOLUTION
+        if signe_zero == 0:
+            taux, statut = 0.0, STATUT_TRI_OK
+        else:
+            change = signe != signe_zero
+            change_pos = np.flatnonzero(change[_INDICE_TAUX_NUL + 1:])
+            change_neg = np.flatnonzero(change[_INDICE_TAUX_NUL - 1::-1])
+            taux_precedent = self._taux_precedents.get(cle)
+            x_depart = None if taux_precedent is None else 1 / (1 + taux_precedent)
+            candidats = []
+            if change_pos.size:
+                i = _INDICE_TAUX_NUL + 1 + change_pos[0]
+                candidats.append((GRILLE_TAUX_TRI[i - 1], _X_GRILLE_TRI[i], _X_GRILLE_TRI[i - 1], van[i]))
+            if change_neg.size:
+                i = _INDICE_TAUX_NUL - 1 - change_neg[0]
+                candidats.append((-GRILLE_TAUX_TRI[i + 1], _X_GRILLE_TRI[i + 1], _X_GRILLE_TRI[i], van[i + 1]))
+            # Encadrement le plus proche de 0 d'abord ; l'autre n'est résolu que s'il peut être plus proche
+            candidats.sort(key=lambda c: c[0])
+            for distance_min, bas, haut, p_bas in candidats:
+                if not np.isnan(taux) and distance_min >= abs(taux):
+                    break
+                r = self._raffiner_scalaire(flux_final, float(bas), float(haut), float(p_bas), x_depart)
+                if r is not None and (np.isnan(taux) or abs(r) < abs(taux)):
+                    taux, statut = r, STATUT_TRI_OK
+            if statut != STATUT_TRI_OK and (self._flux_max[0] > 0 or flux_final > 0) and (self._flux_min[0] < 0 or flux_final < 0):
+                taux, statut = self._repli_npf(self._flux_scalaire + [flux_final], bool(candidats))
+        self._taux_precedents[cle] = 0.0 if np.isnan(taux) else taux
+        return np.array([taux]), np.array([statut])
+
+    def _raffiner_scalaire(self, flux_final, bas, haut, p_bas, x_depart):
+        """Newton-bissection en flottants Python ; retourne le taux ou None."""
+        coefficients = self._flux_scalaire
+        x = x_depart if x_depart is not None and bas < x_depart < haut else (bas + haut) / 2
+        for _ in range(self.max_iter):
+            p, dp = flux_final, 0.0
+            for v in reversed(coefficients):
+                dp = dp * x + p
+                p = p * x + v
+            if p == 0:
+                return 1 / x - 1
+            if (p > 0) == (p_bas > 0):
+                bas, p_bas = x, p
+            else:
+                haut = x
+            x_nouveau = x - p / dp if dp != 0 else bas - 1
+            if not (bas <= x_nouveau <= haut):
+                x_nouveau = (bas + haut) / 2
+            if abs(x_nouveau - x) <= self.tolerance * x:
+                return 1 / x_nouveau - 1
+            x = x_nouveau
+        return None
+
+    @staticmethod
+    def _repli_npf(flux, encadre):
+        """Repli sur npf.irr ; retourne (taux, statut)."""
+        import numpy_financial as npf # Import différé : rarement nécessaire
+        try:
+            valeur = npf.irr(flux)
+        except (ValueError, np.linalg.LinAlgError):
+            return np.nan, STATUT_TRI_NON_CONVERGE
+        if np.isnan(valeur):
+            return np.nan, (STATUT_TRI_NON_CONVERGE if encadre else STATUT_TRI_SANS_SOLUTION)
+        return valeur, STATUT_TRI_OK
+
+def calculer_tri_batch(flux):
+    """
+    TRI de n séries de flux indépendantes (tableau (n, k), k >= 2).
+    Retourne (taux, statuts) ; voir SolveurTRI.
+    """
+    flux = np.atleast_2d(np.asarray(flux, dtype=float))
+    solveur = SolveurTRI(flux[:, 0], flux.shape[1] - 1)
+    for t in range(1, flux.shape[1] - 1):
+        solveur.ajouter_flux(flux[:, t])
+    return solveur.resoudre(flux[:, -1])
+
+def calculer_tri(cash_flows):
+    """TRI d'une seule série de flux. Retourne (taux, statut) ; taux NaN si statut != OK."""
+    taux, statuts = calculer_tri_batch([cash_flows])
+    return float(taux[0]), int(statuts[0])
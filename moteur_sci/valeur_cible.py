@@ -0,0 +1,191 @@
+# moteur_sci/valeur_cible.py
+#
+# Recherche de valeur cible : la valeur d'un paramètre (loyer, prix d'achat, apport en
+# CCA...) à partir de laquelle une contrainte sur la projection est respectée, pour
+# un ou plusieurs dossiers à la fois. Encadrement puis fausse position (Illinois)
+# sécurisée par bissection ; chaque itération évalue tous les dossiers encore actifs
+# en une passe du moteur vectorisé, sans les sorties inutiles à la contrainte.
+
+import numpy as np
+
+from .batch import PARAMETRES_DEFAUT_BATCH, _normaliser_scenarios, generer_projection_sci_is_batch
+from .projection import COLONNES_SORTIE, TYPES_SORTIE
+
+# --- RECHERCHE DE VALEUR CIBLE ---
+# Paramètres usuels (tout paramètre numérique du moteur batch est accepté)
+PARAMETRES_CIBLE = {
+    "loyer_mensuel": "Loyer mensuel",
+    "prix_achat": "Prix d'achat",
+    "apport_personnel": "Apport en CCA",
+}
+CONTRAINTES_CIBLE = {
+    "autofinancement": "Cash-flow investisseur ≥ 0 et aucun abondement pendant le crédit",
+    "tri": "TRI ≥ cible à l'année de sortie",
+}
+TOLERANCES_CIBLE = {"loyer_mensuel": 1.0, "prix_achat": 100.0, "apport_personnel": 100.0}
+TOLERANCE_CIBLE_DEFAUT = 1e-3
+MAX_ITERATIONS_CIBLE = 60
+
+STATUT_CIBLE_OK = 0
+STATUT_CIBLE_TOUJOURS_ATTEINTE = 1 # Contrainte respectée sur tout l'intervalle de recherche
+STATUT_CIBLE_JAMAIS_ATTEINTE = 2 # Contrainte violée sur tout l'intervalle de recherche
+STATUT_CIBLE_EN_ATTENTE = 3 # Dossier pas encore traité (résultat partiel d'une tâche)
+LIBELLES_STATUT_CIBLE = {
+    STATUT_CIBLE_OK: "OK",
+    STATUT_CIBLE_TOUJOURS_ATTEINTE: "Toujours atteinte",
+    STATUT_CIBLE_JAMAIS_ATTEINTE: "Jamais atteinte",
+    STATUT_CIBLE_EN_ATTENTE: "En attente",
+}
+TAILLE_LOT_CIBLE = 100 # Dossiers par sous-tâche (decouper_valeur_cible)
+
+def bornes_cible(v, parametre):
+    """Intervalle de recherche par défaut (bas, haut), tableaux (n,), pour les dossiers normalisés `v`."""
+    valeur = v[parametre]
+    if parametre == "loyer_mensuel":
+        haut = np.maximum(4 * valeur, 0.02 * (v["prix_achat"] + v["cout_travaux"])) # 2 % du coût par mois
+    elif parametre == "apport_personnel":
+        haut = np.maximum(v["prix_achat"] + v["cout_travaux"] + v["frais_notaire"] - v["capital_social"], 0) # Sans prêt
+    else:
+        haut = 4 * np.abs(valeur)
+    return np.zeros_like(valeur), np.maximum(haut, 1.0)
+
+def _options_contrainte(contrainte, annee, type_sortie):
+    """Arguments du moteur batch limités à ce que lit la contrainte."""
+    if contrainte == "autofinancement":
+        return {"annees_sortie": []}
+    return {"annee_max": annee, "annees_sortie": [annee], "types_sortie": [type_sortie]}
+
+def _marge(resultats, contrainte, tri_cible, annee, type_sortie):
+    """Marge (n,) de la contrainte : >= 0 si respectée, -inf si non évaluable (TRI sans solution)."""
+    if contrainte == "autofinancement":
+        pendant_credit = resultats["Année"][None, :] <= resultats["Durée prêt"][:, None]
+        cash_flow = np.where(pendant_credit, resultats["Cash-flow Investisseur"], np.inf).min(axis=1)
+        abondement = np.where(pendant_credit, resultats["Abondement"], 0.0).max(axis=1)
+        return np.minimum(cash_flow, -abondement)
+    if annee > resultats["Année"].size:
+        return np.full(resultats["Durée prêt"].size, -np.inf)
+    colonne = [col for col in COLONNES_SORTIE[type_sortie] if col.startswith("TRI")][0]
+    tri = resultats[colonne][:, annee - 1]
+    return np.where(np.isnan(tri), -np.inf, tri - tri_cible)
+
+def rechercher_valeur_cible(scenarios, parametre, contrainte="autofinancement", tri_cible=None,
+                            annee=None, type_sortie="Parts", bornes=None, tolerance=None,
+                            max_iterations=MAX_ITERATIONS_CIBLE):
+    """
+    Valeur de `parametre` à la limite de `contrainte` pour chaque dossier de `scenarios`
+    (DataFrame, liste de dicts `params` ou dict de colonnes, comme le moteur batch) :
+      - "autofinancement" : cash-flow investisseur >= 0 et aucun abondement pendant le crédit,
+      - "tri" : TRI (`type_sortie`) à l'année `annee` >= `tri_cible` (en %).
+    Les autres paramètres restent ceux du dossier (ex. frais de notaire fixes quand le prix varie).
+
+    Recherche dans `bornes` (bas, haut) (scalaires ou tableaux (n,), défaut : bornes_cible) à
+    `tolerance` près (défaut : TOLERANCES_CIBLE). La valeur retournée est la borne de
+    l'encadrement final du côté où la contrainte est respectée (loyer minimum, prix maximum...).
+
+    Retourne un dict :
+      - "valeur" : tableau (n,), NaN si la limite n'est pas dans l'intervalle,
+      - "statut" : tableau (n,) de codes STATUT_CIBLE_*,
+      - "minimum" : tableau (n,) de booléens, True si la contrainte est respectée au-dessus
+        de la valeur (loyer minimum), False en dessous (prix maximum),
+      - "nb_iterations" / "nb_evaluations" : itérations et projections calculées.
+    """
+    if contrainte not in CONTRAINTES_CIBLE:
+        raise ValueError(f"contrainte inconnue : {contrainte!r} (attendu : {', '.join(CONTRAINTES_CIBLE)})")
+    if parametre not in PARAMETRES_DEFAUT_BATCH or isinstance(PARAMETRES_DEFAUT_BATCH[parametre], bool):
+        raise ValueError(f"paramètre non numérique ou inconnu : {parametre!r}")
+    if contrainte == "tri":
+        if tri_cible is None or annee is None or type_sortie not in TYPES_SORTIE:
+            raise ValueError("La contrainte 'tri' demande tri_cible, annee et type_sortie (Immeuble ou Parts).")
+        annee = int(annee)
+    v = _normaliser_scenarios(scenarios)
+    n = v["prix_achat"].shape[0]
+    tolerance = TOLERANCES_CIBLE.get(parametre, TOLERANCE_CIBLE_DEFAUT) if tolerance is None else tolerance
+    bas, haut = bornes_cible(v, parametre) if bornes is None else bornes
+    bas = np.broadcast_to(np.asarray(bas, dtype=float), (n,)).copy()
+    haut = np.broadcast_to(np.asarray(haut, dtype=float), (n,)).copy()
+    options = _options_contrainte(contrainte, annee, type_sortie)
+    nb_evaluations = 0
+
+    def marge(lignes, valeurs):
+        nonlocal nb_evaluations
+        sous_ensemble = {cle: tableau[lignes] for cle, tableau in v.items()}
+        sous_ensemble[parametre] = valeurs
+        nb_evaluations += valeurs.size
+        return _marge(generer_projection_sci_is_batch(sous_ensemble, **options), contrainte, tri_cible, annee, type_sortie)
+
+    # --- Encadrement : bornes évaluées en une passe ---
+    tous = np.arange(n)
+    marges = marge(np.concatenate([tous, tous]), np.concatenate([bas, haut]))
+    marge_bas, marge_haut = marges[:n], marges[n:]
+    respecte_bas, respecte_haut = marge_bas >= 0, marge_haut >= 0
+    statut = np.where(respecte_bas & respecte_haut, STATUT_CIBLE_TOUJOURS_ATTEINTE,
+                      np.where(respecte_bas | respecte_haut, STATUT_CIBLE_OK, STATUT_CIBLE_JAMAIS_ATTEINTE)).astype(np.int8)
+    # x_ok : borne où la contrainte est respectée, x_ko : borne où elle ne l'est pas
+    x_ok = np.where(respecte_bas, bas, haut)
+    x_ko = np.where(respecte_bas, haut, bas)
+    f_ok = np.where(respecte_bas, marge_bas, marge_haut)
+    f_ko = np.where(respecte_bas, marge_haut, marge_bas)
+    cote_precedent = np.zeros(n, dtype=np.int8) # +1 : x_ok remplacé à l'itération précédente, -1 : x_ko
+
+    # --- Fausse position (Illinois), bissection si l'interpolation n'est pas exploitable ---
+    actifs = np.flatnonzero((statut == STATUT_CIBLE_OK) & (np.abs(x_ok - x_ko) > tolerance))
+    nb_iterations = 0
+    while actifs.size and nb_iterations < max_iterations:
+        nb_iterations += 1
+        a, b, fa, fb = x_ko[actifs], x_ok[actifs], f_ko[actifs], f_ok[actifs]
+        milieu = (a + b) / 2
+        with np.errstate(divide="ignore", invalid="ignore"):
+            x = b - fb * (b - a) / (fb - fa)
+        # Interpolation rejetée : marge infinie ou nulle, point hors de l'encadrement
+        exploitable = np.isfinite(x) & (fb > 0) & (np.abs(x - milieu) < np.abs(b - a) / 2)
+        x = np.where(exploitable, x, milieu)
+
+        f = marge(actifs, x)
+        respecte = f >= 0
+        lignes_ok, lignes_ko = actifs[respecte], actifs[~respecte]
+        # Illinois : la borne conservée deux fois de suite voit sa marge divisée par deux
+        f_ko[lignes_ok[cote_precedent[lignes_ok] == 1]] /= 2
+        f_ok[lignes_ko[cote_precedent[lignes_ko] == -1]] /= 2
+        x_ok[lignes_ok], f_ok[lignes_ok], cote_precedent[lignes_ok] = x[respecte], f[respecte], 1
+        x_ko[lignes_ko], f_ko[lignes_ko], cote_precedent[lignes_ko] = x[~respecte], f[~respecte], -1
+        actifs = actifs[np.abs(x_ok[actifs] - x_ko[actifs]) > tolerance]
+
+    return {
+        "valeur": np.where(statut == STATUT_CIBLE_OK, x_ok, np.nan),
+        "statut": statut,
+        "minimum": ~respecte_bas,
+        "nb_iterations": nb_iterations,
+        "nb_evaluations": nb_evaluations,
+    }
+
+def decouper_valeur_cible(scenarios, parametre, **options):
+    """
+    Découpe rechercher_valeur_cible par lots de TAILLE_LOT_CIBLE dossiers (tâches en
+    arrière-plan). Retourne (sous_taches, assembler) ; les dossiers des lots en attente
+    valent NaN, statut STATUT_CIBLE_EN_ATTENTE.
+    """
+    v = _normaliser_scenarios(scenarios)
+    n = v["prix_achat"].shape[0]
+    bornes = options.pop("bornes", None)
+    lots = [slice(debut, debut + TAILLE_LOT_CIBLE) for debut in range(0, n, TAILLE_LOT_CIBLE)]
+    sous_taches = []
+    for lot in lots:
+        bornes_lot = None if bornes is None else tuple(np.broadcast_to(np.asarray(b, dtype=float), (n,))[lot] for b in bornes)
+        sous_taches.append((_rechercher_lot, ({cle: tableau[lot] for cle, tableau in v.items()}, parametre, bornes_lot, options)))
+
+    def assembler(resultats):
+        valeur = np.full(n, np.nan)
+        statut = np.full(n, STATUT_CIBLE_EN_ATTENTE, dtype=np.int8)
+        minimum = np.ones(n, dtype=bool)
+        nb_iterations = nb_evaluations = 0
+        for lot, resultat in zip(lots, resultats):
+            if resultat is not None:
+                valeur[lot], statut[lot], minimum[lot] = resultat["valeur"], resultat["statut"], resultat["minimum"]
+                nb_iterations = max(nb_iterations, resultat["nb_iterations"])
+                nb_evaluations += resultat["nb_evaluations"]
+        return {"valeur": valeur, "statut": statut, "minimum": minimum, "nb_iterations": nb_iterations, "nb_evaluations": nb_evaluations}
+
+    return sous_taches, assembler
+
+def _rechercher_lot(scenarios, parametre, bornes, options):
+    return rechercher_valeur_cible(scenarios, parametre, bornes=bornes, **options)